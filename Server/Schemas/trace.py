@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List, Dict, Optional
+
+
+class TraceSpan(BaseModel):
+    span_id: str
+    parent_span_id: Optional[str] = None
+    service_name: str
+    operation: str
+    kind: str
+    start_time: str
+    start_offset_ms: float  # from the start of the trace
+    latency_ms: float
+    self_time_ms: float  # latency not covered by child spans
+    depth: int
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    downstream: Optional[str] = None
+    critical: bool  # on the critical path
+
+
+class TraceResponse(BaseModel):
+    trace_id: str
+    source: str  # live, archive
+    span_count: int
+    service_count: int
+    error_count: int
+    start_time: str
+    duration_ms: float
+    root_span_ids: List[str]
+    critical_path: List[str]
+    self_time_by_service: Dict[str, float]
+    spans: List[TraceSpan]  # waterfall order: depth-first, siblings by start time
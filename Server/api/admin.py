@@ -1,14 +1,19 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
 from db.base import get_db
 from db.models import Tenant, User, APIKey as DBAPIKey
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import uuid
 import secrets
 from core.config import get_settings
+from core.auth_cache import get_api_key_cache, get_token_cache, get_tenant_cache
+from core.cache import get_cache_manager
+from db.locks import maintenance_lock
+from services.rollup_service import HOUR, RollupService, bucket_start
+from services.sdk_config_service import SdkConfigService
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 _settings = get_settings()
@@ -38,6 +43,15 @@ class UpdateTenantRequest(BaseModel):
     is_active: Optional[bool] = None
     name: Optional[str] = None
     max_spans_per_day: Optional[int] = None
+    rate_limit_per_minute: Optional[int] = Field(None, ge=1)
+
+
+class SdkConfigOverrideRequest(BaseModel):
+    service: Optional[str] = None  # omit to apply to every service of the tenant
+    sampling_rate: Optional[float] = Field(None, ge=0.0, le=1.0)
+    db_span_aggregation: Optional[bool] = None
+    tail_sampling: Optional[bool] = None
+    ttl_seconds: int = Field(3600, ge=60, le=7 * 24 * 3600)
 
 
 class TenantResponse(BaseModel):
@@ -49,7 +63,7 @@ class TenantResponse(BaseModel):
 
 
 @router.post("/tenants", response_model=TenantResponse, dependencies=[Depends(_require_admin)])
-async def create_tenant(request: CreateTenantRequest, db: Session = Depends(get_db)):
+def create_tenant(request: CreateTenantRequest, db: Session = Depends(get_db)):
     """Create new tenant with admin user and API key (admin only)"""
     
     # Check if email already exists
@@ -102,14 +116,14 @@ async def create_tenant(request: CreateTenantRequest, db: Session = Depends(get_
 
 
 @router.get("/tenants", dependencies=[Depends(_require_admin)])
-async def list_tenants(db: Session = Depends(get_db)):
+def list_tenants(db: Session = Depends(get_db)):
     """List all tenants"""
     tenants = db.query(Tenant).all()
     return [{"id": t.id, "name": t.name, "is_active": t.is_active, "created_at": t.created_at.isoformat()} for t in tenants]
 
 
 @router.get("/tenants/{tenant_id}", dependencies=[Depends(_require_admin)])
-async def get_tenant(tenant_id: str, db: Session = Depends(get_db)):
+def get_tenant(tenant_id: str, db: Session = Depends(get_db)):
     """Get tenant details"""
     tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
     if not tenant:
@@ -127,13 +141,14 @@ async def get_tenant(tenant_id: str, db: Session = Depends(get_db)):
         "is_active": tenant.is_active,
         "created_at": tenant.created_at.isoformat(),
         "max_spans_per_day": tenant.max_spans_per_day,
+        "rate_limit_per_minute": tenant.rate_limit_per_minute,
         "user_count": user_count,
         "api_key_count": key_count
     }
 
 
 @router.patch("/tenants/{tenant_id}", dependencies=[Depends(_require_admin)])
-async def update_tenant(
+def update_tenant(
     tenant_id: str,
     body: UpdateTenantRequest,
     db: Session = Depends(get_db)
@@ -149,17 +164,26 @@ async def update_tenant(
         tenant.name = body.name
     if body.max_spans_per_day is not None:
         tenant.max_spans_per_day = body.max_spans_per_day
+    if body.rate_limit_per_minute is not None:
+        tenant.rate_limit_per_minute = body.rate_limit_per_minute
+    db.commit()
+    get_tenant_cache().invalidate(tenant_id)
+    if body.is_active is False:
+        # Tokens and keys only stop resolving when the tenant is deactivated
+        get_token_cache().invalidate_tenant(tenant_id)
+        get_api_key_cache().invalidate()
     return {
         "id": tenant.id,
         "name": tenant.name,
         "is_active": tenant.is_active,
         "max_spans_per_day": tenant.max_spans_per_day,
+        "rate_limit_per_minute": tenant.rate_limit_per_minute,
         "message": "Tenant updated successfully"
     }
 
 
 @router.delete("/tenants/{tenant_id}", dependencies=[Depends(_require_admin)])
-async def delete_tenant(tenant_id: str, db: Session = Depends(get_db)):
+def delete_tenant(tenant_id: str, db: Session = Depends(get_db)):
     """
     Delete tenant and all associated data (USE WITH CAUTION).
     This is a soft delete - sets is_active to False.
@@ -175,6 +199,9 @@ async def delete_tenant(tenant_id: str, db: Session = Depends(get_db)):
     db.query(DBAPIKey).filter(DBAPIKey.tenant_id == tenant_id).update({"is_active": False})
     
     db.commit()
+    get_api_key_cache().invalidate()
+    get_token_cache().invalidate_tenant(tenant_id)
+    get_tenant_cache().invalidate(tenant_id)
     
     return {
         "message": f"Tenant {tenant_id} deactivated successfully",
@@ -183,7 +210,7 @@ async def delete_tenant(tenant_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/tenants/{tenant_id}/api-keys", dependencies=[Depends(_require_admin)])
-async def create_api_key(
+def create_api_key(
     tenant_id: str,
     name: str,
     db: Session = Depends(get_db)
@@ -214,7 +241,7 @@ async def create_api_key(
 
 
 @router.get("/tenants/{tenant_id}/api-keys", dependencies=[Depends(_require_admin)])
-async def list_api_keys(tenant_id: str, db: Session = Depends(get_db)):
+def list_api_keys(tenant_id: str, db: Session = Depends(get_db)):
     """List API keys for tenant (masked)"""
     keys = db.query(DBAPIKey).filter(DBAPIKey.tenant_id == tenant_id).all()
     
@@ -229,3 +256,70 @@ async def list_api_keys(tenant_id: str, db: Session = Depends(get_db)):
         for k in keys
     ]
 
+
+
+@router.put("/tenants/{tenant_id}/sdk-config", dependencies=[Depends(_require_admin)])
+async def set_sdk_config_override(tenant_id: str, body: SdkConfigOverrideRequest):
+    """
+    Override the sampling config pushed to a tenant's SDKs.
+    Takes effect on each SDK's next heartbeat (within ~60 s) and expires after ttl_seconds.
+    """
+    features = {
+        k: v for k, v in {
+            "db_span_aggregation": body.db_span_aggregation,
+            "tail_sampling": body.tail_sampling,
+        }.items() if v is not None
+    }
+    override = {"sampling_rate": body.sampling_rate, "features": features}
+    SdkConfigService.set_override(tenant_id, override, body.ttl_seconds, service=body.service)
+    return {
+        "tenant_id": tenant_id,
+        "service": body.service,
+        "override": override,
+        "expires_in_seconds": body.ttl_seconds,
+    }
+
+
+@router.delete("/tenants/{tenant_id}/sdk-config", dependencies=[Depends(_require_admin)])
+async def clear_sdk_config_override(tenant_id: str, service: Optional[str] = None):
+    """Remove an SDK config override so volume-based rates apply again."""
+    SdkConfigService.clear_override(tenant_id, service)
+    return {"tenant_id": tenant_id, "service": service, "message": "SDK config override cleared"}
+
+
+@router.post("/tenants/{tenant_id}/rollups/rebuild", dependencies=[Depends(_require_admin)])
+def rebuild_rollups(
+    tenant_id: str,
+    days: Optional[int] = Query(None, ge=1),
+    until: Optional[datetime] = Query(None, description="End of the range (UTC); defaults to the start of the current hour"),
+    db: Session = Depends(get_db),
+):
+    """
+    Recompute a tenant's span rollups from raw spans — all history still
+    available, or whole hours covering the last ``days`` days — up to
+    ``until``.  The range must end before the current hour, which is still
+    being ingested into; rollup history older than the oldest raw span is
+    kept.
+    """
+    current_hour = bucket_start(datetime.utcnow(), HOUR)
+    if until is None:
+        until = current_hour
+    elif until.tzinfo is not None:
+        until = until.astimezone(timezone.utc).replace(tzinfo=None)
+    if bucket_start(until, HOUR) != until:
+        until = bucket_start(until, HOUR) + timedelta(hours=1)
+    if until > current_hour:
+        raise HTTPException(status_code=400, detail="until must not be later than the start of the current hour")
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+
+    with maintenance_lock(db.get_bind(), "rollups") as held:
+        if not held:
+            raise HTTPException(status_code=409, detail="A rollup rebuild or prune is already running")
+        spans_read = RollupService.rebuild(db, tenant_id=tenant_id, start=since, end=until)
+    get_cache_manager().bump_generation(tenant_id)
+    return {
+        "tenant_id": tenant_id,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat(),
+        "spans_read": spans_read,
+    }
@@ -3,7 +3,8 @@ AI Design API - Endpoints for AI-powered architecture design
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from db.base import get_db
+from db.base import get_read_db
+from db.threadpool import run_db
 from dependencies.auth import get_tenant_id_from_jwt as get_tenant_id
 from core.logging import get_logger
 from services.ai_architecture_designer import (
@@ -52,7 +53,7 @@ class OptimizationRequest(BaseModel):
 async def design_new_architecture(
     request: DesignRequest,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     🎨 Design a completely NEW architecture from scratch using Azure OpenAI
@@ -202,7 +203,7 @@ async def design_event_driven(
 async def optimize_architecture(
     request: OptimizationRequest,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     🚀 AI-powered optimization of existing architecture
@@ -236,7 +237,7 @@ async def optimize_architecture(
         designer = get_architecture_designer()
         
         # Get current architecture
-        nodes, edges = GraphService.build_graph(db, tenant_id)
+        nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
         current_architecture = {
             "services": [{"name": n.id, "metrics": n.metrics.model_dump()} for n in nodes],
             "dependencies": [{"from": e.source, "to": e.target} for e in edges]
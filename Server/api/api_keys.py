@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from db.base import get_db
 from db.models import APIKey, User
 from dependencies.auth import get_current_user
+from core.auth_cache import get_api_key_cache
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import secrets
@@ -36,7 +37,7 @@ class APIKeyListResponse(BaseModel):
 
 
 @router.post("/", response_model=APIKeyResponse)
-async def create_api_key(
+def create_api_key(
     data: APIKeyCreate,
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -77,7 +78,7 @@ async def create_api_key(
 
 
 @router.get("/", response_model=List[APIKeyListResponse])
-async def list_api_keys(
+def list_api_keys(
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -108,7 +109,7 @@ async def list_api_keys(
 
 
 @router.delete("/{key_preview}")
-async def revoke_api_key(
+def revoke_api_key(
     key_preview: str,
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -139,6 +140,7 @@ async def revoke_api_key(
     # Deactivate the key
     matching_key.is_active = False
     db.commit()
+    get_api_key_cache().invalidate(matching_key.key)
     
     return {
         "message": "API key revoked successfully",
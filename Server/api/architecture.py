@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
-from db.base import get_db
+from db.base import get_read_db
 from typing import List, Dict, Any
 from models.node import Node
 from models.edge import Edge
@@ -18,10 +18,10 @@ logger = get_logger(__name__)
 
 
 @router.get("/current", response_model=ArchitectureResponse)
-async def get_current_architecture(
+def get_current_architecture(
     background_tasks: BackgroundTasks,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get current architecture graph with tenant isolation and caching"""
     cache = get_cache_manager()
@@ -51,7 +51,7 @@ async def get_current_architecture(
 async def get_detected_issues(
     background_tasks: BackgroundTasks,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get detected issues with tenant isolation and caching"""
     cache = get_cache_manager()
@@ -34,7 +34,7 @@ settings = get_settings()
 
 # ==================== EMAIL/PASSWORD AUTHENTICATION ====================
 @router.post("/signup", response_model=Token)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user with email and password.
     
@@ -76,7 +76,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login with email and password.
     
@@ -125,7 +125,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 # ==================== GET CURRENT USER ====================
 @router.get("/me", response_model=UserMeResponse)
-async def get_me(
+def get_me(
     current_user: Dict[str, Any] = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -1,8 +1,9 @@
 ﻿"""Dashboard – Insights sub-router: /insights, /recommendations, /workflows"""
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from db.base import get_db
+from db.base import get_read_db
 from db.models import Span
+from db.threadpool import run_db
 import networkx as nx
 from dependencies.auth import get_tenant_id_from_jwt
 from core.cache import get_cache_manager
@@ -22,7 +23,7 @@ logger = get_logger(__name__)
 @router.get("/insights")
 async def get_ai_insights(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """AI-powered insights and anomalies. Cached per tenant."""
     cache = get_cache_manager()
@@ -31,12 +32,14 @@ async def get_ai_insights(
         return cached
 
     try:
-        metrics = MetricsService.compute_global_metrics(db, tenant_id)
+        metrics = await run_db(MetricsService.compute_global_metrics, db, tenant_id)
         start_time = datetime.utcnow() - timedelta(hours=24)
-        recent_spans = db.query(Span).filter(
-            Span.tenant_id == tenant_id,
-            Span.start_time >= start_time,
-        ).all()
+        recent_spans = await run_db(
+            db.query(Span).filter(
+                Span.tenant_id == tenant_id,
+                Span.start_time >= start_time,
+            ).all
+        )
 
         trends = []
         if recent_spans:
@@ -104,7 +107,7 @@ async def get_ai_insights(
 @router.get("/recommendations")
 async def get_ai_architecture_recommendations(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """AI-powered architecture recommendations. Cached per tenant."""
     cache = get_cache_manager()
@@ -113,7 +116,7 @@ async def get_ai_architecture_recommendations(
         return cached
 
     try:
-        nodes, edges = GraphService.build_graph(db, tenant_id)
+        nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
         issues = await IssueDetector.detect_issues(db, tenant_id)
         # Build nx graph from already-loaded data — avoids a second DB round-trip
         G = nx.DiGraph()
@@ -181,7 +184,7 @@ async def get_ai_architecture_recommendations(
 @router.get("/workflows")
 async def generate_workflow_alternatives(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     goal: str = Query(
         default="optimize_performance",
         description="optimize_performance | reduce_cost | improve_reliability",
@@ -200,7 +203,7 @@ async def generate_workflow_alternatives(
         return cached
 
     try:
-        nodes, edges = GraphService.build_graph(db, tenant_id)
+        nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
         issues = await IssueDetector.detect_issues(db, tenant_id)
         # Build nx graph from already-loaded nodes/edges — avoids a second DB round-trip
         G = nx.DiGraph()
@@ -225,7 +228,7 @@ async def generate_workflow_alternatives(
                 goal=goal,
             )
             generator = WorkflowGenerator()
-            workflows = generator.generate_workflows_sync(db, issues, tenant_id)
+            workflows = await run_db(generator.generate_workflows_sync, db, issues, tenant_id)
             result = {
                 "ai_workflows": ai_result.get("workflows", []),
                 "langgraph_workflow": workflows[0].model_dump() if workflows else None,
@@ -240,7 +243,7 @@ async def generate_workflow_alternatives(
         else:
             logger.warning("Azure OpenAI not configured, using LangGraph fallback")
             generator = WorkflowGenerator()
-            workflows = generator.generate_workflows_sync(db, issues, tenant_id)
+            workflows = await run_db(generator.generate_workflows_sync, db, issues, tenant_id)
             result = {
                 "workflows": [w.model_dump() for w in workflows],
                 "goal": goal,
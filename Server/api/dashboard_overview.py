@@ -2,8 +2,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 import networkx as nx
-from db.base import get_db
+from db.base import get_read_db
 from db.models import Span
+from db.threadpool import run_db
 from dependencies.auth import get_tenant_id_from_jwt
 from core.cache import get_cache_manager
 from services.graph_service import GraphService
@@ -48,7 +49,7 @@ class ServiceDetail(BaseModel):
 @router.get("/overview", response_model=DashboardOverview)
 async def get_dashboard_overview(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """High-level dashboard overview with all key metrics. Cached 2 min."""
     cache = get_cache_manager()
@@ -59,8 +60,8 @@ async def get_dashboard_overview(
 
     logger.info(f"✗ Cache MISS: dashboard_overview tenant {tenant_id}")
 
-    nodes, edges = GraphService.build_graph(db, tenant_id)
-    metrics = MetricsService.compute_global_metrics(db, tenant_id)
+    nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
+    metrics = await run_db(MetricsService.compute_global_metrics, db, tenant_id)
     issues = await IssueDetector.detect_issues(db, tenant_id)
 
     health_score = 100
@@ -105,9 +106,9 @@ async def get_dashboard_overview(
 
 
 @router.get("/architecture-map")
-async def get_architecture_map(
+def get_architecture_map(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Architecture graph data optimised for visualisation."""
     nodes, edges = GraphService.build_graph(db, tenant_id)
@@ -141,9 +142,9 @@ async def get_architecture_map(
 
 
 @router.get("/services", response_model=List[ServiceDetail])
-async def get_services(
+def get_services(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Detailed information about all services."""
     nodes, edges = GraphService.build_graph(db, tenant_id)
@@ -184,10 +185,10 @@ async def get_services(
 
 
 @router.get("/services/{service_name}/metrics")
-async def get_service_metrics(
+def get_service_metrics(
     service_name: str,
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Metrics for a specific service."""
     nodes, _edges = GraphService.build_graph(db, tenant_id)
@@ -200,12 +201,12 @@ async def get_service_metrics(
 @router.get("/health")
 async def get_system_health(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """System health scores by category."""
-    metrics = MetricsService.compute_global_metrics(db, tenant_id)
+    metrics = await run_db(MetricsService.compute_global_metrics, db, tenant_id)
     issues = await IssueDetector.detect_issues(db, tenant_id)
-    G = GraphService.get_graph_from_db(db, tenant_id)
+    G = await run_db(GraphService.get_graph_from_db, db, tenant_id)
     analysis = GraphAnalysis.analyze_architecture(G)
 
     def latency_score(ms):
@@ -242,9 +243,9 @@ async def get_system_health(
 
 
 @router.get("/dependencies")
-async def get_dependency_matrix(
+def get_dependency_matrix(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Dependency matrix for visualisation."""
     nodes, edges = GraphService.build_graph(db, tenant_id)
@@ -260,9 +261,9 @@ async def get_dependency_matrix(
 
 
 @router.get("/bottlenecks")
-async def get_bottlenecks(
+def get_bottlenecks(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Critical path analysis and bottlenecks."""
     G = GraphService.get_graph_from_db(db, tenant_id)
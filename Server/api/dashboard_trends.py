@@ -1,8 +1,8 @@
 ﻿"""Dashboard – Trends sub-router: /trends, /traces/timeline"""
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from db.base import get_db
-from db.models import Span
+from db.base import get_read_db
+from services.rollup_service import HOUR, RollupService, latency_percentile
 from dependencies.auth import get_tenant_id_from_jwt
 from datetime import datetime, timedelta
 from core.logging import get_logger
@@ -11,31 +11,28 @@ router = APIRouter()
 logger = get_logger(__name__)
 
 
-def _compute_hourly_trends(spans, hours: int):
-    """Shared bucketing logic used by both /trends and /traces/timeline."""
-    if not spans:
+def _compute_hourly_trends(rows, hours: int):
+    """Shared bucketing logic used by both /trends and /traces/timeline (one row per hourly bucket)."""
+    if not rows:
         return {"latency": [], "error_rate": [], "volume": []}
 
-    hourly: dict = {}
-    for span in spans:
-        bucket = span.start_time.replace(minute=0, second=0, microsecond=0)
-        hourly.setdefault(bucket, []).append(span)
+    latency_trends, error_trends, volume_trends, p95_trends = [], [], [], []
+    for row in sorted(rows, key=lambda r: r.bucket):
+        count = int(row.span_count or 0)
+        if not count:
+            continue
+        ts = row.bucket.isoformat()
 
-    latency_trends, error_trends, volume_trends = [], [], []
-    for bucket_time in sorted(hourly):
-        bucket_spans = hourly[bucket_time]
-        ts = bucket_time.isoformat()
+        latency_trends.append({"timestamp": ts, "value": round(row.latency_sum / count, 2)})
+        error_trends.append({"timestamp": ts, "value": round(int(row.error_count or 0) / count, 4)})
+        volume_trends.append({"timestamp": ts, "value": count})
 
-        avg_lat = sum(s.latency_ms for s in bucket_spans) / len(bucket_spans)
-        latency_trends.append({"timestamp": ts, "value": round(avg_lat, 2)})
-
-        errors = sum(1 for s in bucket_spans if s.error or (s.status_code and s.status_code >= 500))
-        error_trends.append({"timestamp": ts, "value": round(errors / len(bucket_spans), 4)})
-
-        volume_trends.append({"timestamp": ts, "value": len(bucket_spans)})
+        histogram = RollupService.histogram(RollupService.totals([row]))
+        p95_trends.append({"timestamp": ts, "value": latency_percentile(histogram, 0.95)})
 
     return {
         "latency": latency_trends,
+        "latency_p95": p95_trends,
         "error_rate": error_trends,
         "volume": volume_trends,
         "period_hours": hours,
@@ -44,28 +41,26 @@ def _compute_hourly_trends(spans, hours: int):
 
 
 @router.get("/trends")
-async def get_trends(
+def get_trends(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     hours: int = Query(default=24, ge=1, le=168),
 ):
     """Time-series trends for latency, error rate, and volume."""
     end_time   = datetime.utcnow()
     start_time = end_time - timedelta(hours=hours)
 
-    spans = (
-        db.query(Span)
-        .filter(Span.tenant_id == tenant_id, Span.start_time >= start_time, Span.start_time <= end_time)
-        .all()
+    rows = RollupService.query(
+        db, tenant_id, group_by=("bucket",), start=start_time, end=end_time, resolution=HOUR
     )
-    return _compute_hourly_trends(spans, hours)
+    return _compute_hourly_trends(rows, hours)
 
 
 @router.get("/traces/timeline")
-async def get_trace_timeline(
+def get_trace_timeline(
     tenant_id: str = Depends(get_tenant_id_from_jwt),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     hours: int = Query(default=24, ge=1, le=168),
 ):
     """Trace volume timeline (alias for /trends)."""
-    return await get_trends(tenant_id, db, hours)
+    return get_trends(tenant_id, db, hours)
@@ -1,17 +1,39 @@
-﻿from fastapi import APIRouter, Depends, Request
+﻿from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from db.base import get_db
+from db.base import get_db, pool_stats
+from db.threadpool import run_db, threadpool_stats
 from datetime import datetime
 from core.config import get_settings
 from core.logging import get_logger
 from core.cache import get_cache_manager
+from services.sdk_config_service import SdkConfigService
+from dependencies.auth import get_tenant_id_from_jwt_or_api_key
 import sys
 
 router = APIRouter(prefix="/api/v1", tags=["health"])
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Runtime health fields the SDK reports with its heartbeat (see nexarch.runtime_health)
+RUNTIME_NUMERIC_FIELDS = (
+    "interval_s", "loop_lag_max_ms", "loop_lag_avg_ms", "gc_collections",
+    "gc_pause_total_ms", "gc_pause_max_ms", "rss_bytes", "thread_count",
+)
+
+
+def _runtime_sample(raw) -> dict:
+    """Keep the known runtime fields of a heartbeat (numbers, or None when not measured)."""
+    if not isinstance(raw, dict):
+        return {}
+    sample = {
+        field: raw[field] for field in RUNTIME_NUMERIC_FIELDS
+        if field in raw and (raw[field] is None or isinstance(raw[field], (int, float)))
+    }
+    if sample and isinstance(raw.get("timestamp"), str):
+        sample["timestamp"] = raw["timestamp"][:32]
+    return sample
+
 
 @router.get("/health")
 async def health_check():
@@ -23,7 +45,7 @@ async def health_check():
 
 
 @router.get("/health/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+def detailed_health_check(db: Session = Depends(get_db)):
     """Detailed health check with component status"""
     settings = get_settings()
     
@@ -58,6 +80,8 @@ async def detailed_health_check(db: Session = Depends(get_db)):
             "caching": "enabled" if settings.ENABLE_CACHING else "disabled",
             "ai_generation": "enabled" if settings.ENABLE_AI_GENERATION else "disabled"
         },
+        "db_threadpool": threadpool_stats(),
+        "db_pools": pool_stats(),
         "features": {
             "auto_discovery": True,
             "ai_architecture_design": settings.ENABLE_AI_GENERATION,
@@ -68,7 +92,7 @@ async def detailed_health_check(db: Session = Depends(get_db)):
 
 
 @router.get("/health/ready")
-async def readiness_check(db: Session = Depends(get_db)):
+def readiness_check(db: Session = Depends(get_db)):
     """Kubernetes readiness probe"""
     from fastapi.responses import JSONResponse
     try:
@@ -90,10 +114,17 @@ async def sdk_heartbeat(request: Request, db: Session = Depends(get_db)):
     """
     Receive a periodic heartbeat from SDK-instrumented services.
 
-    Payload: ``{"service": "...", "environment": "..."}``
+    Payload: ``{"service": "...", "environment": "...", "sampling_rate": 1.0,
+    "features": {...}, "runtime": {...}}`` — ``features`` are the switches
+    the SDK currently runs with.
 
     Stores ``sdk:heartbeat:{tenant_id}:{service}`` in Redis with a 300 s TTL so the
-    dashboard can show which services were active recently.
+    dashboard can show which services were active recently.  The optional
+    ``runtime`` block (loop lag, GC pauses, RSS, threads) is kept with it and
+    served by ``GET /api/v1/sdk/runtime/{service}``.
+
+    The response carries a ``config`` block (sampling rate + feature switches)
+    computed from the service's observed ingest volume, which the SDK applies live.
     """
     try:
         body = await request.json()
@@ -102,17 +133,23 @@ async def sdk_heartbeat(request: Request, db: Session = Depends(get_db)):
 
     service     = body.get("service", "unknown")
     environment = body.get("environment", "unknown")
+    try:
+        current_rate = float(body.get("sampling_rate", 1.0))
+    except (TypeError, ValueError):
+        current_rate = 1.0
+    features = body.get("features")
+    aggregating = isinstance(features, dict) and features.get("db_span_aggregation") is True
 
-    # Resolve tenant from API key header by looking it up in the database.
+    # Resolve tenant from API key header via the shared API key cache.
     # The key format is ``nex_<base64>`` — there is no embedded tenant_id.
     api_key   = request.headers.get("X-API-Key") or request.headers.get("x-api-key")
     tenant_id = "global"
     if api_key:
         try:
-            from db.models import APIKey
-            db_key = db.query(APIKey).filter(APIKey.key == api_key, APIKey.is_active == True).first()
-            if db_key:
-                tenant_id = db_key.tenant_id
+            from core.auth_cache import get_api_key_cache
+            resolved = await run_db(get_api_key_cache().resolve, db, api_key)
+            if resolved and resolved[1]:
+                tenant_id = resolved[0]
         except Exception as e:
             logger.warning(f"Heartbeat tenant lookup failed: {e}")
 
@@ -123,8 +160,38 @@ async def sdk_heartbeat(request: Request, db: Session = Depends(get_db)):
         cache.set(
             tenant_id,
             f"heartbeat:{service}",
-            {"service": service, "environment": environment, "last_seen": datetime.utcnow().isoformat()},
+            {
+                "service": service,
+                "environment": environment,
+                "last_seen": datetime.utcnow().isoformat(),
+                "runtime": _runtime_sample(body.get("runtime")),
+            },
             ttl=300,
         )
 
-    return {"received": True, "service": service, "tenant": tenant_id}
+    response = {"received": True, "service": service, "tenant": tenant_id}
+
+    # Remote sampling config — only for authenticated tenants
+    if tenant_id != "global":
+        try:
+            response["config"] = await run_db(
+                SdkConfigService.compute_config, db, tenant_id, service, current_rate, aggregating
+            )
+        except Exception as e:
+            logger.warning(f"Heartbeat config computation failed: {e}")
+
+    return response
+
+
+@router.get("/sdk/runtime/{service}")
+def sdk_runtime(service: str, tenant_id: str = Depends(get_tenant_id_from_jwt_or_api_key)):
+    """Latest runtime health sample a service reported with its heartbeat"""
+    heartbeat = get_cache_manager().get(tenant_id, f"heartbeat:{service}")
+    if not heartbeat:
+        raise HTTPException(status_code=404, detail="No recent heartbeat from service")
+    return {
+        "service": service,
+        "environment": heartbeat.get("environment"),
+        "last_seen": heartbeat.get("last_seen"),
+        "runtime": heartbeat.get("runtime") or {},
+    }
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from db.base import get_db
+from db.threadpool import run_db
 from models.span import Span as SpanIngest
 from pydantic import BaseModel
 from services.ingest_service import IngestService
+from services.ingest_buffer import get_ingest_buffer
+from services.span_dedup import get_span_deduplicator
+from services.quota import get_span_quota, seconds_until_reset, EXCEEDED as QUOTA_EXCEEDED
+from core.auth_cache import MISS, get_tenant_cache
 from core.logging import get_logger
 from dependencies.auth import get_tenant_id_from_jwt_or_api_key as get_tenant_id
 from core.cache import get_cache_manager
-from streaming.pipeline import push_span_to_stream
+from streaming.pipeline import push_spans_to_stream
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -36,6 +41,58 @@ router = APIRouter(prefix="/api/v1", tags=["ingest"])
 logger = get_logger(__name__)
 
 
+def _buffer_spans(tenant_id: str, spans: List[SpanIngest]) -> bool:
+    """
+    Hand spans to the group-commit buffer.  Returns False when the buffer is
+    not running (synchronous write instead); raises 503 when it is full or
+    its commits are failing.
+    """
+    buffer = get_ingest_buffer()
+    if not buffer.running:
+        return False
+    if not buffer.submit(tenant_id, spans):
+        if buffer.commit_failing:
+            raise HTTPException(
+                status_code=503,
+                detail="Span storage unavailable, retry shortly",
+                headers={"Retry-After": "5"},
+            )
+        raise HTTPException(
+            status_code=503,
+            detail="Ingest buffer full, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    return True
+
+
+def _stream_dicts(spans: List[SpanIngest], tenant_id: str):
+    """Stream payloads, built lazily (skipped entirely without Pathway)."""
+    return ({**span.model_dump(), "tenant_id": tenant_id} for span in spans)
+
+
+async def _apply_quota(tenant_id: str, spans: List[SpanIngest], db: Session) -> List[SpanIngest]:
+    """
+    Apply the tenant's daily span quota.  Returns the spans to store — a
+    sampled subset past the soft threshold — or raises 429 once the day's
+    quota is used up.  Limits come from the tenant cache; a miss is read on
+    the database thread pool, not on the event loop.
+    """
+    cache = get_tenant_cache()
+    limits = cache.peek(tenant_id)
+    if limits is MISS:
+        limits = await run_db(cache.get, tenant_id, db)
+    admitted, state = get_span_quota().admit(
+        tenant_id, spans, limits.max_spans_per_day if limits else None
+    )
+    if state == QUOTA_EXCEEDED:
+        raise HTTPException(
+            status_code=429,
+            detail="Daily span quota exceeded",
+            headers={"Retry-After": str(seconds_until_reset())},
+        )
+    return admitted
+
+
 @router.post("/ingest", status_code=202, response_model=IngestResponse)
 async def ingest_span(
     span: SpanIngest,
@@ -44,19 +101,28 @@ async def ingest_span(
     db: Session = Depends(get_db)
 ):
     """Accept telemetry span with tenant isolation"""
+    if not await _apply_quota(tenant_id, [span], db):
+        # Sampled out while the tenant is over its soft quota
+        return IngestResponse(span_id=span.span_id)
+
+    # Group commit: written by the buffer's writer task within milliseconds
+    if _buffer_spans(tenant_id, [span]):
+        return IngestResponse(span_id=span.span_id)
+
     try:
-        stored_span = IngestService.store_span(db, span, tenant_id)
+        stored, failed = await run_db(IngestService.store_spans_batch, db, [span], tenant_id)
+        if failed:
+            raise RuntimeError("span was not stored")
 
-        # Push to Pathway stream (non-blocking)
-        span_dict = {**span.model_dump(), "tenant_id": tenant_id}
-        background_tasks.add_task(push_span_to_stream, span_dict)
+        # Push to Pathway stream (non-blocking); a retried duplicate is not pushed again
+        if stored:
+            background_tasks.add_task(push_spans_to_stream, _stream_dicts(stored, tenant_id))
 
-        # Invalidate legacy cache keys (background — does not delay response)
-        cache = get_cache_manager()
-        background_tasks.add_task(cache.invalidate, tenant_id, "dashboard_overview")
-        background_tasks.add_task(cache.invalidate, tenant_id, "architecture_map")
+        # Dashboard results move to a new data generation (one coalesced INCR)
+        if stored:
+            get_cache_manager().bump_generation(tenant_id)
 
-        return IngestResponse(span_id=stored_span.span_id)
+        return IngestResponse(span_id=span.span_id)
     except Exception as e:
         logger.error(f"Ingest failed for tenant {tenant_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to ingest span")
@@ -81,12 +147,19 @@ async def ingest_batch(
     db: Session = Depends(get_db)
 ):
     """Accept batch of telemetry spans — stored in a single DB transaction"""
-    success, failed = IngestService.store_spans_batch(db, spans, tenant_id)
+    spans = await _apply_quota(tenant_id, spans, db)
+    if not spans:
+        return BatchIngestResponse(count=0)
+
+    if _buffer_spans(tenant_id, spans):
+        return BatchIngestResponse(count=len(spans))
 
-    # Push successfully stored spans to Pathway stream in background
-    for span in success:
-        span_dict = {**span.model_dump(), "tenant_id": tenant_id}
-        background_tasks.add_task(push_span_to_stream, span_dict)
+    success, failed = await run_db(IngestService.store_spans_batch, db, spans, tenant_id)
+
+    # Push successfully stored spans to Pathway stream in background, as one task
+    if success:
+        background_tasks.add_task(push_spans_to_stream, _stream_dicts(success, tenant_id))
+        get_cache_manager().bump_generation(tenant_id)
 
     return BatchIngestResponse(
         count=len(success),
@@ -95,7 +168,7 @@ async def ingest_batch(
 
 
 @router.post("/ingest/architecture-discovery", status_code=202)
-async def ingest_architecture_discovery(
+def ingest_architecture_discovery(
     discovery: ArchitectureDiscoveryData,
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db)
@@ -164,7 +237,7 @@ async def ingest_architecture_discovery(
 
 
 @router.get("/ingest/architecture-discoveries")
-async def get_architecture_discoveries(
+def get_architecture_discoveries(
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db)
 ):
@@ -202,7 +275,7 @@ async def get_architecture_discoveries(
 
 
 @router.get("/ingest/stats")
-async def get_ingest_stats(
+def get_ingest_stats(
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db)
 ):
@@ -210,10 +283,17 @@ async def get_ingest_stats(
     from db.models import Span
     from sqlalchemy import func
     
+    limits = get_tenant_cache().get(tenant_id, db)
+    
     stats = {
         "total_spans": db.query(func.count(Span.id)).filter(Span.tenant_id == tenant_id).scalar(),
         "unique_services": db.query(func.count(func.distinct(Span.service_name))).filter(Span.tenant_id == tenant_id).scalar(),
-        "unique_traces": db.query(func.count(func.distinct(Span.trace_id))).filter(Span.tenant_id == tenant_id).scalar()
+        "unique_traces": db.query(func.count(func.distinct(Span.trace_id))).filter(Span.tenant_id == tenant_id).scalar(),
+        # Process-wide, not per tenant
+        "write_throughput": IngestService.get_write_stats(),
+        "ingest_buffer": get_ingest_buffer().stats(),
+        "dedup": get_span_deduplicator().stats(),
+        "quota": get_span_quota().usage(tenant_id, limits.max_spans_per_day if limits else None),
     }
     
     return stats
@@ -4,10 +4,11 @@ System Info API - Comprehensive system information and statistics
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from db.base import get_db
-from db.models import Tenant, User, APIKey, Span
+from db.base import get_read_db
+from db.models import Tenant, User, APIKey, Span, SpanRollupHour
 from dependencies.auth import get_tenant_id_from_jwt as get_tenant_id
 from core.config import get_settings
+from services.rollup_service import HOUR, RollupService
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/v1/system", tags=["system"])
@@ -43,8 +44,8 @@ async def get_system_info():
 
 
 @router.get("/stats")
-async def get_system_stats(
-    db: Session = Depends(get_db),
+def get_system_stats(
+    db: Session = Depends(get_read_db),
     tenant_id: str = Depends(get_tenant_id)
 ):
     """Get tenant-specific statistics"""
@@ -52,33 +53,22 @@ async def get_system_stats(
     last_hour = now - timedelta(hours=1)
     last_day = now - timedelta(days=1)
     
-    # Span statistics
-    total_spans = db.query(func.count(Span.id)).filter(Span.tenant_id == tenant_id).scalar()
-    spans_last_hour = db.query(func.count(Span.id)).filter(
-        Span.tenant_id == tenant_id,
-        Span.start_time >= last_hour
-    ).scalar()
-    spans_last_day = db.query(func.count(Span.id)).filter(
-        Span.tenant_id == tenant_id,
-        Span.start_time >= last_day
-    ).scalar()
+    # Span statistics (from the rollups; the last hour reads minute buckets)
+    overall = RollupService.query(db, tenant_id, group_by=("service_name",), resolution=HOUR)
+    totals = RollupService.totals(overall)
+    total_spans = int(totals["span_count"])
+    error_spans = int(totals["error_count"])
+    spans_last_hour = int(RollupService.totals(RollupService.query(db, tenant_id, start=last_hour))["span_count"])
+    spans_last_day = int(RollupService.totals(RollupService.query(db, tenant_id, start=last_day))["span_count"])
     
     # Service statistics
-    unique_services = db.query(func.count(func.distinct(Span.service_name))).filter(
-        Span.tenant_id == tenant_id
-    ).scalar()
+    unique_services = len(overall)
     
     # Trace statistics
     unique_traces = db.query(func.count(func.distinct(Span.trace_id))).filter(
         Span.tenant_id == tenant_id
     ).scalar()
     
-    # Error statistics
-    error_spans = db.query(func.count(Span.id)).filter(
-        Span.tenant_id == tenant_id,
-        Span.error == True
-    ).scalar()
-    
     return {
         "tenant_id": tenant_id,
         "spans": {
@@ -99,7 +89,7 @@ async def get_system_stats(
 
 
 @router.get("/admin/stats")
-async def get_admin_stats(db: Session = Depends(get_db)):
+def get_admin_stats(db: Session = Depends(get_read_db)):
     """Get system-wide statistics (admin only - no auth for demo)"""
     
     # Tenant statistics
@@ -113,14 +103,20 @@ async def get_admin_stats(db: Session = Depends(get_db)):
     total_api_keys = db.query(func.count(APIKey.id)).scalar()
     active_api_keys = db.query(func.count(APIKey.id)).filter(APIKey.is_active == True).scalar()
     
-    # Span statistics
-    total_spans = db.query(func.count(Span.id)).scalar()
+    # Span statistics (hourly rollups, one grouped query)
+    span_counts = {
+        tenant_id: int(count or 0)
+        for tenant_id, count in db.query(
+            SpanRollupHour.tenant_id, func.sum(SpanRollupHour.span_count)
+        ).group_by(SpanRollupHour.tenant_id)
+    }
+    total_spans = sum(span_counts.values())
     
     # Per-tenant breakdown
     tenant_breakdown = []
     tenants = db.query(Tenant).all()
     for tenant in tenants:
-        span_count = db.query(func.count(Span.id)).filter(Span.tenant_id == tenant.id).scalar()
+        span_count = span_counts.get(tenant.id, 0)
         tenant_breakdown.append({
             "tenant_id": tenant.id,
             "tenant_name": tenant.name,
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from db.base import get_read_db
+from services.trace_service import TraceService
+from core.config import get_settings
+from core.logging import get_logger
+from dependencies.auth import get_tenant_id_from_jwt_or_api_key as get_tenant_id
+from core.cache import get_cache_manager
+from Schemas.trace import TraceResponse
+
+router = APIRouter(prefix="/api/v1/traces", tags=["traces"])
+logger = get_logger(__name__)
+
+
+@router.get("/{trace_id}", response_model=TraceResponse)
+def get_trace(
+    trace_id: str,
+    background_tasks: BackgroundTasks,
+    include_archive: bool = Query(False, description="Search the Parquet archive if the trace is not in the spans table"),
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db)
+):
+    """Get one trace as a waterfall with per-span self time and the critical path"""
+    cache = get_cache_manager()
+    # Cached as the serialized body, so a hit skips validation and encoding
+    cached = cache.get(tenant_id, "trace", trace_id=trace_id)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+
+    trace = TraceService.get_trace(db, tenant_id, trace_id, include_archive)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+
+    body = TraceResponse(**trace).model_dump_json()
+    # Short TTL: spans of a recent trace may still be arriving
+    background_tasks.add_task(
+        cache.set, tenant_id, "trace", body, get_settings().TRACE_CACHE_TTL_SECONDS, trace_id=trace_id
+    )
+    return Response(content=body, media_type="application/json")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
-from db.base import get_db
+from db.base import get_read_db
+from db.threadpool import run_db
 from typing import Dict, Any
 from models.workflow import Workflow
 from Schemas.workflow import WorkflowsResponse, WorkflowComparison
@@ -21,7 +22,7 @@ logger = get_logger(__name__)
 async def get_generated_workflows(
     background_tasks: BackgroundTasks,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get generated workflows with tenant isolation and caching"""
     # Check cache
@@ -50,7 +51,7 @@ async def get_generated_workflows(
 @router.get("/comparison", response_model=WorkflowComparison)
 async def get_workflow_comparison(
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Compare workflows with tenant isolation"""
     issues = await IssueDetector.detect_issues(db, tenant_id)
@@ -81,7 +82,7 @@ async def get_workflow_comparison(
 @router.get("/architecture/graph", response_model=WorkflowArchitectureGraphResponse)
 async def get_workflow_architecture_graph(
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get visual workflow graph representing the current architecture
@@ -107,7 +108,7 @@ async def get_workflow_architecture_graph(
         return WorkflowArchitectureGraphResponse(**cached)
     
     # Build current architecture graph
-    current = WorkflowGraphService.build_current_architecture_graph(db, tenant_id)
+    current = await run_db(WorkflowGraphService.build_current_architecture_graph, db, tenant_id)
     
     # Generate workflow variants
     variants = await WorkflowGraphService.generate_workflow_variants(db, tenant_id)
@@ -0,0 +1,355 @@
+"""
+In-process caches for request authentication.
+
+API keys
+--------
+``key -> (tenant_id, is_active)`` is cached for ``API_KEY_CACHE_TTL_SECONDS``
+so SDK ingest calls do not hit the database to authenticate.
+
+Revocation uses a version counter: revoking a key bumps
+``nexarch:auth:apikey_version`` in Redis (or a local counter without Redis).
+Every process compares its copy with the shared counter at most once per
+``_VERSION_CHECK_SECONDS`` and drops its whole cache when it moved, so a
+revoked key stops working everywhere within about a second.
+
+``last_used`` is no longer written per request; uses are recorded in memory
+and flushed every ``API_KEY_LAST_USED_FLUSH_SECONDS`` as one batched UPDATE.
+
+JWTs
+----
+A verified token maps to ``(user_id, tenant_id)`` in a bounded LRU until the
+token's own ``exp``.  Deactivating a tenant evicts its entries and bumps
+``nexarch:auth:jwt_version`` the same way revocations do for API keys;
+other tenant updates (name, limits) leave the mapping valid and do not
+touch the token cache, so they do not empty it across the fleet.
+
+Tenants
+-------
+Per-tenant limits (requests per minute, spans per day) are read from the
+tenant record at most once per ``API_KEY_CACHE_TTL_SECONDS``; admin updates
+bump ``nexarch:auth:tenant_version``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+from core.cache import get_cache_manager
+from core.config import get_settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# How often each process re-reads a shared invalidation version
+_VERSION_CHECK_SECONDS = 1.0
+
+# Returned by the ``peek`` methods when the answer is not cached
+MISS = object()
+
+
+def _redis_client():
+    """Shared Redis client from the cache layer, or None when in-memory."""
+    cache = get_cache_manager()
+    if cache.is_redis() and cache.backend.is_connected():
+        return cache.backend.redis_client
+    return None
+
+
+class _SharedVersion:
+    """
+    Invalidation counter shared by every worker through Redis.
+
+    :meth:`bump` is called by the worker that made a change; :meth:`changed`
+    tells the others (at most once per ``_VERSION_CHECK_SECONDS``) that they
+    should drop their cached entries.  Without Redis it is process-local.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._version = 0
+        self._checked_at = 0.0
+
+    def bump(self) -> None:
+        client = _redis_client()
+        if client is not None:
+            try:
+                self._version = int(client.incr(self.key))
+                return
+            except Exception as e:
+                logger.warning(f"{self.key} bump failed, invalidating locally only: {e}")
+        self._version += 1
+
+    def changed(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < _VERSION_CHECK_SECONDS:
+            return False
+        self._checked_at = now
+
+        client = _redis_client()
+        if client is None:
+            return False
+        try:
+            version = int(client.get(self.key) or 0)
+        except Exception:
+            return False
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+
+class APIKeyCache:
+    """TTL cache of API key lookups with version-bump invalidation."""
+
+    def __init__(self, ttl_seconds: int = 60, flush_seconds: int = 30):
+        self.ttl_seconds = ttl_seconds
+        self.flush_seconds = flush_seconds
+
+        self._lock = threading.Lock()
+        # key -> (tenant_id or None if unknown, is_active, expires_at)
+        self._entries: Dict[str, Tuple[Optional[str], bool, float]] = {}
+        self._version = _SharedVersion("nexarch:auth:apikey_version")
+
+        # key -> last time it authenticated a request (not yet persisted)
+        self._last_used: Dict[str, datetime] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ── Lookup ────────────────────────────────────────────────────────────
+
+    def peek(self, key: str):
+        """``resolve`` answered from memory only — ``MISS`` when it would query."""
+        if self._version.changed():
+            with self._lock:
+                self._entries.clear()
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] > time.monotonic():
+            tenant_id, is_active, _ = entry
+            return (tenant_id, is_active) if tenant_id else None
+        return MISS
+
+    def resolve(self, db, key: str) -> Optional[Tuple[str, bool]]:
+        """
+        Return ``(tenant_id, is_active)`` for *key*, or None if no such key.
+        Served from memory while fresh; otherwise one indexed query.
+        """
+        cached = self.peek(key)
+        if cached is not MISS:
+            return cached
+
+        now = time.monotonic()
+        from db.models import APIKey
+        row = db.query(APIKey.tenant_id, APIKey.is_active).filter(APIKey.key == key).first()
+        tenant_id, is_active = (row[0], bool(row[1])) if row else (None, False)
+        with self._lock:
+            self._entries[key] = (tenant_id, is_active, now + self.ttl_seconds)
+        return (tenant_id, is_active) if tenant_id else None
+
+    # ── Revocation ────────────────────────────────────────────────────────
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Forget one key (or all keys) here and bump the shared version so
+        every other process drops its cached entries too.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        self._version.bump()
+
+    # ── last_used batching ────────────────────────────────────────────────
+
+    def touch(self, key: str) -> None:
+        """Note that *key* was just used; persisted by the next flush."""
+        now = datetime.utcnow()
+        # Under the lock: a flush swaps the dict, and a write to the old one would be lost
+        with self._lock:
+            self._last_used[key] = now
+        if self._flusher is None:
+            self._start_flusher()
+
+    def flush_last_used(self) -> int:
+        """Write pending ``last_used`` timestamps in one batched UPDATE."""
+        with self._lock:
+            pending, self._last_used = self._last_used, {}
+        if not pending:
+            return 0
+
+        from db.base import SessionLocal
+        from db.models import APIKey
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(APIKey.__table__)
+                .where(APIKey.__table__.c.key == bindparam("b_key"))
+                .values(last_used=bindparam("b_last_used")),
+                [{"b_key": k, "b_last_used": ts} for k, ts in pending.items()],
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to flush API key last_used for {len(pending)} keys: {e}")
+            return 0
+        finally:
+            db.close()
+        return len(pending)
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="apikey-last-used", daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush_last_used()
+
+    def stop(self) -> None:
+        """Stop the flusher and write what is pending (app shutdown)."""
+        self._stop.set()
+        self.flush_last_used()
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT -> (user_id, tenant_id), valid until ``exp``."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # token -> (user_id, tenant_id, exp as unix time)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._version = _SharedVersion("nexarch:auth:jwt_version")
+
+    def get(self, token: str) -> Optional[Tuple[str, str]]:
+        """Cached ``(user_id, tenant_id)`` for a still-valid token, else None."""
+        if self._version.changed():
+            self.clear()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[0], entry[1]
+
+    def put(self, token: str, user_id: str, tenant_id: str, exp: float) -> None:
+        with self._lock:
+            self._entries[token] = (user_id, tenant_id, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tenant(self, tenant_id: str) -> None:
+        """Evict every token resolving to *tenant_id* (tenant deactivated)."""
+        self._evict(lambda entry: entry[1] == tenant_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, match) -> None:
+        with self._lock:
+            for token in [t for t, entry in self._entries.items() if match(entry)]:
+                del self._entries[token]
+        self._version.bump()
+
+
+class TenantLimits(NamedTuple):
+    is_active: bool
+    rate_limit_per_minute: Optional[int]
+    max_spans_per_day: Optional[int]
+
+
+class TenantCache:
+    """TTL cache of the tenant fields consulted on every request."""
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # tenant_id -> (limits or None if unknown, expires_at)
+        self._entries: Dict[str, Tuple[Optional[TenantLimits], float]] = {}
+        self._version = _SharedVersion("nexarch:auth:tenant_version")
+
+    def get(self, tenant_id: str, db=None) -> Optional[TenantLimits]:
+        """
+        Limits for *tenant_id*, or None if the tenant does not exist.
+        A session is opened only on a miss when *db* is not given.
+        """
+        cached = self.peek(tenant_id)
+        if cached is not MISS:
+            return cached
+
+        now = time.monotonic()
+        from db.models import Tenant
+        session = db
+        if session is None:
+            from db.base import SessionLocal
+            session = SessionLocal()
+        try:
+            row = session.query(
+                Tenant.is_active, Tenant.rate_limit_per_minute, Tenant.max_spans_per_day
+            ).filter(Tenant.id == tenant_id).first()
+        finally:
+            if db is None:
+                session.close()
+        limits = TenantLimits(bool(row[0]), row[1], row[2]) if row else None
+        with self._lock:
+            self._entries[tenant_id] = (limits, now + self.ttl_seconds)
+        return limits
+
+    def peek(self, tenant_id: str):
+        """``get`` answered from memory only — ``MISS`` when it would query."""
+        if self._version.changed():
+            with self._lock:
+                self._entries.clear()
+        entry = self._entries.get(tenant_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return MISS
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+        self._version.bump()
+
+
+# Singletons
+_api_key_cache: Optional[APIKeyCache] = None
+_token_cache: Optional[TokenCache] = None
+_tenant_cache: Optional[TenantCache] = None
+
+
+def get_api_key_cache() -> APIKeyCache:
+    global _api_key_cache
+    if _api_key_cache is None:
+        settings = get_settings()
+        _api_key_cache = APIKeyCache(
+            ttl_seconds=settings.API_KEY_CACHE_TTL_SECONDS,
+            flush_seconds=settings.API_KEY_LAST_USED_FLUSH_SECONDS,
+        )
+    return _api_key_cache
+
+
+def get_token_cache() -> TokenCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(max_entries=get_settings().JWT_CACHE_MAX_ENTRIES)
+    return _token_cache
+
+
+def get_tenant_cache() -> TenantCache:
+    global _tenant_cache
+    if _tenant_cache is None:
+        _tenant_cache = TenantCache(ttl_seconds=get_settings().API_KEY_CACHE_TTL_SECONDS)
+    return _tenant_cache
@@ -3,9 +3,11 @@ Production-grade caching layer with Azure Cache for Redis
 Falls back to in-memory cache if Redis unavailable
 """
 from functools import lru_cache
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Set, Tuple
 import json
 import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 import pickle
 from core.logging import get_logger
@@ -106,13 +108,37 @@ class RedisCacheBackend:
             return
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Deleted {len(keys)} keys matching pattern: {pattern}")
+            # SCAN walks the keyspace incrementally; KEYS would block Redis
+            deleted = 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += self.redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis_client.unlink(*batch)
+            if deleted:
+                logger.info(f"Deleted {deleted} keys matching pattern: {pattern}")
         except Exception as e:
             logger.error(f"Redis DELETE PATTERN error: {e}")
     
+    def get_counter(self, key: str) -> int:
+        """Read an integer counter (0 if missing)"""
+        try:
+            return int(self.redis_client.get(key) or 0)
+        except Exception as e:
+            logger.error(f"Redis GET counter error: {e}")
+            return 0
+    
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter"""
+        try:
+            return int(self.redis_client.incr(key))
+        except Exception as e:
+            logger.error(f"Redis INCR error: {e}")
+            return 0
+    
     def clear(self):
         """Clear entire cache (use with caution!)"""
         if not self.is_connected():
@@ -148,8 +174,14 @@ class RedisCacheBackend:
 class InMemoryCacheBackend:
     """Fallback in-memory cache"""
     
+    # Expired entries are swept at most this often (entries under an old
+    # data generation are never read again, so get() would not evict them)
+    SWEEP_INTERVAL_SECONDS = 60
+    
     def __init__(self, ttl_seconds: int = 300):
         self._cache: Dict[str, tuple] = {}
+        self._counters: Dict[str, int] = {}
+        self._last_sweep = datetime.utcnow()
         self.ttl_seconds = ttl_seconds
         logger.info("Using in-memory cache (fallback)")
     
@@ -159,19 +191,25 @@ class InMemoryCacheBackend:
     def get(self, key: str) -> Optional[Any]:
         """Get from memory cache"""
         if key in self._cache:
-            cached_data, cached_time = self._cache[key]
+            cached_data, expires_at = self._cache[key]
             
             # Check if expired
-            if datetime.utcnow() - cached_time < timedelta(seconds=self.ttl_seconds):
+            if datetime.utcnow() < expires_at:
                 return cached_data
             else:
-                del self._cache[key]
+                self._cache.pop(key, None)
         
         return None
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Set in memory cache"""
-        self._cache[key] = (value, datetime.utcnow())
+        """Set in memory cache (honours per-key TTL like the Redis backend)"""
+        now = datetime.utcnow()
+        if (now - self._last_sweep).total_seconds() >= self.SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            for expired in [k for k, (_, exp) in self._cache.items() if exp <= now]:
+                self._cache.pop(expired, None)
+        expires_at = now + timedelta(seconds=ttl or self.ttl_seconds)
+        self._cache[key] = (value, expires_at)
     
     def delete(self, key: str):
         """Delete from memory cache"""
@@ -186,6 +224,15 @@ class InMemoryCacheBackend:
         for key in keys_to_delete:
             del self._cache[key]
     
+    def get_counter(self, key: str) -> int:
+        """Read an integer counter (0 if missing)"""
+        return self._counters.get(key, 0)
+    
+    def incr(self, key: str) -> int:
+        """Increment an integer counter"""
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+    
     def clear(self):
         """Clear entire cache"""
         self._cache.clear()
@@ -203,10 +250,25 @@ class CacheManager:
     """
     Unified cache manager with Azure Cache for Redis
     Automatically falls back to in-memory if Redis unavailable
+    
+    Results computed from a tenant's spans (``SPAN_DERIVED_OPERATIONS``) are
+    keyed by the tenant's data generation.  Ingest calls
+    :meth:`bump_generation` — one INCR, at most once per
+    ``GENERATION_COALESCE_SECONDS`` per tenant — and readers simply stop
+    finding the old keys, which expire on their TTL.  No key scan is needed.
     """
     
+    SPAN_DERIVED_OPERATIONS = frozenset({"dashboard_overview", "architecture_map"})
+    GENERATION_COALESCE_SECONDS = 1.0
+    
     def __init__(self, redis_url: Optional[str] = None, ttl_seconds: int = 300):
         self.ttl_seconds = ttl_seconds
+        self._gen_lock = threading.Lock()
+        # tenant_id -> (generation, read at) — re-read at most once per window
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        # tenant_id -> time of the last INCR, and tenants with a bump deferred
+        self._last_bump: Dict[str, float] = {}
+        self._pending_bumps: Set[str] = set()
         
         # Try to use Redis first
         if redis_url and REDIS_AVAILABLE:
@@ -220,11 +282,60 @@ class CacheManager:
     
     def _generate_key(self, tenant_id: str, operation: str, **kwargs) -> str:
         """Generate cache key with namespace"""
+        base = f"nexarch:{tenant_id}:{operation}"
+        if operation in self.SPAN_DERIVED_OPERATIONS:
+            base = f"{base}:g{self._generation(tenant_id)}"
         if kwargs:
             params = json.dumps(kwargs, sort_keys=True)
             hash_suffix = hashlib.md5(params.encode()).hexdigest()[:8]
-            return f"nexarch:{tenant_id}:{operation}:{hash_suffix}"
-        return f"nexarch:{tenant_id}:{operation}"
+            return f"{base}:{hash_suffix}"
+        return base
+    
+    def _generation(self, tenant_id: str) -> int:
+        """Tenant's current data generation (cached locally for up to the coalesce window)"""
+        self._flush_pending_bumps()
+        now = time.monotonic()
+        cached = self._generations.get(tenant_id)
+        if cached and now - cached[1] < self.GENERATION_COALESCE_SECONDS:
+            return cached[0]
+        generation = self.backend.get_counter(f"nexarch:gen:{tenant_id}")
+        self._generations[tenant_id] = (generation, now)
+        return generation
+    
+    def bump_generation(self, tenant_id: str):
+        """
+        Mark the tenant's span-derived results stale (call after ingest).
+        Bumps closer together than the coalesce window are deferred and
+        applied by the next cache call once the window has passed.
+        """
+        now = time.monotonic()
+        with self._gen_lock:
+            if now - self._last_bump.get(tenant_id, 0.0) < self.GENERATION_COALESCE_SECONDS:
+                self._pending_bumps.add(tenant_id)
+                return
+            self._last_bump[tenant_id] = now
+            self._pending_bumps.discard(tenant_id)
+        self._incr_generation(tenant_id, now)
+        self._flush_pending_bumps()
+    
+    def _incr_generation(self, tenant_id: str, now: float):
+        generation = self.backend.incr(f"nexarch:gen:{tenant_id}")
+        self._generations[tenant_id] = (generation, now)
+    
+    def _flush_pending_bumps(self):
+        if not self._pending_bumps:
+            return
+        now = time.monotonic()
+        with self._gen_lock:
+            due = [
+                t for t in self._pending_bumps
+                if now - self._last_bump.get(t, 0.0) >= self.GENERATION_COALESCE_SECONDS
+            ]
+            for tenant_id in due:
+                self._pending_bumps.discard(tenant_id)
+                self._last_bump[tenant_id] = now
+        for tenant_id in due:
+            self._incr_generation(tenant_id, now)
     
     def get(self, tenant_id: str, operation: str, **kwargs) -> Optional[Any]:
         """Get from cache"""
@@ -238,6 +349,15 @@ class CacheManager:
     
     def invalidate(self, tenant_id: str, operation: Optional[str] = None):
         """Invalidate cache for tenant (or specific operation)"""
+        if operation in self.SPAN_DERIVED_OPERATIONS:
+            # Moving to a new generation orphans every variant of the key
+            now = time.monotonic()
+            with self._gen_lock:
+                self._last_bump[tenant_id] = now
+                self._pending_bumps.discard(tenant_id)
+            self._incr_generation(tenant_id, now)
+            logger.info(f"Invalidated cache for tenant {tenant_id}, operation: {operation}")
+            return
         if operation:
             pattern = f"nexarch:{tenant_id}:{operation}*"
         else:
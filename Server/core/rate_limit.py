@@ -1,58 +1,213 @@
 """Rate limiting middleware"""
-from fastapi import Request, HTTPException
+from fastapi import Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Dict
-from datetime import datetime, timedelta
-from collections import defaultdict
-import asyncio
+from typing import Dict, Optional, Tuple
+import threading
+import time
+
+from core.cache import get_cache_manager
+from core.config import get_settings
+from core.logging import get_logger
+from db.threadpool import run_db
+
+logger = get_logger(__name__)
+
+# Never rate limited
+_EXEMPT_PATHS = frozenset(("/health", "/", "/docs", "/openapi.json"))
+# Span ingest is bounded by the daily span quota and ingest backpressure
+# instead: SDKs that send one span per request would hit a request limit
+# long before any real overload
+_EXEMPT_PREFIXES = ("/api/v1/ingest",)
+
+# Token bucket per tenant, refilled continuously at limit/60 tokens per second
+# with a capacity of one minute's worth.  The whole check-and-take runs inside
+# Redis so every worker shares the same bucket.
+#   KEYS[1] bucket hash   ARGV[1] limit per minute   ARGV[2] cost
+# Returns {allowed (0/1), tokens left, ms until one more token}
+_TOKEN_BUCKET_LUA = """
+redis.replicate_commands()  -- TIME before writes (no-op on Redis 7+)
+local capacity = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local rate = capacity / 60000.0
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+
+local wait = 0
+if tokens < 1 then
+  wait = math.ceil((1 - tokens) / rate)
+end
+return {allowed, math.floor(tokens), wait}
+"""
 
 
 class RateLimiter:
-    """Simple in-memory rate limiter (use Redis in production)"""
-    
+    """
+    O(1) token-bucket limiter: one atomic Lua script in Redis when the cache
+    is Redis-backed, an in-process bucket per tenant otherwise (or if Redis
+    errors).
+    """
+
+    KEY_PREFIX = "nexarch:ratelimit:"
+
     def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.lock = asyncio.Lock()
-    
-    async def is_allowed(self, tenant_id: str, max_requests: int = 1000, window_seconds: int = 60) -> bool:
-        """Check if request is allowed within rate limit"""
-        async with self.lock:
-            now = datetime.utcnow()
-            window_start = now - timedelta(seconds=window_seconds)
-            
-            # Clean old requests
-            self.requests[tenant_id] = [
-                req_time for req_time in self.requests[tenant_id]
-                if req_time > window_start
-            ]
-            
-            # Check limit
-            if len(self.requests[tenant_id]) >= max_requests:
-                return False
-            
-            # Add current request
-            self.requests[tenant_id].append(now)
-            return True
+        self._lock = threading.Lock()
+        # tenant_id -> [tokens, last refill (monotonic)]
+        self._buckets: Dict[str, list] = {}
+        self._script = None
+        self._script_client = None
+
+    def check(self, tenant_id: str, limit_per_minute: int, cost: int = 1) -> Tuple[bool, int, float]:
+        """
+        Take ``cost`` tokens from the tenant's bucket.
+
+        Returns (allowed, tokens remaining, seconds until the next token).
+        Blocks on a Redis round trip when Redis-backed; use :meth:`acheck`
+        from the event loop.
+        """
+        script = self._redis_script()
+        if script is not None:
+            try:
+                allowed, remaining, wait_ms = script(
+                    keys=[self.KEY_PREFIX + tenant_id], args=[limit_per_minute, cost]
+                )
+                return bool(allowed), int(remaining), int(wait_ms) / 1000
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed, using local bucket: {e}")
+        return self._check_local(tenant_id, limit_per_minute, cost)
+
+    async def acheck(self, tenant_id: str, limit_per_minute: int, cost: int = 1) -> Tuple[bool, int, float]:
+        """:meth:`check` for the event loop: the Redis script runs on the database thread pool."""
+        if self._redis_script() is None:
+            return self._check_local(tenant_id, limit_per_minute, cost)
+        return await run_db(self.check, tenant_id, limit_per_minute, cost)
+
+    def _redis_script(self):
+        cache = get_cache_manager()
+        client = cache.backend.redis_client if cache.is_redis() else None
+        if client is None:
+            return None
+        if self._script_client is not client:
+            self._script = client.register_script(_TOKEN_BUCKET_LUA)
+            self._script_client = client
+        return self._script
+
+    def _check_local(self, tenant_id: str, capacity: int, cost: int) -> Tuple[bool, int, float]:
+        rate = capacity / 60
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(tenant_id)
+            if bucket is None:
+                bucket = self._buckets[tenant_id] = [float(capacity), now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            bucket[0], bucket[1] = tokens, now
+        wait = (1 - tokens) / rate if tokens < 1 else 0.0
+        return allowed, int(tokens), wait
 
 
 rate_limiter = RateLimiter()
 
 
+def _lookup_api_key(api_key: str) -> Optional[Tuple[str, bool]]:
+    """API key cache miss: one indexed query (blocking — run it with ``run_db``)."""
+    from core.auth_cache import get_api_key_cache
+    from db.base import SessionLocal
+    db = SessionLocal()
+    try:
+        return get_api_key_cache().resolve(db, api_key)
+    finally:
+        db.close()
+
+
+async def _resolve_tenant(request: Request) -> Optional[str]:
+    """
+    Tenant for this request from the auth caches, without doing the full
+    auth work.  API keys resolve from the API key cache; a miss is looked up
+    on the database thread pool, never on the event loop.  Bearer tokens
+    only resolve once the auth dependency has verified and cached them, so
+    a token's first request is not counted.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        from core.auth_cache import MISS, get_api_key_cache
+        resolved = get_api_key_cache().peek(api_key)
+        if resolved is MISS:
+            resolved = await run_db(_lookup_api_key, api_key)
+        return resolved[0] if resolved and resolved[1] else None
+
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        from core.auth_cache import get_token_cache
+        cached = get_token_cache().get(authorization[7:].strip())
+        return cached[1] if cached else None
+    return None
+
+
+async def _tenant_limit(tenant_id: str) -> int:
+    """Requests per minute for the tenant; a cache miss is read on the database thread pool."""
+    from core.auth_cache import MISS, get_tenant_cache
+    cache = get_tenant_cache()
+    limits = cache.peek(tenant_id)
+    if limits is MISS:
+        limits = await run_db(cache.get, tenant_id)
+    if limits and limits.rate_limit_per_minute:
+        return limits.rate_limit_per_minute
+    return get_settings().RATE_LIMIT_PER_MINUTE
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware per tenant"""
-    
+
     async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/", "/docs", "/openapi.json"]:
+        path = request.url.path
+        if (
+            not get_settings().ENABLE_RATE_LIMITING
+            or path in _EXEMPT_PATHS
+            or path.startswith(_EXEMPT_PREFIXES)
+        ):
+            return await call_next(request)
+
+        try:
+            tenant_id = await _resolve_tenant(request)
+        except Exception as e:
+            logger.warning(f"Rate limit tenant lookup failed: {e}")
+            tenant_id = None
+
+        if not tenant_id:
             return await call_next(request)
-        
-        # Get tenant_id from request state (set by auth middleware)
-        tenant_id = getattr(request.state, "tenant_id", None)
-        
-        if tenant_id:
-            allowed = await rate_limiter.is_allowed(tenant_id, max_requests=1000, window_seconds=60)
-            if not allowed:
-                raise HTTPException(status_code=429, detail="Rate limit exceeded")
-        
+
+        limit = await _tenant_limit(tenant_id)
+        allowed, remaining, wait = await rate_limiter.acheck(tenant_id, limit)
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(wait + 0.999)),  # seconds until the next request is allowed
+        }
+        if not allowed:
+            headers["Retry-After"] = str(max(1, int(wait + 0.999)))
+            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=headers)
+
+        request.state.tenant_id = tenant_id
         response = await call_next(request)
+        response.headers.update(headers)
         return response
@@ -0,0 +1,313 @@
+"""
+Parquet cold tier for old spans.
+
+With ``ARCHIVE_ENABLED``, spans older than ``ARCHIVE_AFTER_DAYS`` move out of
+the ``spans`` table into one Parquet file per tenant per UTC day:
+
+    <ARCHIVE_DIR>/tenant_id=<tenant>/date=<YYYY-MM-DD>/spans.parquet
+
+Rows are written sorted by ``(service_name, start_time)`` in compressed row
+groups, so the min/max statistics of each row group let readers skip most of
+a file for service or time filters, and the directory layout lets a query
+open only the files of one tenant and date range.
+
+A day is archived file first: the file is written under a temporary name and
+renamed into place, and only then are the archived rows deleted — by span
+ID, so a row that committed while the day was being copied is never
+deleted without having been written.  Spans that
+arrive for an archived day later stay in ``spans`` until the next run, which
+appends them to the existing file (skipping span IDs already in it), so a
+rerun after a crash never duplicates spans.
+
+Reads go through ``scan_archive``: DuckDB when it is installed, otherwise
+``pyarrow.dataset``, both pushing the filters down to the Parquet reader.
+Hourly rollups outlive the archived rows, so dashboards keep their history
+without touching Parquet; the cold tier serves raw-span reads such as
+rollup rebuilds.
+
+pyarrow is required to archive (``pip install pyarrow``); DuckDB is optional
+(``pip install duckdb``).
+"""
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import quote, unquote
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.locks import maintenance_lock
+from db.models import Span
+
+logger = get_logger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = pads = pq = None  # type: ignore
+    PYARROW_AVAILABLE = False
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    duckdb = None  # type: ignore
+    DUCKDB_AVAILABLE = False
+
+ARCHIVE_COLUMNS = (
+    "trace_id", "span_id", "parent_span_id", "service_name", "operation", "kind",
+    "start_time", "end_time", "latency_ms", "status_code", "error", "downstream",
+)
+_FILE_NAME = "spans.parquet"
+_ROW_GROUP_SIZE = 100_000
+# span_ids per DELETE ... IN (...) statement
+_DELETE_CHUNK = 1_000
+# How often the archive task looks for days to move
+MAINTENANCE_INTERVAL_SECONDS = 3600
+
+
+def _schema():
+    return pa.schema([
+        ("trace_id", pa.string()),
+        ("span_id", pa.string()),
+        ("parent_span_id", pa.string()),
+        ("service_name", pa.string()),
+        ("operation", pa.string()),
+        ("kind", pa.string()),
+        ("start_time", pa.timestamp("us")),
+        ("end_time", pa.timestamp("us")),
+        ("latency_ms", pa.float64()),
+        ("status_code", pa.int32()),
+        ("error", pa.string()),
+        ("downstream", pa.string()),
+    ])
+
+
+def _tenant_dir(root: str, tenant_id: str) -> str:
+    return os.path.join(root, f"tenant_id={quote(tenant_id, safe='')}")
+
+
+def day_path(root: str, tenant_id: str, day: date) -> str:
+    """Parquet file holding one tenant's spans for one UTC day."""
+    return os.path.join(_tenant_dir(root, tenant_id), f"date={day.isoformat()}", _FILE_NAME)
+
+
+def archived_tenants(root: str) -> List[str]:
+    """Tenants with at least one archived day under *root*."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        unquote(name[len("tenant_id="):])
+        for name in os.listdir(root)
+        if name.startswith("tenant_id=")
+    )
+
+
+def archived_files(
+    root: str, tenant_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> List[str]:
+    """Archive files of *tenant_id* whose day overlaps ``[start, end)``."""
+    return list(archived_days(root, tenant_id, start, end).values())
+
+
+def archived_days(
+    root: str, tenant_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> Dict[date, str]:
+    """Archived days of *tenant_id* overlapping ``[start, end)``, mapped to their files."""
+    tenant_dir = _tenant_dir(root, tenant_id)
+    if not os.path.isdir(tenant_dir):
+        return {}
+    files = {}
+    for name in sorted(os.listdir(tenant_dir)):
+        if not name.startswith("date="):
+            continue
+        try:
+            day = date.fromisoformat(name[len("date="):])
+        except ValueError:
+            continue
+        if start is not None and day < start.date():
+            continue
+        if end is not None and datetime.combine(day, time.min) >= end:
+            continue
+        path = os.path.join(tenant_dir, name, _FILE_NAME)
+        if os.path.exists(path):
+            files[day] = path
+    return files
+
+
+def _to_table(rows: List[Any]):
+    return pa.table(
+        {column: [getattr(row, column) for row in rows] for column in ARCHIVE_COLUMNS},
+        schema=_schema(),
+    )
+
+
+def archive_tenant_day(db: Session, root: str, tenant_id: str, day: date, compression: str = "zstd") -> int:
+    """Move one tenant's spans for *day* into its Parquet file; returns spans moved."""
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+
+    path = day_path(root, tenant_id, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+
+    moved = 0
+    writer = pq.ParquetWriter(tmp, _schema(), compression=compression)
+    try:
+        archived_ids = set()
+        # Live rows now in the file: copied here or by an earlier run
+        in_file = set()
+        if os.path.exists(path):
+            existing = pq.read_table(path)
+            archived_ids = set(existing.column("span_id").to_pylist())
+            writer.write_table(existing, row_group_size=_ROW_GROUP_SIZE)
+
+        rows = (
+            db.query(*(getattr(Span, column) for column in ARCHIVE_COLUMNS))
+            .filter(Span.tenant_id == tenant_id, Span.start_time >= start, Span.start_time < end)
+            .order_by(Span.service_name, Span.start_time)
+        )
+        batch: List[Any] = []
+        for row in rows.yield_per(_ROW_GROUP_SIZE):
+            in_file.add(row.span_id)
+            if row.span_id in archived_ids:
+                continue
+            batch.append(row)
+            if len(batch) >= _ROW_GROUP_SIZE:
+                writer.write_table(_to_table(batch))
+                moved += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(_to_table(batch))
+            moved += len(batch)
+        writer.close()
+    except Exception:
+        writer.close()
+        os.remove(tmp)
+        raise
+
+    if moved:
+        os.replace(tmp, path)
+    else:
+        os.remove(tmp)
+
+    # Delete exactly the rows now in the file: rows inserted while the copy
+    # ran may have committed after the query's snapshot, with an earlier
+    # created_at, so no timestamp can tell which ones were copied
+    in_file = list(in_file)
+    deleted = 0
+    for i in range(0, len(in_file), _DELETE_CHUNK):
+        deleted += db.query(Span).filter(
+            Span.tenant_id == tenant_id,
+            Span.start_time >= start,
+            Span.start_time < end,
+            Span.span_id.in_(in_file[i:i + _DELETE_CHUNK]),
+        ).delete(synchronize_session=False)
+    db.commit()
+    if moved or deleted:
+        logger.info(f"[Archive] {tenant_id} {day.isoformat()}: wrote {moved} spans, deleted {deleted} rows")
+    return moved
+
+
+def run_archive(db: Session) -> Dict[str, Any]:
+    """Archive every tenant-day older than ``ARCHIVE_AFTER_DAYS`` still in ``spans``."""
+    settings = get_settings()
+    if not PYARROW_AVAILABLE:
+        return {"archived": False, "reason": "pyarrow is not installed"}
+
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=settings.ARCHIVE_AFTER_DAYS), time.min)
+    oldest = (
+        db.query(Span.tenant_id, func.min(Span.start_time))
+        .filter(Span.start_time < cutoff)
+        .group_by(Span.tenant_id)
+        .all()
+    )
+
+    moved = 0
+    days = 0
+    for tenant_id, first in oldest:
+        day = first.date()
+        while day < cutoff.date():
+            moved += archive_tenant_day(db, settings.ARCHIVE_DIR, tenant_id, day, settings.ARCHIVE_COMPRESSION)
+            days += 1
+            day += timedelta(days=1)
+    return {"archived": True, "tenants": len(oldest), "days": days, "spans": moved}
+
+
+def scan_archive(
+    tenant_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Sequence[str] = ARCHIVE_COLUMNS,
+    root: Optional[str] = None,
+    **filters: Any,
+):
+    """
+    Archived spans of one tenant as a ``pyarrow.Table``.
+
+    Only files for days overlapping ``[start, end)`` are opened; the time
+    range and *filters* (column equality, e.g. ``service_name="checkout"``)
+    are pushed down to the Parquet reader.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required to read the span archive")
+    unknown = set(columns).union(filters) - set(ARCHIVE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown archive columns: {sorted(unknown)}")
+
+    files = archived_files(root or get_settings().ARCHIVE_DIR, tenant_id, start, end)
+    if not files:
+        return _schema().empty_table().select(list(columns))
+
+    if DUCKDB_AVAILABLE:
+        where, params = [], []
+        if start is not None:
+            where.append("start_time >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("start_time < ?")
+            params.append(end)
+        for column, value in filters.items():
+            where.append(f"{column} = ?")
+            params.append(value)
+        sql = f"SELECT {', '.join(columns)} FROM read_parquet(?)"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with duckdb.connect() as conn:
+            return conn.execute(sql, [files, *params]).fetch_arrow_table()
+
+    condition = None
+    terms = []
+    if start is not None:
+        terms.append(pads.field("start_time") >= pa.scalar(start, pa.timestamp("us")))
+    if end is not None:
+        terms.append(pads.field("start_time") < pa.scalar(end, pa.timestamp("us")))
+    terms.extend(pads.field(column) == value for column, value in filters.items())
+    for term in terms:
+        condition = term if condition is None else condition & term
+    return pads.dataset(files, format="parquet").to_table(columns=list(columns), filter=condition)
+
+
+async def archive_loop(session_factory) -> None:
+    """Lifespan task: archive eligible days now and then every hour (one worker at a time)."""
+    def _run() -> None:
+        db = session_factory()
+        try:
+            with maintenance_lock(db.get_bind(), "archive") as held:
+                if held:
+                    run_archive(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            await asyncio.to_thread(_run)
+        except Exception as e:
+            logger.error(f"[Archive] Run failed: {e}")
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
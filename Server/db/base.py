@@ -1,16 +1,57 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from core.config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(
+
+def _make_engine(
+    url: str, pool_size: int, max_overflow: int, pool_timeout: float, statement_timeout_ms: int
+) -> Engine:
+    """Engine with its own connection pool and, on PostgreSQL, a statement timeout."""
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    connect_args: Dict[str, Any] = {}
+    if statement_timeout_ms > 0 and url.startswith(("postgresql", "postgres")):
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+
+# Writer: ingest, auth, admin — everything that must see its own writes
+engine = _make_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+    settings.DB_POOL_TIMEOUT,
+    settings.DB_STATEMENT_TIMEOUT_MS,
+)
+
+# Reader: dashboard, graph, trends and MCP queries.  Goes to the replica when
+# DATABASE_READ_URL is set, else to the primary through a separate pool, so
+# heavy reads never take connections ingest is waiting for.
+read_engine = _make_engine(
+    settings.DATABASE_READ_URL or settings.DATABASE_URL,
+    settings.DB_READ_POOL_SIZE,
+    settings.DB_READ_MAX_OVERFLOW,
+    settings.DB_READ_POOL_TIMEOUT,
+    settings.DB_READ_STATEMENT_TIMEOUT_MS,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
@@ -21,3 +62,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for read-only endpoints (replica or read pool); never commit on it."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ── Pool metrics ────────────────────────────────────────────────────────────
+
+_pool_counters: Dict[str, Dict[str, int]] = {}
+
+
+def _watch_pool(role: str, watched: Engine) -> None:
+    """Count checkouts, the busiest moment, and checkouts that left the pool full."""
+    counters = _pool_counters[role] = {"checkouts": 0, "peak_checked_out": 0, "saturated_checkouts": 0}
+    pool = watched.pool
+
+    @event.listens_for(watched, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        counters["peak_checked_out"] = max(counters["peak_checked_out"], checked_out)
+        capacity = _capacity(pool)
+        if capacity and checked_out >= capacity:
+            counters["saturated_checkouts"] += 1
+
+
+def _capacity(pool) -> Optional[int]:
+    if not hasattr(pool, "size") or not hasattr(pool, "_max_overflow"):
+        return None
+    if pool._max_overflow < 0:  # unlimited overflow
+        return None
+    return pool.size() + pool._max_overflow
+
+
+_watch_pool("write", engine)
+_watch_pool("read", read_engine)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Per-role pool gauges and counters, for the health endpoint."""
+    stats: Dict[str, Any] = {}
+    for role, watched in (("write", engine), ("read", read_engine)):
+        pool = watched.pool
+        role_stats: Dict[str, Any] = {"pool": type(pool).__name__, **_pool_counters.get(role, {})}
+        if hasattr(pool, "checkedout"):
+            capacity = _capacity(pool)
+            checked_out = pool.checkedout()
+            role_stats.update({
+                "size": pool.size(),
+                "capacity": capacity,
+                "checked_out": checked_out,
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "utilization": round(checked_out / capacity, 3) if capacity else None,
+            })
+        stats[role] = role_stats
+    stats["replica"] = bool(settings.DATABASE_READ_URL)
+    return stats
@@ -0,0 +1,86 @@
+"""
+Cross-worker locks for background maintenance.
+
+Every uvicorn/gunicorn worker runs the lifespan, so each one starts its own
+archive, rollup and partition maintenance loop.  Two workers archiving the
+same day, or pruning and rebuilding at once, would race on the same rows and
+files.  ``maintenance_lock`` lets one worker at a time run a job; the others
+skip that round and try again on their next tick.
+
+  * PostgreSQL — a session-level advisory lock (``pg_try_advisory_lock``)
+    held on a dedicated connection for the length of the job, so it covers
+    workers on every host and is released if the holder dies
+  * other databases — an ``fcntl`` lock on a file in the temp directory,
+    which covers the workers of one host (SQLite is single-host anyway)
+
+The lock is never waited for: a worker that does not get it skips the job.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    FCNTL_AVAILABLE = False
+
+
+def _lock_key(engine: Engine, name: str) -> bytes:
+    return hashlib.blake2b(f"{engine.url.render_as_string(hide_password=True)}|{name}".encode(), digest_size=8).digest()
+
+
+@contextmanager
+def _advisory_lock(engine: Engine, name: str) -> Iterator[bool]:
+    key = int.from_bytes(_lock_key(engine, name), "big", signed=True)
+    with engine.connect() as conn:
+        acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+        conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    conn.commit()
+                except Exception as e:
+                    # Never hand a connection that may still hold the lock back to the pool
+                    logger.error(f"[Locks] Could not release {name}: {e}")
+                    conn.invalidate()
+
+
+@contextmanager
+def _file_lock(engine: Engine, name: str) -> Iterator[bool]:
+    if not FCNTL_AVAILABLE:
+        yield True
+        return
+    path = os.path.join(tempfile.gettempdir(), f"nexarch-{_lock_key(engine, name).hex()}.lock")
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@contextmanager
+def maintenance_lock(engine: Engine, name: str) -> Iterator[bool]:
+    """Try to take the lock *name*; yields whether this worker holds it (never waits)."""
+    lock = _advisory_lock if engine.dialect.name == "postgresql" else _file_lock
+    with lock(engine, name) as acquired:
+        if not acquired:
+            logger.debug(f"[Locks] {name} is running in another worker, skipping")
+        yield acquired
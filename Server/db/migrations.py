@@ -0,0 +1,129 @@
+"""
+Additive schema upgrades for existing databases.
+
+``Base.metadata.create_all`` creates missing tables but never alters
+existing ones.  Columns added to models after a table was first created are
+listed here and added at startup if the table does not have them yet.
+Only nullable columns belong in this list — anything else needs a real
+migration.
+
+Indexes added later are created the same way — on PostgreSQL with
+``CREATE INDEX CONCURRENTLY``, so a large table is not locked while the
+server boots.  Before a unique index is built, rows that would violate it
+are deleted (the oldest row of each key, lowest ``id``, is kept).  If a
+unique index still cannot be built, startup fails: the code relies on it
+(e.g. ``ON CONFLICT DO NOTHING`` for span dedup) and must not run without.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Engine
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# (table, column, column DDL)
+ADDED_COLUMNS: List[Tuple[str, str, str]] = [
+    ("tenants", "rate_limit_per_minute", "INTEGER"),
+]
+
+# (table, index, columns, unique)
+ADDED_INDEXES: List[Tuple[str, str, Tuple[str, ...], bool]] = [
+    ("spans", "uq_tenant_span", ("tenant_id", "span_id"), True),
+]
+
+# Attempts at a unique index; rows written between cleanup and build can break one
+_UNIQUE_INDEX_ATTEMPTS = 2
+
+
+def apply_additive_migrations(engine: Engine) -> None:
+    """Add any missing columns from ``ADDED_COLUMNS`` and indexes from ``ADDED_INDEXES``."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    for table, column, ddl in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column in existing:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        logger.info(f"Added column {table}.{column}")
+
+    for table, index, columns, unique in ADDED_INDEXES:
+        if table not in tables:
+            continue
+        if index in {i["name"] for i in inspector.get_indexes(table)} and _index_valid(engine, index):
+            continue
+        if unique:
+            _create_unique_index(engine, table, index, columns)
+        else:
+            _create_index(engine, table, index, columns, unique=False)
+
+
+def _index_valid(engine: Engine, index: str) -> bool:
+    """False for an index a failed ``CREATE INDEX CONCURRENTLY`` left behind (PostgreSQL)."""
+    if engine.dialect.name != "postgresql":
+        return True
+    with engine.connect() as conn:
+        valid = conn.execute(
+            text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+            {"name": index},
+        ).scalar()
+    return valid is None or bool(valid)
+
+
+def _create_index(engine: Engine, table: str, index: str, columns: Tuple[str, ...], unique: bool) -> None:
+    """Build one index; concurrently (no table lock) on PostgreSQL."""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cols = ", ".join(columns)
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY cannot run in a transaction; a failed build leaves an
+        # invalid index behind, which is dropped before the next attempt
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index}"))
+            conn.execute(text(f"CREATE {kind} CONCURRENTLY {index} ON {table} ({cols})"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {kind} IF NOT EXISTS {index} ON {table} ({cols})"))
+    logger.info(f"Created index {index} on {table}")
+
+
+def _delete_duplicates(engine: Engine, table: str, columns: Tuple[str, ...]) -> int:
+    """Delete rows repeating *columns*, keeping the one with the lowest id; returns rows deleted."""
+    match = " AND ".join(f"d.{c} = {table}.{c}" for c in columns)
+    with engine.begin() as conn:
+        result = conn.execute(text(
+            f"DELETE FROM {table} WHERE EXISTS "
+            f"(SELECT 1 FROM {table} AS d WHERE {match} AND d.id < {table}.id)"
+        ))
+    return result.rowcount or 0
+
+
+def _create_unique_index(engine: Engine, table: str, index: str, columns: Tuple[str, ...]) -> None:
+    """Remove duplicates, then build the unique index; raises if it cannot be built."""
+    error: Exception = RuntimeError("no attempt made")
+    for _ in range(_UNIQUE_INDEX_ATTEMPTS):
+        deleted = _delete_duplicates(engine, table, columns)
+        if deleted:
+            logger.warning(
+                f"Deleted {deleted} duplicate rows from {table} on ({', '.join(columns)}) "
+                f"before creating {index}"
+            )
+            if table == "spans":
+                logger.warning(
+                    "Span rollups may still count the deleted duplicates; rebuild them with "
+                    "POST /api/v1/admin/tenants/{tenant_id}/rollups/rebuild"
+                )
+        try:
+            _create_index(engine, table, index, columns, unique=True)
+            return
+        except SQLAlchemyError as e:
+            error = e
+            logger.warning(f"Could not create unique index {index} on {table}, retrying: {e}")
+    raise RuntimeError(
+        f"Could not create unique index {index} on {table} ({', '.join(columns)}): {error}. "
+        f"Remove the duplicate rows by hand and restart."
+    )
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, Index, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime, Text, Index, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from core.config import get_settings
 from db.base import Base
 
+# PostgreSQL only: spans range-partitioned by day on start_time (see db/partitioning.py).
+# Partition keys must be part of every unique index, hence the conditional columns below.
+SPANS_PARTITIONED = (
+    get_settings().SPANS_PARTITIONING_ENABLED
+    and get_settings().DATABASE_URL.startswith(("postgresql", "postgres"))
+)
+
 
 class Tenant(Base):
     """Tenant/Organization table"""
@@ -13,6 +21,7 @@ class Tenant(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     max_spans_per_day = Column(Integer, default=1000000)
+    rate_limit_per_minute = Column(Integer, nullable=True)  # None = RATE_LIMIT_PER_MINUTE
     
     # Relationships
     users = relationship("User", back_populates="tenant")
@@ -72,7 +81,7 @@ class APIKey(Base):
 class Span(Base):
     __tablename__ = "spans"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger if SPANS_PARTITIONED else Integer, primary_key=True, index=True, autoincrement=True)
     tenant_id = Column(String(64), ForeignKey("tenants.id"), nullable=False, index=True)
     trace_id = Column(String(64), nullable=False, index=True)
     span_id = Column(String(64), nullable=False, index=True)
@@ -80,7 +89,7 @@ class Span(Base):
     service_name = Column(String(255), nullable=False, index=True)
     operation = Column(String(255), nullable=False)
     kind = Column(String(32), nullable=False)
-    start_time = Column(DateTime, nullable=False, index=True)
+    start_time = Column(DateTime, nullable=False, index=True, primary_key=SPANS_PARTITIONED)
     end_time = Column(DateTime, nullable=False)
     latency_ms = Column(Float, nullable=False)
     status_code = Column(Integer, nullable=True)
@@ -95,6 +104,65 @@ class Span(Base):
         Index('idx_tenant_trace', 'tenant_id', 'trace_id'),
         Index('idx_tenant_service', 'tenant_id', 'service_name', 'start_time'),
         Index('idx_tenant_time', 'tenant_id', 'start_time'),
+        Index(  # ingest dedup
+            'uq_tenant_span', 'tenant_id', 'span_id',
+            *(['start_time'] if SPANS_PARTITIONED else []), unique=True,
+        ),
+        {'postgresql_partition_by': 'RANGE (start_time)'} if SPANS_PARTITIONED else {},
+    )
+
+
+# Upper bounds (ms) of the rollup latency histogram; one more open-ended bucket follows
+ROLLUP_LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ROLLUP_HISTOGRAM_COLUMNS = tuple(f"lat_le_{b}ms" for b in ROLLUP_LATENCY_BOUNDS_MS) + ("lat_gt_10000ms",)
+ROLLUP_KEY_COLUMNS = ("tenant_id", "service_name", "downstream", "operation", "bucket")
+
+
+class _SpanRollupColumns:
+    """Columns shared by the rollup tables. Every value column is additive, so rows merge by summing."""
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False)
+    service_name = Column(String(255), nullable=False)
+    downstream = Column(String(255), nullable=False, default="")  # "" = no downstream
+    operation = Column(String(255), nullable=False)
+    bucket = Column(DateTime, nullable=False)  # bucket start (UTC)
+    span_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    latency_sum = Column(Float, nullable=False, default=0.0)
+
+    # Latency histogram: span counts per ROLLUP_LATENCY_BOUNDS_MS bucket
+    lat_le_5ms = Column(Integer, nullable=False, default=0)
+    lat_le_10ms = Column(Integer, nullable=False, default=0)
+    lat_le_25ms = Column(Integer, nullable=False, default=0)
+    lat_le_50ms = Column(Integer, nullable=False, default=0)
+    lat_le_100ms = Column(Integer, nullable=False, default=0)
+    lat_le_250ms = Column(Integer, nullable=False, default=0)
+    lat_le_500ms = Column(Integer, nullable=False, default=0)
+    lat_le_1000ms = Column(Integer, nullable=False, default=0)
+    lat_le_2500ms = Column(Integer, nullable=False, default=0)
+    lat_le_5000ms = Column(Integer, nullable=False, default=0)
+    lat_le_10000ms = Column(Integer, nullable=False, default=0)
+    lat_gt_10000ms = Column(Integer, nullable=False, default=0)
+
+
+class SpanRollupMinute(_SpanRollupColumns, Base):
+    """Per-minute span aggregates (see services/rollup_service.py)"""
+    __tablename__ = "span_rollups_1m"
+
+    __table_args__ = (
+        Index('uq_rollup_1m_key', *ROLLUP_KEY_COLUMNS, unique=True),
+        Index('idx_rollup_1m_tenant_bucket', 'tenant_id', 'bucket'),
+    )
+
+
+class SpanRollupHour(_SpanRollupColumns, Base):
+    """Per-hour span aggregates (see services/rollup_service.py)"""
+    __tablename__ = "span_rollups_1h"
+
+    __table_args__ = (
+        Index('uq_rollup_1h_key', *ROLLUP_KEY_COLUMNS, unique=True),
+        Index('idx_rollup_1h_tenant_bucket', 'tenant_id', 'bucket'),
     )
 
 
@@ -0,0 +1,147 @@
+"""
+Daily range partitions for the spans table (PostgreSQL only).
+
+With ``SPANS_PARTITIONING_ENABLED`` on a fresh PostgreSQL database,
+``create_all`` creates ``spans`` as ``PARTITION BY RANGE (start_time)`` (see
+``db.models.SPANS_PARTITIONED``).  This module keeps it usable:
+
+  * ``spans_pYYYYMMDD`` partitions are created ``SPANS_PARTITION_PREMAKE_DAYS``
+    ahead, plus ``spans_default`` for spans outside every daily range
+    (clock skew, late arrivals), so inserts never fail
+  * retention detaches partitions older than ``SPANS_RETENTION_DAYS`` and,
+    in ``drop`` mode, drops them — one catalog operation instead of a
+    multi-million-row DELETE followed by vacuum
+
+Queries filtering on ``start_time`` are pruned to the matching partitions
+by the planner.  An existing unpartitioned ``spans`` table is left alone;
+converting it needs a copy into a new partitioned table.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.locks import maintenance_lock
+
+logger = get_logger(__name__)
+
+_PARENT = "spans"
+_PREFIX = "spans_p"
+_DEFAULT = "spans_default"
+# How often the maintenance task re-checks partitions and retention
+MAINTENANCE_INTERVAL_SECONDS = 3600
+
+
+def _partition_name(day: date) -> str:
+    return f"{_PREFIX}{day:%Y%m%d}"
+
+
+def is_partitioned(engine: Engine) -> bool:
+    """True if ``spans`` is a partitioned table on this database."""
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.connect() as conn:
+        return bool(conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :name AND c.relnamespace = 'public'::regnamespace"
+        ), {"name": _PARENT}).first())
+
+
+def list_partitions(engine: Engine) -> List[str]:
+    """Names of the partitions currently attached to ``spans``."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :name ORDER BY c.relname"
+        ), {"name": _PARENT})
+        return [row[0] for row in rows]
+
+
+def ensure_partitions(engine: Engine, days_ahead: int, today: date = None) -> List[str]:
+    """Create missing daily partitions from yesterday to ``today + days_ahead``."""
+    today = today or datetime.utcnow().date()
+    existing = set(list_partitions(engine))
+    created: List[str] = []
+
+    if _DEFAULT not in existing:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {_DEFAULT} PARTITION OF {_PARENT} DEFAULT"))
+        created.append(_DEFAULT)
+
+    for offset in range(-1, days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = _partition_name(day)
+        if name in existing:
+            continue
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {_PARENT} "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                ))
+            created.append(name)
+        except Exception as e:
+            # Typically rows for that day already sit in the default partition
+            logger.warning(f"[Partitions] Could not create {name}: {e}")
+
+    if created:
+        logger.info(f"[Partitions] Created {', '.join(created)}")
+    return created
+
+
+def apply_retention(engine: Engine, retention_days: int, mode: str = "drop", today: date = None) -> List[str]:
+    """Detach (and in ``drop`` mode, drop) daily partitions older than the retention window."""
+    if retention_days <= 0:
+        return []
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+    removed: List[str] = []
+
+    for name in list_partitions(engine):
+        if not name.startswith(_PREFIX):
+            continue
+        try:
+            day = datetime.strptime(name[len(_PREFIX):], "%Y%m%d").date()
+        except ValueError:
+            continue
+        if day >= cutoff:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {_PARENT} DETACH PARTITION {name}"))
+            if mode == "drop":
+                conn.execute(text(f"DROP TABLE {name}"))
+        removed.append(name)
+
+    if removed:
+        verb = "Dropped" if mode == "drop" else "Detached"
+        logger.info(f"[Partitions] {verb} {', '.join(removed)} (retention {retention_days} days)")
+    return removed
+
+
+def run_partition_maintenance(engine: Engine) -> Dict[str, Any]:
+    """Pre-create upcoming partitions and apply retention once (skipped if another worker is at it)."""
+    settings = get_settings()
+    if not is_partitioned(engine):
+        return {"partitioned": False}
+    with maintenance_lock(engine, "partitions") as held:
+        if not held:
+            return {"partitioned": True, "skipped": True}
+        created = ensure_partitions(engine, settings.SPANS_PARTITION_PREMAKE_DAYS)
+        removed = apply_retention(engine, settings.SPANS_RETENTION_DAYS, settings.SPANS_RETENTION_MODE)
+    return {"partitioned": True, "created": created, "removed": removed}
+
+
+async def partition_maintenance_loop(engine: Engine) -> None:
+    """Lifespan task: repeat maintenance every hour (startup runs it synchronously first)."""
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(run_partition_maintenance, engine)
+        except Exception as e:
+            logger.error(f"[Partitions] Maintenance failed: {e}")
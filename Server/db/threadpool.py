@@ -0,0 +1,57 @@
+"""
+Bounded thread pool for synchronous database work.
+
+SQLAlchemy sessions here are synchronous, so a query made directly inside an
+``async def`` handler stalls the event loop — and every other request on the
+worker — until it returns.  Database work therefore runs on worker threads:
+
+  * handlers that only do database work are plain ``def`` functions, which
+    FastAPI already runs in its thread pool (as it does the ``get_db``
+    dependency)
+  * async code that must await something else (AI calls, request bodies)
+    wraps its queries in ``await run_db(fn, *args)``
+
+Both share AnyIO's default thread limiter, resized at startup to
+``DB_THREADPOOL_SIZE``, so the number of threads blocked on the database stays
+bounded.  Keep it at or above the capacity of the write and read pools
+combined (see db/base.py) so pooled connections are not left idle while
+requests queue for a thread.
+"""
+import functools
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import anyio.to_thread
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_limiter: Optional[Any] = None
+
+
+def configure_db_threadpool(size: int) -> None:
+    """Resize the shared thread limiter (call from the running event loop, at startup)."""
+    global _limiter
+    _limiter = anyio.to_thread.current_default_thread_limiter()
+    _limiter.total_tokens = size
+    logger.info(f"DB thread pool limited to {size} threads")
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the bounded thread pool and await the result."""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs))
+
+
+def threadpool_stats() -> Dict[str, Any]:
+    """Threads busy and tasks waiting for one, for the health endpoint."""
+    if _limiter is None:
+        return {"configured": False}
+    stats = _limiter.statistics()
+    return {
+        "configured": True,
+        "size": int(stats.total_tokens),
+        "in_use": stats.borrowed_tokens,
+        "waiting": stats.tasks_waiting,
+    }
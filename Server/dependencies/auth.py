@@ -8,7 +8,6 @@ from core.security import verify_token
 from crud.user import get_user_by_id
 from db.base import get_db
 from sqlalchemy.orm import Session
-from datetime import datetime
 
 security = HTTPBearer()
 
@@ -112,6 +111,13 @@ def get_tenant_id_from_jwt(
     """
     token = credentials.credentials
     
+    # Tokens verified earlier resolve from memory until they expire
+    from core.auth_cache import get_token_cache
+    token_cache = get_token_cache()
+    cached = token_cache.get(token)
+    if cached:
+        return cached[1]
+    
     # Verify token
     payload = verify_token(token)
     if not payload:
@@ -130,9 +136,9 @@ def get_tenant_id_from_jwt(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
+    # Get user's tenant from database
     from db.models import User
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.query(User.tenant_id).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -146,6 +152,9 @@ def get_tenant_id_from_jwt(
             detail="User has no tenant assigned"
         )
     
+    if payload.get("exp"):
+        token_cache.put(token, str(user_id), user.tenant_id, float(payload["exp"]))
+    
     return user.tenant_id
 
 
@@ -173,29 +182,30 @@ def get_tenant_id_from_api_key(
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
-    # Get API key from database
-    from db.models import APIKey
-    api_key = db.query(APIKey).filter(APIKey.key == x_api_key).first()
+    # Resolve from the in-process key cache (one indexed query on a miss)
+    from core.auth_cache import get_api_key_cache
+    key_cache = get_api_key_cache()
+    resolved = key_cache.resolve(db, x_api_key)
     
-    if not api_key:
+    if not resolved:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
-    if not api_key.is_active:
+    tenant_id, is_active = resolved
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key has been revoked",
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
-    # Update last_used timestamp
-    api_key.last_used = datetime.utcnow()
-    db.commit()
+    # last_used is written in periodic batches, not per request
+    key_cache.touch(x_api_key)
     
-    return api_key.tenant_id
+    return tenant_id
 
 
 def get_tenant_id_from_jwt_or_api_key(
@@ -2,15 +2,25 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
+from sqlalchemy import inspect
 from core.config import get_settings
 from core.logging import setup_logging, get_logger
 from core.rate_limit import RateLimitMiddleware
 from core.cache import init_cache
-from db.base import engine, Base
-from api import ingest, architecture, workflows, health, admin, dashboard, ai_design, system, cache_api, auth, api_keys
+from core.auth_cache import get_api_key_cache
+from db.base import engine, Base, SessionLocal
+from db.models import SpanRollupHour
+from db.migrations import apply_additive_migrations
+from db.archive import PYARROW_AVAILABLE, archive_loop
+from db.threadpool import configure_db_threadpool
+from db.locks import maintenance_lock
+from db.partitioning import is_partitioned, run_partition_maintenance, partition_maintenance_loop
+from api import ingest, architecture, workflows, health, admin, dashboard, ai_design, system, cache_api, auth, api_keys, traces
 from streaming.websocket import router as stream_router, get_ws_manager
 from streaming.pipeline import start_pipeline, PATHWAY_AVAILABLE
 from streaming.polling_fallback import start_fallback_broadcaster
+from services.ingest_buffer import get_ingest_buffer
+from services.rollup_service import RollupService, rollup_maintenance_loop
 
 
 
@@ -33,6 +43,9 @@ async def lifespan(app: FastAPI):
             "Set a strong secret in your .env before running in production."
         )
     
+    # Blocking DB work (sync handlers, run_db) shares one bounded thread pool
+    configure_db_threadpool(settings.DB_THREADPOOL_SIZE)
+
     # Initialize cache
     if settings.ENABLE_CACHING:
         redis_url = settings.get_redis_url()
@@ -46,7 +59,41 @@ async def lifespan(app: FastAPI):
     
     # Initialize database
     logger.info("Creating database tables")
+    rollups_existed = inspect(engine).has_table(SpanRollupHour.__tablename__)
     Base.metadata.create_all(bind=engine)
+    apply_additive_migrations(engine)
+
+    # First start with rollup tables: backfill them from existing spans before ingest begins
+    # (in one worker only: two concurrent rebuilds would count every span twice)
+    if not rollups_existed:
+        db = SessionLocal()
+        try:
+            with maintenance_lock(engine, "rollups") as held:
+                if held:
+                    RollupService.rebuild(db)
+        finally:
+            db.close()
+    rollup_task = asyncio.create_task(rollup_maintenance_loop(SessionLocal))
+
+    # Daily span partitions must exist before the first insert
+    partition_task = None
+    if settings.SPANS_PARTITIONING_ENABLED:
+        if is_partitioned(engine):
+            run_partition_maintenance(engine)
+            partition_task = asyncio.create_task(partition_maintenance_loop(engine))
+        else:
+            logger.warning(
+                "SPANS_PARTITIONING_ENABLED is set but spans is not partitioned "
+                "(requires PostgreSQL and a spans table created with the setting on)"
+            )
+
+    # Move spans past ARCHIVE_AFTER_DAYS to the Parquet cold tier
+    archive_task = None
+    if settings.ARCHIVE_ENABLED:
+        if PYARROW_AVAILABLE:
+            archive_task = asyncio.create_task(archive_loop(SessionLocal))
+        else:
+            logger.warning("ARCHIVE_ENABLED is set but pyarrow is not installed (pip install pyarrow)")
 
     # Start streaming pipeline.
     # On Linux/macOS with pathway installed: Pathway real-time pipeline.
@@ -58,6 +105,10 @@ async def lifespan(app: FastAPI):
     # Start WebSocket outbox drain task
     drain_task = asyncio.create_task(get_ws_manager().drain_outbox())
     logger.info("[WS] WebSocket drain task started")
+
+    # Start ingest group-commit writer
+    if settings.INGEST_BUFFER_ENABLED:
+        get_ingest_buffer().start()
     
     logger.info(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} started")
     logger.info(f"   Multi-tenant: {'✓' if settings.ENABLE_MULTI_TENANT else '✗'}")
@@ -67,7 +118,15 @@ async def lifespan(app: FastAPI):
     
     yield
 
+    # Write buffered spans before the process exits
+    await get_ingest_buffer().stop()
+    get_api_key_cache().stop()
     drain_task.cancel()
+    rollup_task.cancel()
+    if partition_task is not None:
+        partition_task.cancel()
+    if archive_task is not None:
+        archive_task.cancel()
     logger.info(f"\U0001f6d1 {settings.APP_NAME} shutdown")
 
 
@@ -103,6 +162,7 @@ app.include_router(stream_router)  # Pathway real-time stream + WebSocket
 app.include_router(ingest.router)
 app.include_router(architecture.router)
 app.include_router(workflows.router)
+app.include_router(traces.router)  # Trace waterfall lookup
 
 
 @app.get("/")
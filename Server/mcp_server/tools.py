@@ -1,6 +1,6 @@
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-from db.base import SessionLocal
+from db.base import ReadSessionLocal
 from services.graph_service import GraphService
 from services.metrics_service import MetricsService
 from services.issue_detector import IssueDetector
@@ -21,8 +21,8 @@ class MCPTools:
         self.default_tenant_id = default_tenant_id or "default"
     
     def _get_db(self) -> Session:
-        """Get DB session"""
-        return SessionLocal()
+        """Get DB session (read pool / replica — tools only read)"""
+        return ReadSessionLocal()
     
     def get_current_architecture(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
         """Get architecture with tenant isolation"""
@@ -1,9 +1,9 @@
 import networkx as nx
 from sqlalchemy.orm import Session
-from db.models import Span
 from models.node import Node, NodeMetrics
 from models.edge import Edge
 from services.metrics_service import MetricsService
+from services.rollup_service import HOUR, RollupService
 from typing import List, Tuple
 from core.logging import get_logger
 
@@ -14,41 +14,37 @@ class GraphService:
     
     @staticmethod
     def build_graph(db: Session, tenant_id: str) -> Tuple[List[Node], List[Edge]]:
-        """Build dependency graph with tenant isolation"""
-        spans = db.query(Span).filter(Span.tenant_id == tenant_id).all()
+        """Build dependency graph with tenant isolation (one grouped rollup query)"""
+        rows = RollupService.query(
+            db, tenant_id, group_by=("service_name", "downstream"), resolution=HOUR
+        )
         
-        if not spans:
+        if not rows:
             return [], []
         
         # Build NetworkX graph
         G = nx.DiGraph()
         
         # Track all nodes
-        services = set(s.service_name for s in spans)
-        downstreams = set(s.downstream for s in spans if s.downstream)
+        services = set(r.service_name for r in rows)
+        downstreams = set(r.downstream for r in rows if r.downstream)
         all_nodes = services.union(downstreams)
         
         # Add nodes
-        for node_id in all_nodes:
+        for node_id in sorted(all_nodes):
             node_type = GraphService._classify_node(node_id)
-            G.add_node(node_id, type=node_type)
+            G.add_node(node_id, type=node_type, rows=[])
         
-        # Add edges
-        edges_data = {}
-        for span in spans:
-            if span.downstream:
-                edge_key = (span.service_name, span.downstream)
-                if edge_key not in edges_data:
-                    edges_data[edge_key] = []
-                edges_data[edge_key].append(span)
-        
-        for (source, target), edge_spans in edges_data.items():
-            G.add_edge(source, target, spans=edge_spans)
+        # Add edges; node metrics cover every span emitted by the service
+        for row in rows:
+            G.nodes[row.service_name]["rows"].append(row)
+            if row.downstream:
+                G.add_edge(row.service_name, row.downstream, row=row)
         
         # Build response
         nodes = []
         for node_id in G.nodes():
-            metrics = MetricsService.compute_node_metrics(db, node_id, tenant_id)
+            metrics = MetricsService.from_rollup(RollupService.totals(G.nodes[node_id]["rows"]))
             nodes.append(Node(
                 id=node_id,
                 type=G.nodes[node_id]["type"],
@@ -57,7 +53,7 @@ class GraphService:
         
         edges = []
         for source, target in G.edges():
-            metrics = MetricsService.compute_edge_metrics(db, source, target, tenant_id)
+            metrics = MetricsService.from_rollup(RollupService.totals([G.edges[source, target]["row"]]))
             edges.append(Edge(
                 source=source,
                 target=target,
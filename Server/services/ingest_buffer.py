@@ -0,0 +1,295 @@
+"""
+Ingest Buffer
+=============
+In-process group commit for span ingest.
+
+Ingest endpoints hand validated spans to :meth:`IngestBuffer.submit` and
+return 202 straight away.  A single writer task drains the buffer and
+writes everything that arrived within one latency window — from any number
+of concurrent requests and tenants — as one bulk INSERT + commit.
+
+  * a commit happens when ``INGEST_GROUP_COMMIT_SIZE`` spans are waiting or
+    ``INGEST_GROUP_COMMIT_MS`` has passed since the first one arrived
+  * at most ``INGEST_BUFFER_MAX_SPANS`` spans are held; beyond that
+    ``submit`` refuses the request so the endpoint can answer 503 with
+    ``Retry-After`` (backpressure)
+  * a group mixes spans of many tenants, so one bad row (a deleted
+    tenant, a value the database rejects) must not sink the rest: when a
+    commit fails while the database still answers, the group is committed
+    in halves, and failing halves are split again until the spans that
+    cannot be stored are found and dropped on their own
+  * a group whose commit fails because the database does not answer
+    (restart, pool timeout) goes back to the front of the buffer and is
+    retried with exponential backoff, up to ``INGEST_COMMIT_MAX_RETRIES``
+    times before it is dropped; while a group is being retried ``submit``
+    refuses new spans, so clients keep them and retry instead of being
+    told 202 for spans that may be lost
+  * commits run on the bounded database thread pool (``run_db``); the
+    counters are only updated on the event loop
+  * the lifespan shutdown hook calls :meth:`IngestBuffer.stop`, which writes
+    whatever is still queued
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from core.config import get_settings
+from core.logging import get_logger
+from core.cache import get_cache_manager
+from db.base import SessionLocal
+from db.threadpool import run_db
+from models.span import Span as SpanIngest
+from services.ingest_service import IngestService
+from streaming.pipeline import push_spans_to_stream
+
+logger = get_logger(__name__)
+
+
+class IngestBuffer:
+    """Bounded span buffer drained by one group-commit writer task."""
+
+    def __init__(
+        self,
+        max_spans: int = 50_000,
+        commit_size: int = 2_000,
+        commit_ms: int = 50,
+        max_retries: int = 5,
+        retry_backoff: float = 0.1,
+        retry_backoff_max: float = 5.0,
+    ) -> None:
+        self.max_spans = max_spans
+        self.commit_size = commit_size
+        self.commit_window = commit_ms / 1000
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+
+        self._pending: Deque[Tuple[str, SpanIngest]] = deque()
+        self._first_arrival: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Failed attempts at the group now at the front; set until a commit succeeds
+        self._attempts = 0
+        self._commit_failing = False
+
+        self._stats: Dict[str, Any] = {
+            "accepted": 0,
+            "rejected": 0,
+            "written": 0,
+            "failed": 0,
+            "retries": 0,
+            "commits": 0,
+            "last_commit_size": 0,
+        }
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    @property
+    def commit_failing(self) -> bool:
+        """True while the last group commit failed (new spans are refused)."""
+        return self._commit_failing
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._run(), name="ingest-group-commit")
+        logger.info(
+            f"[Ingest] Group commit writer started "
+            f"(size={self.commit_size}, window={self.commit_window * 1000:.0f}ms, "
+            f"max={self.max_spans})"
+        )
+
+    async def stop(self) -> None:
+        """Stop accepting spans and write everything still buffered."""
+        if self._writer is None:
+            return
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await self._writer
+        self._writer = None
+        logger.info(f"[Ingest] Group commit writer stopped — {self._stats['written']} spans written")
+
+    # ── Producer side ─────────────────────────────────────────────────────
+
+    def submit(self, tenant_id: str, spans: List[SpanIngest]) -> bool:
+        """
+        Queue spans for the next group commit.
+
+        Returns False (and queues nothing) when the buffer cannot take the
+        whole request or commits are failing — the caller should ask the
+        client to retry later.
+        """
+        if (
+            self._stopping
+            or self._commit_failing
+            or len(self._pending) + len(spans) > self.max_spans
+        ):
+            self._stats["rejected"] += len(spans)
+            return False
+
+        if not self._pending:
+            self._first_arrival = time.monotonic()
+        self._pending.extend((tenant_id, span) for span in spans)
+        self._stats["accepted"] += len(spans)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": len(self._pending),
+            "max_spans": self.max_spans,
+            "running": self.running,
+            "commit_failing": self._commit_failing,
+        }
+
+    # ── Writer ────────────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Let the group fill until it is big enough or the window closes
+            remaining = self.commit_window - (time.monotonic() - (self._first_arrival or 0))
+            if len(self._pending) < self.commit_size and remaining > 0 and not self._stopping:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            group = [self._pending.popleft() for _ in range(min(self.commit_size, len(self._pending)))]
+            self._first_arrival = time.monotonic() if self._pending else None
+            try:
+                written, failed = await run_db(self._commit, group)
+            except Exception as e:
+                try:
+                    written, failed = await run_db(self._commit_isolating, group, e)
+                except Exception as error:
+                    await self._commit_failed(group, error)
+                    continue
+            self._attempts = 0
+            self._commit_failing = False
+            self._stats["written"] += written
+            self._stats["failed"] += failed
+            self._stats["commits"] += 1
+            self._stats["last_commit_size"] = written
+
+    async def _commit_failed(self, group: List[Tuple[str, SpanIngest]], error: Exception) -> None:
+        """Put a failed group back at the front and back off, or drop it past the retry cap."""
+        self._commit_failing = True
+        self._attempts += 1
+        if self._attempts > self.max_retries or self._stopping:
+            self._attempts = 0
+            # Nothing is being retried now: let new spans in, their commit is the next probe
+            self._commit_failing = False
+            self._stats["failed"] += len(group)
+            logger.error(f"[Ingest] Dropped {len(group)} spans after {self.max_retries} failed commits: {error}")
+            return
+
+        self._pending.extendleft(reversed(group))
+        # Already overdue: commit as soon as the backoff ends
+        self._first_arrival = time.monotonic() - self.commit_window
+        self._stats["retries"] += 1
+        delay = min(self.retry_backoff_max, self.retry_backoff * 2 ** (self._attempts - 1))
+        logger.warning(
+            f"[Ingest] Group commit of {len(group)} spans failed "
+            f"(attempt {self._attempts}/{self.max_retries}), retrying in {delay:.1f}s: {error}"
+        )
+        await asyncio.sleep(delay)
+
+    def _commit_isolating(self, group: List[Tuple[str, SpanIngest]], error: Exception) -> Tuple[int, int]:
+        """
+        Write a group whose commit failed, dropping only the spans that
+        cannot be stored (runs in a worker thread).  Re-raises *error* when
+        the database does not answer, so the whole group is retried.
+        """
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+        except Exception:
+            raise error
+        finally:
+            db.close()
+        logger.warning(f"[Ingest] Group commit of {len(group)} spans failed, isolating bad rows: {error}")
+        return self._commit_split(group, error)
+
+    def _commit_split(self, group: List[Tuple[str, SpanIngest]], error: Exception) -> Tuple[int, int]:
+        """Commit *group* in halves, recursing into halves that fail; single failing spans are dropped."""
+        if len(group) == 1:
+            tenant_id, span = group[0]
+            logger.error(f"[Ingest] Dropped span {span.span_id} of tenant {tenant_id}: {error}")
+            return 0, 1
+        middle = len(group) // 2
+        written = failed = 0
+        for part in (group[:middle], group[middle:]):
+            try:
+                part_written, part_failed = self._commit(part)
+            except Exception as e:
+                part_written, part_failed = self._commit_split(part, e)
+            written += part_written
+            failed += part_failed
+        return written, failed
+
+    def _commit(self, group: List[Tuple[str, SpanIngest]]) -> Tuple[int, int]:
+        """
+        Write one group in a single transaction (runs in a worker thread;
+        raises if it fails).  Returns ``(spans written, spans that could not
+        be prepared)``.
+        """
+        db = SessionLocal()
+        try:
+            stored, failed = IngestService.store_tenant_spans(db, group)
+        finally:
+            db.close()
+
+        # Committed: a failure from here on must not send the group round again
+        try:
+            cache = get_cache_manager()
+            for tenant_id in {tenant_id for tenant_id, _ in stored}:
+                cache.bump_generation(tenant_id)
+            push_spans_to_stream({**span.model_dump(), "tenant_id": tenant_id} for tenant_id, span in stored)
+        except Exception as e:
+            logger.error(f"[Ingest] Post-commit update failed: {e}")
+        return len(stored), failed
+
+
+# Singleton
+_ingest_buffer: Optional[IngestBuffer] = None
+
+
+def get_ingest_buffer() -> IngestBuffer:
+    global _ingest_buffer
+    if _ingest_buffer is None:
+        settings = get_settings()
+        _ingest_buffer = IngestBuffer(
+            max_spans=settings.INGEST_BUFFER_MAX_SPANS,
+            commit_size=settings.INGEST_GROUP_COMMIT_SIZE,
+            commit_ms=settings.INGEST_GROUP_COMMIT_MS,
+            max_retries=settings.INGEST_COMMIT_MAX_RETRIES,
+        )
+    return _ingest_buffer
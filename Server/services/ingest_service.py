@@ -1,87 +1,203 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from db.models import Span as DBSpan
 from models.span import Span as SpanIngest
+from core.config import get_settings
 from core.logging import get_logger
-from typing import List, Tuple
+from services.rollup_service import RollupService, is_error
+from services.quota import get_span_quota
+from services.span_dedup import get_span_deduplicator
+from typing import List, Optional, Set, Tuple, Dict, Any
 
 logger = get_logger(__name__)
 
+# Columns written by the bulk path (id and created_at come from defaults)
+_SPAN_COLUMNS = (
+    "trace_id", "span_id", "parent_span_id", "service_name", "operation", "kind",
+    "start_time", "end_time", "latency_ms", "status_code", "error", "downstream",
+)
 
-class IngestService:
-    
-    @staticmethod
-    def store_span(db: Session, span_data: SpanIngest, tenant_id: str) -> DBSpan:
-        """Store span in DB with tenant isolation"""
-        span = DBSpan(
-            tenant_id=tenant_id,
-            trace_id=span_data.trace_id,
-            span_id=span_data.span_id,
-            parent_span_id=span_data.parent_span_id,
-            service_name=span_data.service_name,
-            operation=span_data.operation,
-            kind=span_data.kind,
-            start_time=span_data.start_time,
-            end_time=span_data.end_time,
-            latency_ms=span_data.latency_ms,
-            status_code=span_data.status_code,
-            error=span_data.error,
-            downstream=span_data.downstream
+
+def _insert_spans(db: Session, rows: List[Dict[str, Any]]) -> Optional[Set[Tuple[str, str]]]:
+    """
+    Bulk span INSERT that skips rows hitting the (tenant_id, span_id) unique
+    index.  Returns the ``(tenant_id, span_id)`` pairs actually inserted, or
+    None when every row was (dialects without ``ON CONFLICT``, where a
+    conflict raises instead).
+    """
+    table = DBSpan.__table__
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(table), rows)
+        return None
+
+    stmt = dialect_insert(table).on_conflict_do_nothing()
+    if dialect.insert_executemany_returning:  # PostgreSQL, SQLite >= 3.35
+        result = db.execute(stmt.returning(table.c.tenant_id, table.c.span_id), rows)
+        return {(tenant_id, span_id) for tenant_id, span_id in result}
+
+    # No RETURNING: whatever is already stored is what the INSERT will skip
+    keys = defaultdict(set)
+    for row in rows:
+        keys[row["tenant_id"]].add(row["span_id"])
+    stored = set()
+    for tenant_id, span_ids in keys.items():
+        stored.update(
+            db.query(DBSpan.tenant_id, DBSpan.span_id)
+            .filter(DBSpan.tenant_id == tenant_id, DBSpan.span_id.in_(span_ids))
+            .all()
         )
-        
-        db.add(span)
-        db.commit()
-        db.refresh(span)
-        
-        logger.info(f"Stored span: {span.span_id} for tenant: {tenant_id}")
-        return span
+    db.execute(stmt, rows)
+    return {(row["tenant_id"], row["span_id"]) for row in rows} - {tuple(key) for key in stored}
+
 
+class IngestService:
+
+    # Process-wide bulk write throughput, reported by /ingest/stats
+    _write_lock = threading.Lock()
+    _write_stats: Dict[str, Any] = {
+        "batches": 0,
+        "rows": 0,
+        "seconds": 0.0,
+        "last_batch_rows": 0,
+        "last_rows_per_sec": 0.0,
+    }
+    
     @staticmethod
     def store_spans_batch(
         db: Session, spans_data: List[SpanIngest], tenant_id: str
     ) -> Tuple[List["SpanIngest"], int]:
-        """Store a list of spans in a SINGLE DB transaction.
+        """Store a list of spans with one Core bulk INSERT in a single transaction.
 
         Returns ``(successful_spans, fail_count)`` where *successful_spans* is
-        the list of ``SpanIngest`` items that were persisted.  A single commit
-        is dramatically faster than N individual commits for large batches.
+        the list of ``SpanIngest`` items that were persisted.
         """
-        prepared: List[DBSpan] = []
-        prepared_input: List[SpanIngest] = []  # parallel list for stream push
+        try:
+            stored, fail = IngestService.store_tenant_spans(
+                db, [(tenant_id, span_data) for span_data in spans_data]
+            )
+        except Exception:
+            return [], len(spans_data)
+        return [span_data for _, span_data in stored], fail
+
+    @staticmethod
+    def store_tenant_spans(
+        db: Session, items: List[Tuple[str, SpanIngest]]
+    ) -> Tuple[List[Tuple[str, SpanIngest]], int]:
+        """Store ``(tenant_id, span)`` pairs, possibly from several tenants, at once.
+
+        Rows bypass the ORM unit of work: a single ``insert()`` executed
+        with the full parameter list becomes ``executemany`` on SQLite and
+        batched multi-row ``INSERT ... VALUES`` on PostgreSQL, so a
+        1,000-span batch costs one statement round trip instead of 1,000
+        object flushes.
+
+        Spans already stored are dropped by the dedup filter first; the
+        INSERT also skips ``(tenant_id, span_id)`` conflicts, so a retried
+        batch never creates duplicate rows.  Only the rows the INSERT really
+        wrote (``RETURNING``) are rolled up, returned and streamed, so a
+        duplicate the filter missed is not counted twice.
+
+        The span rollups are updated in the same transaction, and the stored
+        rows are counted against each tenant's daily quota after the commit.
+
+        Returns ``(stored_items, fail_count)``; duplicates are in neither.
+        Spans that cannot be prepared are counted in *fail_count*; if the
+        transaction itself fails it is rolled back and the error re-raised,
+        so the caller can retry the whole batch.
+        """
+        rows: List[Dict[str, Any]] = []
+        prepared: List[Tuple[str, SpanIngest]] = []  # parallel list for stream push
         fail = 0
 
-        for span_data in spans_data:
+        for tenant_id, span_data in items:
             try:
-                span = DBSpan(
-                    tenant_id=tenant_id,
-                    trace_id=span_data.trace_id,
-                    span_id=span_data.span_id,
-                    parent_span_id=span_data.parent_span_id,
-                    service_name=span_data.service_name,
-                    operation=span_data.operation,
-                    kind=span_data.kind,
-                    start_time=span_data.start_time,
-                    end_time=span_data.end_time,
-                    latency_ms=span_data.latency_ms,
-                    status_code=span_data.status_code,
-                    error=span_data.error,
-                    downstream=span_data.downstream,
-                )
-                db.add(span)
-                prepared.append(span)
-                prepared_input.append(span_data)
+                row = {column: getattr(span_data, column) for column in _SPAN_COLUMNS}
+                row["tenant_id"] = tenant_id
+                rows.append(row)
+                prepared.append((tenant_id, span_data))
             except Exception as e:
                 logger.error(f"Failed to prepare span {span_data.span_id}: {e}")
                 fail += 1
 
-        if prepared:
+        # SDK retries resend spans that were already committed
+        if prepared and get_settings().INGEST_DEDUP_ENABLED:
+            new_spans = {id(span_data) for _, span_data in get_span_deduplicator().filter_new(db, prepared)}
+            if len(new_spans) < len(prepared):
+                kept = [(item, row) for item, row in zip(prepared, rows) if id(item[1]) in new_spans]
+                prepared = [item for item, _ in kept]
+                rows = [row for _, row in kept]
+
+        if rows:
+            tenants = {tenant_id for tenant_id, _ in prepared}
+            started = time.perf_counter()
             try:
+                inserted = _insert_spans(db, rows)
+                if inserted is not None and len(inserted) < len(prepared):
+                    # Conflicts the dedup filter could not see (other workers,
+                    # restarts) were skipped: only new rows count from here on
+                    kept = []
+                    for item in prepared:
+                        key = (item[0], item[1].span_id)
+                        if key in inserted:
+                            inserted.discard(key)
+                            kept.append(item)
+                    prepared = kept
+                RollupService.record(db, (
+                    (tenant_id, span.service_name, span.downstream, span.operation,
+                     span.start_time, span.latency_ms, is_error(span.error, span.status_code))
+                    for tenant_id, span in prepared
+                ))
                 db.commit()
-                logger.info(
-                    f"Batch stored {len(prepared)} spans for tenant {tenant_id}"
-                )
             except Exception as e:
                 db.rollback()
-                logger.error(f"Batch commit failed for tenant {tenant_id}: {e}")
-                return [], len(spans_data)
+                logger.error(f"Batch commit failed for tenant(s) {sorted(tenants)}: {e}")
+                raise
+
+            elapsed = time.perf_counter() - started
+            # Quota counts what was stored, not what was submitted
+            try:
+                quota = get_span_quota()
+                for tenant_id, n in Counter(tenant_id for tenant_id, _ in prepared).items():
+                    quota.count(tenant_id, n)
+            except Exception as e:
+                logger.error(f"Quota count failed for tenant(s) {sorted(tenants)}: {e}")
 
-        return prepared_input, fail
+            rows_per_sec = IngestService._record_write(len(prepared), elapsed)
+            logger.info(
+                f"Batch stored {len(prepared)} spans for {len(tenants)} tenant(s) "
+                f"in {elapsed * 1000:.1f} ms ({rows_per_sec:,.0f} rows/s)"
+            )
+
+        return prepared, fail
+
+    @staticmethod
+    def _record_write(rows: int, seconds: float) -> float:
+        """Add one bulk write to the throughput counters; returns its rows/sec."""
+        rows_per_sec = rows / seconds if seconds > 0 else 0.0
+        with IngestService._write_lock:
+            stats = IngestService._write_stats
+            stats["batches"] += 1
+            stats["rows"] += rows
+            stats["seconds"] += seconds
+            stats["last_batch_rows"] = rows
+            stats["last_rows_per_sec"] = round(rows_per_sec, 1)
+        return rows_per_sec
+
+    @staticmethod
+    def get_write_stats() -> Dict[str, Any]:
+        """Bulk write throughput since process start."""
+        with IngestService._write_lock:
+            stats = dict(IngestService._write_stats)
+        stats["avg_rows_per_sec"] = (
+            round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] > 0 else 0.0
+        )
+        stats["seconds"] = round(stats["seconds"], 3)
+        return stats
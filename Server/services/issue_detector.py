@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 import networkx as nx
+from db.threadpool import run_db
 from services.graph_service import GraphService
 from services.metrics_service import MetricsService
 from reasoning.rules import RuleEngine
@@ -21,7 +22,7 @@ class IssueDetector:
         Graph is built exactly once and reused for both.
         """
         # Build graph ONCE — reused by rule engine and AI
-        nodes, edges = GraphService.build_graph(db, tenant_id)
+        nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
 
         # Reconstruct NetworkX graph from already-loaded data (no second DB query)
         G = nx.DiGraph()
@@ -44,7 +45,7 @@ class IssueDetector:
         if ai_client.llm:
             try:
                 # Reuse already-computed global metrics
-                metrics = MetricsService.compute_global_metrics(db, tenant_id)
+                metrics = await run_db(MetricsService.compute_global_metrics, db, tenant_id)
                 
                 architecture = {
                     "services": [{"name": n.id, "type": n.type, "metrics": n.metrics.model_dump()} for n in nodes],
@@ -91,7 +92,7 @@ class IssueDetector:
         except Exception as e:
             # Fallback to rule-based only
             logger.warning(f"AI detection failed ({e}), falling back to rule-based detection")
-            G = GraphService.get_graph_from_db(db, tenant_id)
+            G = await run_db(GraphService.get_graph_from_db, db, tenant_id)
             issues = RuleEngine.run_all_rules(G)
             logger.info(f"Detected {len(issues)} issues for tenant {tenant_id} (rule-based only)")
             return issues
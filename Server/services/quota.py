@@ -0,0 +1,163 @@
+"""
+Span Quota
+==========
+Enforces ``Tenant.max_spans_per_day`` on the ingest path without touching
+the database per request.
+
+Spans stored per tenant per UTC day are counted in Redis
+(``nexarch:quota:<tenant>:<YYYYMMDD>``, one INCRBY per batch) or in memory
+when Redis is not configured.  The limit comes from the tenant cache.
+
+  * below ``QUOTA_SOFT_RATIO`` of the limit — everything is accepted
+  * between soft and hard — degraded: error spans are always kept, other
+    spans are kept only for ``QUOTA_DEGRADED_SAMPLE_RATE`` of traces (chosen
+    by trace ID hash, so kept traces stay complete)
+  * at ``max_spans_per_day`` — ingest answers 429 until the next UTC day
+
+Checking and counting are separate steps.  ``admit`` decides from the last
+total this process saw for the tenant, without any Redis round trip, so it
+can run on the event loop.  ``count`` runs after the spans are committed,
+on the database thread that stored them (group-commit writer or direct
+write), with one INCRBY per tenant.  Spans refused with 503, dropped as
+duplicates or lost to a failed commit therefore do not use up quota; the
+price is that batches still in flight when a tenant reaches its limit are
+let through.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache import get_cache_manager
+from core.config import get_settings
+from core.logging import get_logger
+from models.span import Span as SpanIngest
+
+logger = get_logger(__name__)
+
+_KEY_PREFIX = "nexarch:quota:"
+_KEY_TTL_SECONDS = 2 * 86400
+
+OK = "ok"
+DEGRADED = "degraded"
+EXCEEDED = "exceeded"
+
+
+def _trace_kept(trace_id: str, rate: float) -> bool:
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < rate
+
+
+def seconds_until_reset(now: Optional[datetime] = None) -> int:
+    """Seconds until the next UTC midnight, when daily counters start over."""
+    now = now or datetime.utcnow()
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((tomorrow - now).total_seconds()))
+
+
+class SpanQuota:
+    """Per-tenant daily span counters with soft (sampling) and hard (429) limits."""
+
+    def __init__(self, soft_ratio: float = 0.8, degraded_sample_rate: float = 0.1):
+        self.soft_ratio = soft_ratio
+        self.degraded_sample_rate = degraded_sample_rate
+        self._lock = threading.Lock()
+        # (tenant_id, day) -> spans counted today (authoritative without Redis,
+        # last total returned by Redis otherwise)
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._stats: Dict[str, int] = {"degraded_spans_dropped": 0, "rejected_batches": 0}
+
+    def admit(
+        self, tenant_id: str, spans: List[SpanIngest], limit: Optional[int]
+    ) -> Tuple[List[SpanIngest], str]:
+        """
+        Apply the tenant's quota to one batch (check only: nothing is
+        counted until the spans are stored, see ``count``).
+
+        Returns ``(spans to store, state)``; when the state is ``exceeded``
+        the list is empty and the caller should answer 429.
+        """
+        if not limit or limit <= 0:
+            return spans, OK
+
+        day = datetime.utcnow().strftime("%Y%m%d")
+        used = self._counts.get((tenant_id, day), 0)
+        if used >= limit:
+            self._stats["rejected_batches"] += 1
+            return [], EXCEEDED
+
+        state = OK
+        admitted = spans
+        if used >= limit * self.soft_ratio:
+            state = DEGRADED
+            admitted = [
+                span for span in spans
+                if span.error or (span.status_code or 0) >= 500
+                or _trace_kept(span.trace_id, self.degraded_sample_rate)
+            ]
+            self._stats["degraded_spans_dropped"] += len(spans) - len(admitted)
+        return admitted, state
+
+    def usage(self, tenant_id: str, limit: Optional[int]) -> Dict[str, Any]:
+        """Today's count as last seen by this process, for the stats endpoint."""
+        used = self._counts.get((tenant_id, datetime.utcnow().strftime("%Y%m%d")), 0)
+        if not limit:
+            state = OK
+        elif used >= limit:
+            state = EXCEEDED
+        elif used >= limit * self.soft_ratio:
+            state = DEGRADED
+        else:
+            state = OK
+        return {
+            "spans_today": used,
+            "max_spans_per_day": limit,
+            "state": state,
+            "resets_in_seconds": seconds_until_reset(),
+            **self._stats,
+        }
+
+    def count(self, tenant_id: str, n: int) -> None:
+        """Add *n* stored spans to today's counter (blocking: call off the event loop)."""
+        if n <= 0:
+            return
+        day = datetime.utcnow().strftime("%Y%m%d")
+        key = (tenant_id, day)
+        cache = get_cache_manager()
+        client = cache.backend.redis_client if cache.is_redis() else None
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.incrby(f"{_KEY_PREFIX}{tenant_id}:{day}", n)
+                pipe.expire(f"{_KEY_PREFIX}{tenant_id}:{day}", _KEY_TTL_SECONDS)
+                total, _ = pipe.execute()
+                with self._lock:
+                    self._prune(day)
+                    self._counts[key] = int(total)
+                return
+            except Exception as e:
+                logger.warning(f"Redis quota counter failed, counting locally: {e}")
+        with self._lock:
+            self._prune(day)
+            self._counts[key] = self._counts.get(key, 0) + n
+
+    def _prune(self, day: str) -> None:
+        """Drop counters from previous days (called with the lock held)."""
+        if any(d != day for _, d in self._counts):
+            self._counts = {k: v for k, v in self._counts.items() if k[1] == day}
+
+
+# Singleton
+_span_quota: Optional[SpanQuota] = None
+
+
+def get_span_quota() -> SpanQuota:
+    global _span_quota
+    if _span_quota is None:
+        settings = get_settings()
+        _span_quota = SpanQuota(
+            soft_ratio=settings.QUOTA_SOFT_RATIO,
+            degraded_sample_rate=settings.QUOTA_DEGRADED_SAMPLE_RATE,
+        )
+    return _span_quota
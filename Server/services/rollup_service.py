@@ -0,0 +1,355 @@
+"""
+Span Rollups
+============
+Pre-aggregated span metrics so dashboards do not scan raw spans.
+
+Rows are keyed by ``(tenant, service, downstream, operation, bucket)`` at
+1-minute (``span_rollups_1m``) and 1-hour (``span_rollups_1h``) resolution
+and hold the span count, error count, latency sum and a fixed-bucket latency
+histogram.  Every value is additive, so rows merge by summing: percentiles
+over any range come from the summed histogram.
+
+Maintained at ingest time: each stored batch is folded into per-key deltas
+in memory and applied with one upsert per table that adds to the existing
+row (``ON CONFLICT ... DO UPDATE SET col = col + excluded.col``), in the same
+transaction as the span INSERT.  Concurrent workers merge without any
+read-modify-write.  ``rebuild`` recomputes a range from raw spans (backfill
+after upgrading, or after fixing bad data), including days already moved to
+the Parquet archive.
+
+Readers pick the minute table for ranges up to ``MINUTE_RANGE_MAX`` and the
+hour table otherwise (ranges aligned to whole hours), so query cost depends
+on the number of keys and buckets in the range, not on span volume.  Minute
+rows are pruned after ``ROLLUP_MINUTE_RETENTION_DAYS``, so ranges starting
+before that window fall back to the hour table; hour rows are kept.
+"""
+
+import asyncio
+import bisect
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.archive import PYARROW_AVAILABLE, archived_days, scan_archive
+from db.locks import maintenance_lock
+from db.models import (
+    ROLLUP_HISTOGRAM_COLUMNS,
+    ROLLUP_KEY_COLUMNS,
+    ROLLUP_LATENCY_BOUNDS_MS,
+    Span,
+    SpanRollupHour,
+    SpanRollupMinute,
+    Tenant,
+)
+
+logger = get_logger(__name__)
+
+MINUTE = "1m"
+HOUR = "1h"
+_TABLES = {MINUTE: SpanRollupMinute, HOUR: SpanRollupHour}
+VALUE_COLUMNS = ("span_count", "error_count", "latency_sum") + ROLLUP_HISTOGRAM_COLUMNS
+
+# Ranges up to this long are read from the 1-minute table
+MINUTE_RANGE_MAX = timedelta(hours=6)
+MAINTENANCE_INTERVAL_SECONDS = 3600
+_REBUILD_CHUNK = 10000
+
+# One span as the rollups see it:
+# (tenant_id, service_name, downstream, operation, start_time, latency_ms, is_error)
+RollupInput = Tuple[str, str, Optional[str], str, datetime, float, bool]
+
+
+def is_error(error: Optional[str], status_code: Optional[int]) -> bool:
+    """A span counts as an error if it carries an error message or a 5xx status."""
+    return error is not None or (status_code or 0) >= 500
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """Start of the rollup bucket holding *ts* (naive UTC)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    if resolution == HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+
+def minute_cutoff(retention_days: int) -> datetime:
+    """Oldest bucket still kept in the 1-minute table."""
+    return bucket_start(datetime.utcnow() - timedelta(days=retention_days), HOUR)
+
+
+def latency_percentile(histogram: Sequence[int], q: float) -> float:
+    """
+    Approximate latency percentile (ms) from histogram counts: the upper
+    bound of the bucket holding the q-th span (the open-ended last bucket
+    reports the highest bound).
+    """
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(histogram):
+        seen += n
+        if seen >= rank:
+            return float(ROLLUP_LATENCY_BOUNDS_MS[min(i, len(ROLLUP_LATENCY_BOUNDS_MS) - 1)])
+    return float(ROLLUP_LATENCY_BOUNDS_MS[-1])
+
+
+def _aggregate(spans: Iterable[RollupInput]) -> Dict[str, Dict[tuple, List[float]]]:
+    """Fold spans into per-key value deltas for both resolutions."""
+    deltas: Dict[str, Dict[tuple, List[float]]] = {MINUTE: {}, HOUR: {}}
+    width = len(VALUE_COLUMNS)
+    for tenant_id, service, downstream, operation, start_time, latency_ms, error in spans:
+        hist = 3 + bisect.bisect_left(ROLLUP_LATENCY_BOUNDS_MS, latency_ms)
+        for resolution, acc in deltas.items():
+            key = (tenant_id, service, downstream or "", operation, bucket_start(start_time, resolution))
+            values = acc.get(key)
+            if values is None:
+                values = acc[key] = [0] * width
+            values[0] += 1
+            values[1] += 1 if error else 0
+            values[2] += latency_ms
+            values[hist] += 1
+    return deltas
+
+
+def _upsert(db: Session, model, deltas: Dict[tuple, List[float]]) -> None:
+    """Add *deltas* to the rollup rows of *model*, creating missing rows."""
+    table = model.__table__
+    # Sorted keys give concurrent writers the same row lock order
+    rows = [
+        {**dict(zip(ROLLUP_KEY_COLUMNS, key)), **dict(zip(VALUE_COLUMNS, values))}
+        for key, values in sorted(deltas.items())
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY_COLUMNS),
+            set_={column: table.c[column] + stmt.excluded[column] for column in VALUE_COLUMNS},
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Other dialects: update in place, insert the keys that had no row
+    for row in rows:
+        updated = db.execute(
+            table.update()
+            .where(*(table.c[column] == row[column] for column in ROLLUP_KEY_COLUMNS))
+            .values({column: table.c[column] + row[column] for column in VALUE_COLUMNS})
+        )
+        if updated.rowcount == 0:
+            db.execute(insert(table), row)
+
+
+class RollupService:
+
+    @staticmethod
+    def record(db: Session, spans: Iterable[RollupInput]) -> None:
+        """Add spans to both rollup tables; the caller commits (normally with the span INSERT)."""
+        for resolution, deltas in _aggregate(spans).items():
+            if deltas:
+                _upsert(db, _TABLES[resolution], deltas)
+
+    @staticmethod
+    def query(
+        db: Session,
+        tenant_id: str,
+        group_by: Sequence[str] = (),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: Optional[str] = None,
+        **filters: Any,
+    ) -> List[Any]:
+        """
+        Summed rollup values for one tenant, one row per ``group_by`` group
+        (a single row without ``group_by``).  Rows carry the group columns
+        followed by ``VALUE_COLUMNS``.  *filters* are column equality tests,
+        e.g. ``service_name="checkout"``.  Ranges starting before the
+        minute retention window are read from the hour table, even when
+        ``MINUTE`` is asked for, since those minute rows are pruned.
+        """
+        if resolution is None:
+            short = start is not None and (end or datetime.utcnow()) - start <= MINUTE_RANGE_MAX
+            resolution = MINUTE if short else HOUR
+        if resolution == MINUTE and (
+            start is None or start < minute_cutoff(get_settings().ROLLUP_MINUTE_RETENTION_DAYS)
+        ):
+            resolution = HOUR
+        model = _TABLES[resolution]
+
+        groups = [getattr(model, column) for column in group_by]
+        query = db.query(
+            *groups, *(func.sum(getattr(model, column)).label(column) for column in VALUE_COLUMNS)
+        ).filter(model.tenant_id == tenant_id)
+        for column, value in filters.items():
+            query = query.filter(getattr(model, column) == value)
+        if start is not None:
+            query = query.filter(model.bucket >= bucket_start(start, resolution))
+        if end is not None:
+            query = query.filter(model.bucket <= end)
+        if groups:
+            query = query.group_by(*groups)
+        return query.all()
+
+    @staticmethod
+    def totals(rows: Iterable[Any]) -> Dict[str, float]:
+        """Sum ``VALUE_COLUMNS`` over rollup rows returned by ``query``."""
+        totals = dict.fromkeys(VALUE_COLUMNS, 0)
+        for row in rows:
+            for column in VALUE_COLUMNS:
+                totals[column] += getattr(row, column) or 0
+        return totals
+
+    @staticmethod
+    def histogram(totals: Dict[str, float]) -> List[int]:
+        return [int(totals[column]) for column in ROLLUP_HISTOGRAM_COLUMNS]
+
+    @staticmethod
+    def rebuild(
+        db: Session,
+        tenant_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> int:
+        """
+        Recompute rollups from raw spans for the whole hours covering
+        ``[start, end)`` (everything when unset), for one tenant or all of
+        them.  Returns the number of spans read.
+
+        Rollup rows are only replaced from the tenant's oldest span still
+        available (live or archived) onwards: hour rows outlive the raw
+        spans, and history older than that cannot be recomputed, so it is
+        kept.  A tenant with no raw spans at all is left untouched.
+
+        Spans ingested into the range while this runs may be counted twice,
+        so rebuild closed ranges (``end`` before the current hour) or run it
+        before ingest starts, in one worker (``maintenance_lock("rollups")``).
+
+        Late spans for an archived day sit in ``spans`` until the next
+        archive run copies them into the day's file, and may be in both for
+        a while; archived spans whose ID was already read from ``spans``
+        are skipped so they are counted once.
+        """
+        if tenant_id is None:
+            return sum(
+                RollupService.rebuild(db, tenant, start, end)
+                for (tenant,) in db.query(Tenant.id).order_by(Tenant.id).all()
+            )
+
+        settings = get_settings()
+        archiving = settings.ARCHIVE_ENABLED and PYARROW_AVAILABLE
+        archived = archived_days(settings.ARCHIVE_DIR, tenant_id) if archiving else {}
+
+        oldest = db.query(func.min(Span.start_time)).filter(Span.tenant_id == tenant_id).scalar()
+        if archived:
+            first_archived = datetime.combine(min(archived), time.min)
+            oldest = min(oldest, first_archived) if oldest else first_archived
+        if oldest is None:
+            return 0
+
+        start = bucket_start(max(start, oldest) if start else oldest, HOUR)
+        if end is not None:
+            hour = bucket_start(end, HOUR)
+            end = hour if hour == end else hour + timedelta(hours=1)
+            if end <= start:
+                return 0
+
+        for model in _TABLES.values():
+            stale = db.query(model).filter(model.tenant_id == tenant_id, model.bucket >= start)
+            if end:
+                stale = stale.filter(model.bucket < end)
+            stale.delete(synchronize_session=False)
+
+        # IDs of live spans on archived days, so the archive copy is not counted again
+        live_ids: Set[str] = set()
+
+        def _live(span) -> RollupInput:
+            if span.start_time.date() in archived:
+                live_ids.add(span.span_id)
+            return (tenant_id, span.service_name, span.downstream, span.operation,
+                    span.start_time, span.latency_ms, is_error(span.error, span.status_code))
+
+        spans = db.query(
+            Span.span_id, Span.service_name, Span.downstream, Span.operation,
+            Span.start_time, Span.latency_ms, Span.error, Span.status_code,
+        ).filter(Span.tenant_id == tenant_id, Span.start_time >= start)
+        if end:
+            spans = spans.filter(Span.start_time < end)
+
+        read = RollupService._record_chunked(db, (_live(span) for span in spans.yield_per(_REBUILD_CHUNK)))
+
+        # Days already moved to the Parquet cold tier
+        if archived:
+            columns = ("span_id", "service_name", "downstream", "operation", "start_time", "latency_ms", "error", "status_code")
+            table = scan_archive(tenant_id, start, end, columns=columns)
+            read += RollupService._record_chunked(db, (
+                (tenant_id, span["service_name"], span["downstream"], span["operation"],
+                 span["start_time"], span["latency_ms"], is_error(span["error"], span["status_code"]))
+                for batch in table.to_batches(_REBUILD_CHUNK)
+                for span in batch.to_pylist()
+                if span["span_id"] not in live_ids
+            ))
+
+        db.commit()
+        logger.info(
+            f"[Rollups] Rebuilt {tenant_id} from {read} spans "
+            f"({start.isoformat()} to {end.isoformat() if end else 'now'})"
+        )
+        return read
+
+    @staticmethod
+    def _record_chunked(db: Session, spans: Iterable[RollupInput]) -> int:
+        """``record`` in chunks of ``_REBUILD_CHUNK``; returns spans recorded."""
+        recorded = 0
+        chunk: List[RollupInput] = []
+        for span in spans:
+            chunk.append(span)
+            if len(chunk) >= _REBUILD_CHUNK:
+                RollupService.record(db, chunk)
+                recorded += len(chunk)
+                chunk = []
+        if chunk:
+            RollupService.record(db, chunk)
+            recorded += len(chunk)
+        return recorded
+
+    @staticmethod
+    def prune(db: Session, minute_retention_days: int) -> int:
+        """Delete 1-minute rows older than the retention window; returns rows deleted."""
+        cutoff = minute_cutoff(minute_retention_days)
+        deleted = db.query(SpanRollupMinute).filter(
+            SpanRollupMinute.bucket < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            logger.info(f"[Rollups] Pruned {deleted} minute rows older than {cutoff.isoformat()}")
+        return deleted
+
+
+async def rollup_maintenance_loop(session_factory) -> None:
+    """Lifespan task: prune expired 1-minute rollups every hour (one worker at a time)."""
+    def _prune() -> None:
+        db = session_factory()
+        try:
+            with maintenance_lock(db.get_bind(), "rollups") as held:
+                if held:
+                    RollupService.prune(db, get_settings().ROLLUP_MINUTE_RETENTION_DAYS)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            await asyncio.to_thread(_prune)
+        except Exception as e:
+            logger.error(f"[Rollups] Maintenance failed: {e}")
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
@@ -0,0 +1,130 @@
+from sqlalchemy.orm import Session
+from services.rollup_service import MINUTE, RollupService
+from core.config import get_settings
+from core.cache import get_cache_manager
+from core.logging import get_logger
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Window over which per-service ingest volume is measured
+_VOLUME_WINDOW_MINUTES = 5
+# Never raise a service's rate by more than this factor per heartbeat (avoids oscillation)
+_MAX_RATE_STEP_UP = 2.0
+# DB span aggregation, once on, stays on until unsampled volume drops below this share of target
+_AGGREGATION_OFF_RATIO = 0.5
+
+
+class SdkConfigService:
+    """Computes the sampling config pushed to SDKs in the heartbeat response."""
+
+    @staticmethod
+    def observed_spans_per_minute(db: Session, tenant_id: str, service: str) -> float:
+        """Spans/min ingested for a service over the last few minutes (cached 60 s)."""
+        cache = get_cache_manager()
+        cached = cache.get(tenant_id, f"sdk_volume:{service}")
+        if cached is not None:
+            return cached
+
+        since = datetime.utcnow() - timedelta(minutes=_VOLUME_WINDOW_MINUTES)
+        rows = RollupService.query(db, tenant_id, start=since, resolution=MINUTE, service_name=service)
+        count = int(RollupService.totals(rows)["span_count"])
+
+        per_minute = round(count / _VOLUME_WINDOW_MINUTES, 2)
+        cache.set(tenant_id, f"sdk_volume:{service}", per_minute, ttl=60)
+        return per_minute
+
+    @staticmethod
+    def compute_config(
+        db: Session,
+        tenant_id: str,
+        service: str,
+        current_rate: float = 1.0,
+        db_span_aggregation: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Derive a sampling rate and feature switches from observed volume.
+
+        Observed volume is already sampled at *current_rate*, so the rate that
+        hits the per-service target is ``current_rate * target / observed``.
+
+        DB span aggregation follows the unsampled volume
+        (``observed / current_rate``), which the pushed rate does not change,
+        with hysteresis: it turns on above target and, once on (the SDK
+        reports its current switches in *db_span_aggregation*), only turns
+        off below ``_AGGREGATION_OFF_RATIO`` of target, since aggregating
+        itself lowers the volume.  Tail sampling is only pushed when
+        ``SDK_TAIL_SAMPLING_ENABLED`` is set: it buffers every unsampled
+        request's spans, which is the cost a lower rate is meant to save.
+
+        Operator overrides (set via the admin API) are merged on top.
+        """
+        target = settings.SDK_TARGET_SPANS_PER_MINUTE
+        min_rate = settings.SDK_MIN_SAMPLING_RATE
+        current_rate = max(min_rate, min(1.0, current_rate))
+
+        observed = SdkConfigService.observed_spans_per_minute(db, tenant_id, service)
+        if observed <= 0:
+            rate = min(1.0, current_rate * _MAX_RATE_STEP_UP)
+        else:
+            rate = current_rate * target / observed
+            rate = min(rate, current_rate * _MAX_RATE_STEP_UP)
+        rate = round(max(min_rate, min(1.0, rate)), 4)
+
+        unsampled = observed / current_rate
+        threshold = target * _AGGREGATION_OFF_RATIO if db_span_aggregation else target
+
+        config = {
+            "sampling_rate": rate,
+            "features": {
+                # Over target: collapse per-query DB spans into per-request summaries
+                "db_span_aggregation": unsampled > threshold,
+                # Opt-in: keep error and slow traces of unsampled requests
+                "tail_sampling": settings.SDK_TAIL_SAMPLING_ENABLED and rate < 1.0,
+            },
+            "tail_latency_ms": settings.HIGH_LATENCY_THRESHOLD_MS,
+            "observed_spans_per_minute": observed,
+        }
+
+        override = SdkConfigService.get_override(tenant_id, service)
+        if override:
+            config = SdkConfigService._merge(config, override)
+        return config
+
+    @staticmethod
+    def get_override(tenant_id: str, service: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Operator-set override for a service, falling back to the tenant-wide one."""
+        cache = get_cache_manager()
+        if service:
+            override = cache.get(tenant_id, f"sdk_config_override:{service}")
+            if override:
+                return override
+        return cache.get(tenant_id, "sdk_config_override")
+
+    @staticmethod
+    def set_override(
+        tenant_id: str, override: Dict[str, Any], ttl: int, service: Optional[str] = None
+    ) -> None:
+        """Store an operator override; SDKs pick it up on their next heartbeat."""
+        operation = f"sdk_config_override:{service}" if service else "sdk_config_override"
+        get_cache_manager().set(tenant_id, operation, override, ttl=ttl)
+        logger.info(f"SDK config override set for tenant {tenant_id} ({service or 'all services'}): {override}")
+
+    @staticmethod
+    def clear_override(tenant_id: str, service: Optional[str] = None) -> None:
+        """Remove an operator override (all of a tenant's overrides if no service given)."""
+        operation = f"sdk_config_override:{service}" if service else "sdk_config_override"
+        get_cache_manager().invalidate(tenant_id, operation)
+
+    @staticmethod
+    def _merge(config: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+        merged = {**config, "features": dict(config.get("features", {}))}
+        for key, value in override.items():
+            if key == "features" and isinstance(value, dict):
+                merged["features"].update(value)
+            elif value is not None:
+                merged[key] = value
+        merged["override"] = True
+        return merged
@@ -0,0 +1,163 @@
+"""
+Span Deduplication
+==================
+Drops spans the server has already stored, so SDK retries (a timeout after
+the server committed) do not inflate call counts and error rates.
+
+Two layers:
+
+  * a per-tenant, time-windowed Bloom filter of recently ingested span IDs.
+    A miss means the span is definitely new and goes straight to the bulk
+    INSERT.  A hit may be a false positive, so all hits of a batch are
+    confirmed with one indexed query per tenant — never one lookup per span.
+  * the unique ``(tenant_id, span_id)`` index with ``ON CONFLICT DO NOTHING``
+    catches whatever the filter cannot see (other workers, restarts).
+
+Each tenant keeps two generations of ``INGEST_DEDUP_WINDOW_SECONDS``; the
+older one is discarded on rotation, so memory stays bounded and a span ID is
+remembered for one to two windows.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import Span as DBSpan
+from models.span import Span as SpanIngest
+
+logger = get_logger(__name__)
+
+_FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float = _FALSE_POSITIVE_RATE):
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SpanDeduplicator:
+    """Per-tenant two-generation Bloom filters with batched confirmation."""
+
+    def __init__(self, window_seconds: int = 600, capacity: int = 100_000):
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        # tenant_id -> [current filter, previous filter or None]
+        self._filters: Dict[str, List[Optional[BloomFilter]]] = {}
+        self._rotated_at = time.monotonic()
+        self._stats: Dict[str, int] = {"checked": 0, "filter_hits": 0, "duplicates_dropped": 0}
+
+    def filter_new(
+        self, db: Session, items: List[Tuple[str, SpanIngest]]
+    ) -> List[Tuple[str, SpanIngest]]:
+        """Return *items* without spans already stored (or repeated within *items*)."""
+        self._maybe_rotate()
+        fresh: List[Tuple[str, SpanIngest]] = []
+        suspects: Dict[str, List[SpanIngest]] = defaultdict(list)
+        seen: Set[Tuple[str, str]] = set()
+        dropped = 0
+
+        with self._lock:
+            for tenant_id, span in items:
+                key = (tenant_id, span.span_id)
+                if key in seen:
+                    dropped += 1
+                    continue
+                seen.add(key)
+                if self._contains(tenant_id, span.span_id):
+                    suspects[tenant_id].append(span)
+                else:
+                    fresh.append((tenant_id, span))
+                self._add(tenant_id, span.span_id)
+
+        hits = sum(len(spans) for spans in suspects.values())
+        for tenant_id, spans in suspects.items():
+            stored = {
+                row[0]
+                for row in db.query(DBSpan.span_id).filter(
+                    DBSpan.tenant_id == tenant_id,
+                    DBSpan.span_id.in_([span.span_id for span in spans]),
+                )
+            }
+            for span in spans:
+                if span.span_id in stored:
+                    dropped += 1
+                else:
+                    fresh.append((tenant_id, span))
+
+        self._stats["checked"] += len(items)
+        self._stats["filter_hits"] += hits
+        self._stats["duplicates_dropped"] += dropped
+        if dropped:
+            logger.info(f"Dropped {dropped} duplicate span(s) on ingest")
+        return fresh
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "tenants": len(self._filters), "window_seconds": self.window_seconds}
+
+    def _contains(self, tenant_id: str, span_id: str) -> bool:
+        filters = self._filters.get(tenant_id)
+        return bool(filters) and any(f is not None and span_id in f for f in filters)
+
+    def _add(self, tenant_id: str, span_id: str) -> None:
+        filters = self._filters.get(tenant_id)
+        if filters is None:
+            filters = self._filters[tenant_id] = [None, None]
+        if filters[0] is None:
+            filters[0] = BloomFilter(self.capacity)
+        filters[0].add(span_id)
+
+    def _maybe_rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated_at < self.window_seconds:
+            return
+        with self._lock:
+            if now - self._rotated_at < self.window_seconds:
+                return
+            self._rotated_at = now
+            for tenant_id, (current, _previous) in list(self._filters.items()):
+                if current is None:
+                    # Nothing ingested for a whole window; the old generation expires
+                    del self._filters[tenant_id]
+                else:
+                    # The new generation is allocated on the tenant's next span
+                    self._filters[tenant_id] = [None, current]
+
+
+# Singleton
+_span_dedup: Optional[SpanDeduplicator] = None
+
+
+def get_span_deduplicator() -> SpanDeduplicator:
+    global _span_dedup
+    if _span_dedup is None:
+        settings = get_settings()
+        _span_dedup = SpanDeduplicator(
+            window_seconds=settings.INGEST_DEDUP_WINDOW_SECONDS,
+            capacity=settings.INGEST_DEDUP_CAPACITY,
+        )
+    return _span_dedup
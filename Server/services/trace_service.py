@@ -0,0 +1,212 @@
+"""
+Trace Retrieval
+===============
+Fetches one trace and assembles it into a waterfall.
+
+All spans of a trace are read with a single query on ``idx_tenant_trace``
+(only the columns the waterfall needs, no ORM objects), then assembled in
+memory in O(n log n):
+
+  * parent/child tree — spans whose parent is missing (not yet ingested,
+    sampled out) become additional roots rather than being dropped
+  * self time — a span's latency minus the union of its children's
+    intervals, clipped to the span, so parallel children are not counted
+    twice
+  * critical path — walking back from the end of the trace, at each level
+    the child that finished last before the cursor is on the path, then the
+    cursor moves to its start and the next child that finished by then is
+    taken (children still running at the cursor ran in parallel and are
+    skipped); the spans whose latency actually determined the trace's
+    end-to-end time
+
+Traces older than ``ARCHIVE_AFTER_DAYS`` can be read from the Parquet archive
+on request; that scans the tenant's archive files, so it is opt-in.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.archive import PYARROW_AVAILABLE, scan_archive
+from db.models import Span
+from services.rollup_service import is_error
+
+logger = get_logger(__name__)
+
+TRACE_COLUMNS = (
+    "span_id", "parent_span_id", "service_name", "operation", "kind",
+    "start_time", "latency_ms", "status_code", "error", "downstream",
+)
+_ArchivedSpan = namedtuple("_ArchivedSpan", TRACE_COLUMNS)
+
+
+def _covered_ms(start: float, end: float, intervals: Sequence[Tuple[float, float]]) -> float:
+    """Length of the union of *intervals* (sorted by start) clipped to ``[start, end]``."""
+    covered = 0.0
+    run_start = run_end = None
+    for child_start, child_end in intervals:
+        child_start, child_end = max(child_start, start), min(child_end, end)
+        if child_end <= child_start:
+            continue
+        if run_end is None or child_start > run_end:
+            if run_end is not None:
+                covered += run_end - run_start
+            run_start, run_end = child_start, child_end
+        else:
+            run_end = max(run_end, child_end)
+    if run_end is not None:
+        covered += run_end - run_start
+    return covered
+
+
+class TraceService:
+
+    @staticmethod
+    def fetch_spans(db: Session, tenant_id: str, trace_id: str, include_archive: bool = False) -> Tuple[List[Any], str]:
+        """Spans of one trace and where they came from (``live`` or ``archive``)."""
+        rows = (
+            db.query(*(getattr(Span, column) for column in TRACE_COLUMNS))
+            .filter(Span.tenant_id == tenant_id, Span.trace_id == trace_id)
+            .all()
+        )
+        if rows or not include_archive:
+            return rows, "live"
+
+        settings = get_settings()
+        if not (settings.ARCHIVE_ENABLED and PYARROW_AVAILABLE):
+            return [], "live"
+        table = scan_archive(tenant_id, columns=TRACE_COLUMNS, trace_id=trace_id)
+        return [_ArchivedSpan(**span) for span in table.to_pylist()], "archive"
+
+    @staticmethod
+    def assemble(trace_id: str, rows: Sequence[Any], source: str = "live") -> Optional[Dict[str, Any]]:
+        """Waterfall of one trace with self times and the critical path (None if no spans)."""
+        # Plain tuples in TRACE_COLUMNS order: unpacking them is much cheaper
+        # than attribute access on result rows, which adds up over big traces
+        spans: Dict[str, tuple] = {}
+        for row in rows:
+            spans.setdefault(row[0], tuple(row))
+        if not spans:
+            return None
+
+        trace_start: datetime = min(span[5] for span in spans.values())
+        start: Dict[str, float] = {}
+        end: Dict[str, float] = {}
+        for span_id, span in spans.items():
+            offset = (span[5] - trace_start).total_seconds() * 1000
+            start[span_id] = offset
+            end[span_id] = offset + (span[6] or 0.0)
+
+        children: Dict[str, List[str]] = defaultdict(list)
+        roots: List[str] = []
+        for span_id, span in spans.items():
+            parent = span[1]
+            if parent and parent != span_id and parent in spans:
+                children[parent].append(span_id)
+            else:
+                roots.append(span_id)
+        by_start = start.__getitem__
+        for kids in children.values():
+            kids.sort(key=by_start)
+        roots.sort(key=by_start)
+
+        # Waterfall order: depth-first, siblings by start time
+        order: List[Tuple[str, int]] = []
+        seen = set()
+
+        def _walk(root: str) -> None:
+            stack = [(root, 0)]
+            while stack:
+                span_id, depth = stack.pop()
+                if span_id in seen:
+                    continue
+                seen.add(span_id)
+                order.append((span_id, depth))
+                stack.extend((child, depth + 1) for child in reversed(children.get(span_id, ())))
+
+        for root in roots:
+            _walk(root)
+        if len(seen) < len(spans):
+            # Parent links that loop never reach a root; show them from their earliest span
+            for span_id in sorted(spans.keys() - seen, key=by_start):
+                if span_id not in seen:
+                    roots.append(span_id)
+                    _walk(span_id)
+
+        self_time = {
+            span_id: max(0.0, end[span_id] - start[span_id] - _covered_ms(
+                start[span_id], end[span_id], [(start[c], end[c]) for c in children.get(span_id, ())]
+            ))
+            for span_id in spans
+        }
+
+        trace_end = max(end.values())
+        critical = set()
+        stack: List[Tuple[Optional[str], float]] = [(None, trace_end)]
+        while stack:
+            span_id, cursor = stack.pop()
+            if span_id is not None:
+                if span_id in critical:
+                    continue
+                critical.add(span_id)
+            # A child still running at the cursor overlapped the one taken
+            # after it and did not hold the parent up; ends past the parent
+            # (clock skew) are clipped to it
+            limit = cursor
+            kids = roots if span_id is None else children.get(span_id, ())
+            for child in sorted(kids, key=end.__getitem__, reverse=True):
+                child_end = min(end[child], limit)
+                if child_end <= cursor:
+                    stack.append((child, child_end))
+                    cursor = start[child]
+
+        by_service: Dict[str, float] = defaultdict(float)
+        error_count = 0
+        waterfall = []
+        for span_id, depth in order:
+            _, parent, service, operation, kind, start_time, latency, status_code, error, downstream = spans[span_id]
+            by_service[service] += self_time[span_id]
+            error_count += is_error(error, status_code)
+            waterfall.append({
+                "span_id": span_id,
+                "parent_span_id": parent,
+                "service_name": service,
+                "operation": operation,
+                "kind": kind,
+                "start_time": start_time.isoformat(),
+                "start_offset_ms": round(start[span_id], 3),
+                "latency_ms": latency,
+                "self_time_ms": round(self_time[span_id], 3),
+                "depth": depth,
+                "status_code": status_code,
+                "error": error,
+                "downstream": downstream,
+                "critical": span_id in critical,
+            })
+
+        return {
+            "trace_id": trace_id,
+            "source": source,
+            "span_count": len(spans),
+            "service_count": len(by_service),
+            "error_count": error_count,
+            "start_time": trace_start.isoformat(),
+            "duration_ms": round(trace_end, 3),
+            "root_span_ids": roots,
+            "critical_path": [span_id for span_id, _ in order if span_id in critical],
+            "self_time_by_service": {
+                service: round(ms, 3)
+                for service, ms in sorted(by_service.items(), key=lambda item: item[1], reverse=True)
+            },
+            "spans": waterfall,
+        }
+
+    @staticmethod
+    def get_trace(db: Session, tenant_id: str, trace_id: str, include_archive: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch and assemble one trace (None if the tenant has no spans for it)."""
+        rows, source = TraceService.fetch_spans(db, tenant_id, trace_id, include_archive)
+        return TraceService.assemble(trace_id, rows, source)
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from models.workflow import Workflow
 from models.issue import Issue
+from db.threadpool import run_db
 from services.graph_service import GraphService
 from reasoning.langgraph_pipeline import WorkflowReasoningPipeline
 from core.logging import get_logger
@@ -22,10 +23,10 @@ class WorkflowGenerator:
         Generate workflows using BOTH LangGraph + Azure OpenAI for maximum intelligence
         Combines rule-based reasoning with AI creativity
         """
-        G = GraphService.get_graph_from_db(db, tenant_id)
+        G = await run_db(GraphService.get_graph_from_db, db, tenant_id)
         
         # Get architecture summary
-        nodes, edges = GraphService.build_graph(db, tenant_id)
+        nodes, edges = await run_db(GraphService.build_graph, db, tenant_id)
         architecture = {
             "services": [{"name": n.id, "type": n.type, "metrics": n.metrics.model_dump()} for n in nodes],
             "dependencies": [{"from": e.source, "to": e.target} for e in edges],
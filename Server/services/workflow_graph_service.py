@@ -13,6 +13,7 @@ from typing import List, Dict, Any, Tuple
 import networkx as nx
 
 from db.models import Span
+from db.threadpool import run_db
 from services.graph_service import GraphService
 from services.metrics_service import MetricsService
 from core.ai_client import get_ai_client
@@ -133,7 +134,7 @@ class WorkflowGraphService:
         Uses LangChain (read-only) for generating descriptions when available.
         """
         # Get the NetworkX graph for analysis
-        G = GraphService.get_graph_from_db(db, tenant_id)
+        G = await run_db(GraphService.get_graph_from_db, db, tenant_id)
         
         if not G or G.number_of_nodes() == 0:
             logger.info(f"No graph data for tenant {tenant_id}, returning empty variants")
@@ -143,19 +144,19 @@ class WorkflowGraphService:
         
         # Variant 1: Most common execution path
         if len(variants) < num_variants:
-            common_path_variant = WorkflowGraphService._generate_common_path_variant(G, db, tenant_id)
+            common_path_variant = await run_db(WorkflowGraphService._generate_common_path_variant, G, db, tenant_id)
             if common_path_variant:
                 variants.append(common_path_variant)
         
         # Variant 2: Optimized/reduced-latency path
         if len(variants) < num_variants:
-            optimized_variant = WorkflowGraphService._generate_optimized_variant(G, db, tenant_id)
+            optimized_variant = await run_db(WorkflowGraphService._generate_optimized_variant, G, db, tenant_id)
             if optimized_variant:
                 variants.append(optimized_variant)
         
         # Variant 3: High-reliability path
         if len(variants) < num_variants:
-            reliability_variant = WorkflowGraphService._generate_reliability_variant(G, db, tenant_id)
+            reliability_variant = await run_db(WorkflowGraphService._generate_reliability_variant, G, db, tenant_id)
             if reliability_variant:
                 variants.append(reliability_variant)
         
@@ -7,6 +7,7 @@ daemon thread so FastAPI remains non-blocking.
 Public API (used by the rest of the server):
   start_pipeline()          — call once in app lifespan startup
   push_span_to_stream(dict) — call from ingest endpoint after DB write
+  push_spans_to_stream(list) — same for a whole batch, in one pass
   get_stream_status()       — returns dict with pipeline health info
 """
 
@@ -18,7 +19,7 @@ import sys
 import threading
 import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 from core.logging import get_logger
 
@@ -220,6 +221,22 @@ def start_pipeline() -> None:
     logger.info("[Pathway] Streaming pipeline thread started.")
 
 
+def _enrich(span_dict: Dict[str, Any], now_iso: str) -> Dict[str, Any]:
+    """Add the Pathway-required derived fields to a raw span dict."""
+    status_code: Optional[int] = span_dict.get("status_code")
+    error: Optional[str] = span_dict.get("error")
+    downstream: Optional[str] = span_dict.get("downstream")
+
+    return {
+        **span_dict,
+        "is_error": bool(error or (status_code is not None and status_code >= 500)),
+        "has_downstream": downstream is not None and downstream != "",
+        "event_time": span_dict.get("timestamp", now_iso),
+        # Ensure tenant_id is present (ingest endpoint always provides it)
+        "tenant_id": span_dict.get("tenant_id", "default"),
+    }
+
+
 def push_span_to_stream(span_dict: Dict[str, Any]) -> None:
     """
     Push a span dict into the Pathway pipeline.
@@ -228,35 +245,35 @@ def push_span_to_stream(span_dict: Dict[str, Any]) -> None:
     Enriches the raw span with Pathway-required derived fields
     (is_error, has_downstream, event_time) before pushing.
     """
+    push_spans_to_stream((span_dict,))
+
+
+def push_spans_to_stream(span_dicts: Iterable[Dict[str, Any]]) -> None:
+    """
+    Push a batch of span dicts into the Pathway pipeline in one pass:
+    one enrichment loop, one subject lookup, one counter update.
+
+    *span_dicts* may be a generator — it is not consumed at all when
+    Pathway is unavailable, so callers can build the dicts lazily.
+    """
     global _span_count
 
     if not _pathway_available:
         return
 
+    pushed = 0
     try:
-        from streaming.connectors import get_span_subject
-
-        # Derive helper fields
-        status_code: Optional[int] = span_dict.get("status_code")
-        error: Optional[str] = span_dict.get("error")
-        downstream: Optional[str] = span_dict.get("downstream")
-
-        enriched = {
-            **span_dict,
-            "is_error": bool(error or (status_code is not None and status_code >= 500)),
-            "has_downstream": downstream is not None and downstream != "",
-            "event_time": span_dict.get("timestamp", datetime.utcnow().isoformat()),
-            # Ensure tenant_id is present (ingest endpoint always provides it)
-            "tenant_id": span_dict.get("tenant_id", "default"),
-        }
-
-        get_span_subject().push(enriched)
-
-        with _span_count_lock:
-            _span_count += 1
-
+        subject = get_span_subject()
+        now_iso = datetime.utcnow().isoformat()
+        for span_dict in span_dicts:
+            subject.push(_enrich(span_dict, now_iso))
+            pushed += 1
     except Exception as exc:
-        logger.debug(f"[Pathway] push_span_to_stream failed (non-critical): {exc}")
+        logger.debug(f"[Pathway] push_spans_to_stream failed after {pushed} span(s) (non-critical): {exc}")
+    finally:
+        if pushed:
+            with _span_count_lock:
+                _span_count += pushed
 
 
 def get_stream_status() -> Dict[str, Any]:
@@ -12,7 +12,7 @@ platforms — including Windows where Pathway cannot run.
 Flow (Windows / no-pathway mode):
   [Background thread — every POLL_INTERVAL seconds]
        │
-       ├─► SessionLocal (read-only DB query)
+       ├─► ReadSessionLocal (read-only DB query)
        │       ├─► MetricsService.compute_node_metrics()   per service
        │       └─► MetricsService.compute_global_metrics()
        │
@@ -48,7 +48,7 @@ def _poll_and_broadcast() -> None:
     Daemon thread target.  Polls the DB and broadcasts to all tenants that
     currently have at least one live WebSocket connection.
     """
-    from db.base import SessionLocal
+    from db.base import ReadSessionLocal
     from db.models import Span
     from sqlalchemy import distinct
     from streaming.websocket import get_ws_manager
@@ -76,7 +76,7 @@ def _poll_and_broadcast() -> None:
                 time.sleep(POLL_INTERVAL)
                 continue
 
-            db = SessionLocal()
+            db = ReadSessionLocal()
             try:
                 for tenant_id in active_tenants:
                     try:
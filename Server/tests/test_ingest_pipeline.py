@@ -0,0 +1,258 @@
+"""
+Unit tests for the span ingest path on SQLite (no server needed)
+Run: pytest tests/test_ingest_pipeline.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db.models  # noqa: F401  (registers the tables on Base)
+from core.config import get_settings
+from core.rate_limit import RateLimiter
+from db.base import Base
+from db.models import Span as DBSpan, Tenant
+from models.span import Span as SpanIngest
+from services import ingest_buffer as ingest_buffer_module
+from services.ingest_buffer import IngestBuffer
+from services.ingest_service import _SPAN_COLUMNS, IngestService, _insert_spans
+from services.quota import DEGRADED, EXCEEDED, OK, SpanQuota
+from services.rollup_service import RollupService
+
+T0 = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add_all([Tenant(id="t1", name="t1"), Tenant(id="t2", name="t2")])
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def no_dedup_filter(monkeypatch):
+    """Leave duplicates to the database's ON CONFLICT, as after a restart"""
+    monkeypatch.setattr(get_settings(), "INGEST_DEDUP_ENABLED", False)
+
+
+def span(span_id, minute=0, error=None, trace_id="trace", **fields):
+    start = T0 + timedelta(minutes=minute)
+    return SpanIngest(
+        trace_id=trace_id, span_id=span_id, service_name="svc", operation="GET /",
+        kind="server", start_time=start, end_time=start + timedelta(milliseconds=20),
+        latency_ms=20.0, status_code=500 if error else 200, error=error, **fields,
+    )
+
+
+def span_count(db, tenant_id="t1"):
+    return RollupService.totals(RollupService.query(db, tenant_id))["span_count"]
+
+
+# ── Dedup / ON CONFLICT ──────────────────────────────────────────────────────
+
+def test_insert_returns_only_new_rows(Session):
+    db = Session()
+
+    def row(span_id):
+        return {**{column: getattr(span(span_id), column) for column in _SPAN_COLUMNS}, "tenant_id": "t1"}
+
+    assert _insert_spans(db, [row("a"), row("b")]) == {("t1", "a"), ("t1", "b")}
+    db.commit()
+    assert _insert_spans(db, [row("b"), row("c")]) == {("t1", "c")}
+    db.commit()
+    assert db.query(DBSpan).count() == 3
+
+
+def test_resent_spans_are_stored_and_rolled_up_once(Session, no_dedup_filter):
+    db = Session()
+    stored, failed = IngestService.store_tenant_spans(db, [("t1", span("a")), ("t1", span("b"))])
+    assert [s.span_id for _, s in stored] == ["a", "b"] and failed == 0
+
+    # An SDK retry after a timeout: one span already stored, one new
+    stored, failed = IngestService.store_tenant_spans(db, [("t1", span("b")), ("t1", span("c"))])
+    assert [s.span_id for _, s in stored] == ["c"] and failed == 0
+    assert db.query(DBSpan).count() == 3
+    assert span_count(db) == 3
+
+
+def test_same_span_id_in_two_tenants_is_not_a_duplicate(Session, no_dedup_filter):
+    db = Session()
+    stored, _ = IngestService.store_tenant_spans(db, [("t1", span("a")), ("t2", span("a"))])
+    assert len(stored) == 2
+
+
+# ── Quota ────────────────────────────────────────────────────────────────────
+
+def test_quota_soft_then_hard_limit():
+    quota = SpanQuota(soft_ratio=0.8, degraded_sample_rate=0.0)
+    batch = [span("ok"), span("failed", error="boom")]
+
+    assert quota.admit("t1", batch, limit=10) == (batch, OK)
+    quota.count("t1", 7)
+    assert quota.admit("t1", batch, limit=10) == (batch, OK)
+
+    # Past the soft limit only error spans (and sampled traces) are kept
+    quota.count("t1", 1)
+    admitted, state = quota.admit("t1", batch, limit=10)
+    assert state == DEGRADED
+    assert [s.span_id for s in admitted] == ["failed"]
+
+    quota.count("t1", 2)
+    assert quota.admit("t1", batch, limit=10) == ([], EXCEEDED)
+    assert quota.usage("t1", 10)["state"] == EXCEEDED
+
+    # Other tenants and unlimited tenants are unaffected
+    assert quota.admit("t2", batch, limit=10) == (batch, OK)
+    assert quota.admit("t1", batch, limit=None) == (batch, OK)
+
+
+def test_quota_admit_does_not_count_spans():
+    quota = SpanQuota()
+    for _ in range(3):
+        quota.admit("t1", [span("a")], limit=2)
+    assert quota.usage("t1", 2)["spans_today"] == 0
+
+
+# ── Rollups ──────────────────────────────────────────────────────────────────
+
+def test_rollup_upsert_accumulates_into_one_row_per_bucket(Session, no_dedup_filter):
+    db = Session()
+    IngestService.store_tenant_spans(db, [("t1", span("a")), ("t1", span("b", error="boom"))])
+    IngestService.store_tenant_spans(db, [("t1", span("c", minute=1))])
+
+    rows = RollupService.query(db, "t1", group_by=["bucket"])
+    assert len(rows) == 1  # one hour bucket
+    totals = RollupService.totals(rows)
+    assert (totals["span_count"], totals["error_count"], totals["latency_sum"]) == (3, 1, 60.0)
+
+
+def test_rollup_rebuild_is_idempotent(Session, no_dedup_filter):
+    db = Session()
+    IngestService.store_tenant_spans(db, [("t1", span(f"s{i}", minute=i * 30)) for i in range(5)])
+    IngestService.store_tenant_spans(db, [("t2", span("other"))])
+    before = RollupService.query(db, "t1", group_by=["bucket"])
+
+    assert RollupService.rebuild(db, "t1") == 5
+    assert RollupService.rebuild(db, "t1") == 5
+    assert RollupService.query(db, "t1", group_by=["bucket"]) == before
+    assert span_count(db, "t2") == 1
+
+
+def test_rollup_rebuild_keeps_history_older_than_raw_spans(Session, no_dedup_filter):
+    db = Session()
+    IngestService.store_tenant_spans(db, [("t1", span("old")), ("t1", span("new", minute=120))])
+    # Raw spans of the first hour are gone (retention, archive); its rollup is not
+    db.query(DBSpan).filter(DBSpan.span_id == "old").delete()
+    db.commit()
+
+    RollupService.rebuild(db, "t1")
+    assert span_count(db) == 2
+
+
+# ── Group-commit buffer ──────────────────────────────────────────────────────
+
+async def _wait_for(buffer, until):
+    for _ in range(500):
+        if until(buffer.stats()):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"buffer did not settle: {buffer.stats()}")
+
+
+def test_buffer_drops_only_the_bad_row(Session, monkeypatch, no_dedup_filter):
+    monkeypatch.setattr(ingest_buffer_module, "SessionLocal", Session)
+    bad = SpanIngest.model_construct(**{**span("bad").model_dump(), "service_name": None})
+    spans = [span(f"s{i}") for i in range(9)] + [bad]
+
+    async def run():
+        buffer = IngestBuffer(commit_ms=1, retry_backoff=0.01)
+        buffer.start()
+        assert buffer.submit("t1", spans)
+        await buffer.stop()
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["written"], stats["failed"], stats["retries"]) == (9, 1, 0)
+    assert Session().query(DBSpan).count() == 9
+
+
+def test_buffer_retries_then_drops_when_database_is_down(Session, tmp_path, monkeypatch, no_dedup_filter):
+    down = create_engine(f"sqlite:///{tmp_path / 'missing' / 'ingest.db'}")
+    monkeypatch.setattr(ingest_buffer_module, "SessionLocal", sessionmaker(bind=down))
+
+    async def run():
+        buffer = IngestBuffer(commit_ms=1, max_retries=2, retry_backoff=0.01)
+        buffer.start()
+        assert buffer.submit("t1", [span("a"), span("b")])
+        await _wait_for(buffer, lambda s: s["retries"] >= 1)
+        # Backpressure while the group is being retried
+        assert buffer.commit_failing
+        assert not buffer.submit("t1", [span("c")])
+
+        await _wait_for(buffer, lambda s: s["failed"] == 2)
+        assert buffer.stats()["retries"] == 2
+
+        # The database is back: the buffer takes spans again
+        monkeypatch.setattr(ingest_buffer_module, "SessionLocal", Session)
+        assert buffer.submit("t1", [span("d")])
+        await buffer.stop()
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["written"], stats["failed"], stats["rejected"]) == (1, 2, 1)
+    assert not stats["commit_failing"]
+
+
+# ── Rate limiter ─────────────────────────────────────────────────────────────
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_token_bucket_local_fallback(monkeypatch):
+    import core.rate_limit as rate_limit
+
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    limiter = RateLimiter()
+
+    def redis_down(**kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(limiter, "_redis_script", lambda: redis_down)
+
+    # 60/min: a burst of one minute's worth, then one token per second
+    assert [limiter.check("t1", 60)[0] for _ in range(61)] == [True] * 60 + [False]
+    allowed, remaining, wait = limiter.check("t1", 60)
+    assert (allowed, remaining) == (False, 0) and wait == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert limiter.check("t1", 60)[0]
+    assert limiter.check("t2", 60)[:2] == (True, 59)
+
+
+def test_token_bucket_without_redis_runs_inline():
+    limiter = RateLimiter()
+    limiter._redis_script = lambda: None
+    results = asyncio.run(_acheck_many(limiter, 3))
+    assert [allowed for allowed, _, _ in results] == [True, True, False]
+
+
+async def _acheck_many(limiter, n):
+    return [await limiter.acheck("t1", 2) for _ in range(n)]
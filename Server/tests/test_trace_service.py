@@ -0,0 +1,88 @@
+"""
+Unit tests for trace assembly (no server needed)
+Run: pytest tests/test_trace_service.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.trace_service import TraceService, _ArchivedSpan
+
+T0 = datetime(2026, 1, 16, 10, 30)
+
+
+def span(span_id, parent, start_ms, end_ms, service="svc"):
+    return _ArchivedSpan(
+        span_id=span_id, parent_span_id=parent, service_name=service, operation=span_id,
+        kind="internal", start_time=T0 + timedelta(milliseconds=start_ms),
+        latency_ms=float(end_ms - start_ms), status_code=None, error=None, downstream=None,
+    )
+
+
+def assemble(*spans):
+    return TraceService.assemble("trace", spans)
+
+
+def test_empty_trace():
+    assert assemble() is None
+
+
+def test_sequential_children_are_all_critical():
+    trace = assemble(span("P", None, 0, 120), span("A", "P", 5, 25), span("B", "P", 60, 110))
+    assert trace["critical_path"] == ["P", "A", "B"]
+    assert trace["duration_ms"] == 120.0
+
+
+def test_overlapping_children_only_the_last_to_finish_is_critical():
+    trace = assemble(span("P", None, 0, 100), span("A", "P", 10, 100), span("B", "P", 5, 90))
+    assert trace["critical_path"] == ["P", "A"]
+    critical = {s["span_id"]: s["critical"] for s in trace["spans"]}
+    assert critical == {"P": True, "B": False, "A": True}
+
+
+def test_parallel_child_is_skipped_but_earlier_child_is_taken():
+    trace = assemble(
+        span("P", None, 0, 100),
+        span("A", "P", 50, 100),
+        span("B", "P", 0, 40),
+        span("C", "P", 30, 60),
+    )
+    assert trace["critical_path"] == ["P", "B", "A"]
+
+
+def test_critical_path_descends_into_grandchildren():
+    trace = assemble(
+        span("P", None, 0, 100),
+        span("A", "P", 0, 100),
+        span("A1", "A", 0, 30),
+        span("A2", "A", 20, 90),
+        span("B", "P", 0, 50),
+    )
+    assert trace["critical_path"] == ["P", "A", "A2"]
+
+
+def test_child_ending_after_parent_is_clipped():
+    # Clock skew: the child appears to end after its parent
+    trace = assemble(span("P", None, 0, 100), span("A", "P", 10, 105))
+    assert trace["critical_path"] == ["P", "A"]
+
+
+def test_self_time_counts_parallel_children_once():
+    trace = assemble(
+        span("P", None, 0, 100, "gateway"),
+        span("A", "P", 10, 60, "orders"),
+        span("B", "P", 30, 80, "orders"),
+    )
+    self_time = {s["span_id"]: s["self_time_ms"] for s in trace["spans"]}
+    assert self_time == {"P": 30.0, "A": 50.0, "B": 50.0}
+    assert trace["self_time_by_service"] == {"orders": 100.0, "gateway": 30.0}
+
+
+def test_orphans_become_roots_in_waterfall_order():
+    trace = assemble(span("P", None, 0, 50), span("C", "P", 10, 20), span("X", "missing", 5, 40))
+    assert trace["root_span_ids"] == ["P", "X"]
+    assert [(s["span_id"], s["depth"]) for s in trace["spans"]] == [("P", 0), ("C", 1), ("X", 0)]
+    # X ran in parallel with P and finished first
+    assert trace["critical_path"] == ["P", "C"]
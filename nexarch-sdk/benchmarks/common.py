@@ -0,0 +1,93 @@
+"""Shared helpers for the Nexarch SDK benchmarks: environment info and JSON results"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+SDK_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Committed reference results: ``--baseline`` without a file compares against these
+BASELINE_DIR = Path(__file__).resolve().parent / "baseline"
+
+# Make the in-tree package importable without `pip install -e .`
+if str(SDK_ROOT) not in sys.path:
+    sys.path.insert(0, str(SDK_ROOT))
+
+
+def environment() -> Dict[str, Any]:
+    """Describe where the numbers came from, so runs can be compared fairly."""
+    from nexarch import __version__
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SDK_ROOT, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "sdk_version": __version__,
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def write_results(kind: str, results: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Write ``{"kind", "environment", "results"}`` as JSON and return the path."""
+    if output:
+        path = Path(output)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = RESULTS_DIR / f"{kind}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"kind": kind, "environment": environment(), "results": results}, f, indent=2)
+    return path
+
+
+def baseline_path(kind: str) -> Path:
+    """Committed baseline for a benchmark kind (``micro``, ``overhead``)."""
+    return BASELINE_DIR / f"{kind}.json"
+
+
+def compare(baseline_file: str, results: Dict[str, Any], metrics: List[str],
+            tolerance: float) -> List[str]:
+    """
+    Compare *results* against a previous results file.
+
+    Returns one line per metric that got worse by more than *tolerance*
+    (a fraction, e.g. 0.10 for 10%).  Lower is better for every metric.
+    """
+    with open(baseline_file) as f:
+        baseline = json.load(f).get("results", {})
+
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in metrics:
+            old, new = previous.get(metric), current.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{name}.{metric}: {old:.4g} -> {new:.4g} (+{change:.0%})")
+    return regressions
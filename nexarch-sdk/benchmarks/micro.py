@@ -0,0 +1,138 @@
+"""
+Microbenchmarks for the SDK's per-request hot paths.
+
+    python benchmarks/micro.py [--number 20000] [--output FILE]
+                               [--baseline [FILE]] [--save-baseline]
+
+Each benchmark reports the best-of-N time per operation in nanoseconds.
+``--baseline`` alone compares against the committed
+``benchmarks/baseline/micro.json``; numbers are machine-specific, so
+refresh it with ``--save-baseline`` on the machine that runs the check.
+"""
+import argparse
+import sys
+import timeit
+from typing import Callable, Dict, Any
+
+import common  # noqa: F401  (puts the in-tree SDK on sys.path)
+from common import baseline_path, write_results, compare
+
+from nexarch.instrumentation.db_patch import sanitize_sql
+from nexarch.tracing import Span
+from nexarch.queue import LogQueue
+from nexarch.exporters import HttpExporter
+
+_SQL = (
+    "SELECT u.id, u.email, o.total FROM users u JOIN orders o ON o.user_id = u.id "
+    "WHERE u.email = 'someone@example.com' AND o.total > 250.50 "
+    "AND o.status IN ('paid', 'shipped', 'refunded') ORDER BY o.created_at DESC LIMIT 50"
+)
+
+
+def bench_sanitize_sql() -> None:
+    sanitize_sql(_SQL)
+
+
+def bench_span_creation() -> None:
+    span = Span.create_server_span(
+        trace_id="4bf92f3577b34da6a3ce929d0e0e4736",
+        span_id="00f067aa0ba902b7",
+        service="bench",
+        operation="GET /items/{id}",
+    )
+    span.tags = {"method": "GET", "path": "/items/42"}
+    span.finish(status_code=200)
+    span.to_dict()
+
+
+def make_enqueue() -> Callable[[], None]:
+    # Not started: measures the producer side only.  Drained on fill so
+    # enqueue never hits the overflow (drop) branch.
+    queue = LogQueue()
+    capacity = queue.stats()["capacity"]
+    item = {"type": "span", "timestamp": "2026-01-01T00:00:00", "data": {"span_id": "x"}}
+
+    def run() -> None:
+        if len(queue) >= capacity:
+            queue.drain()
+        queue.enqueue(item)
+
+    return run
+
+
+class _FakeResponse:
+    status_code = 202
+    text = ""
+    headers: Dict[str, str] = {}
+
+    def json(self) -> Dict[str, Any]:
+        return {}
+
+
+def make_http_batching() -> Callable[[], None]:
+    # The network is replaced by an instant 202 so only batching, AIMD
+    # bookkeeping and pool dispatch are timed.
+    exporter = HttpExporter("http://bench.invalid", "bench-key")
+    exporter.session.post = lambda *args, **kwargs: _FakeResponse()
+    item = {"type": "span", "data": {"span_id": "x", "latency_ms": 1.0}}
+
+    def run() -> None:
+        exporter.export(item)
+
+    run.exporter = exporter  # type: ignore[attr-defined]
+    return run
+
+
+def measure(func: Callable[[], None], number: int, repeat: int) -> Dict[str, float]:
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    best = min(timings) / number
+    return {
+        "ns_per_op": round(best * 1e9, 1),
+        "ops_per_sec": round(1 / best) if best else None,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is kept)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/micro-<ts>.json)")
+    parser.add_argument("--baseline", nargs="?", const=str(baseline_path("micro")),
+                        help="results file to compare against (default: benchmarks/baseline/micro.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="also write the results to benchmarks/baseline/micro.json")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    http_batching = make_http_batching()
+    benchmarks = {
+        "sanitize_sql": bench_sanitize_sql,
+        "span_creation": bench_span_creation,
+        "log_queue_enqueue": make_enqueue(),
+        "http_exporter_batching": http_batching,
+    }
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = measure(func, args.number, args.repeat)
+        print(f"{name:<26} {results[name]['ns_per_op']:>12,.1f} ns/op")
+    http_batching.exporter.close()
+
+    path = write_results("micro", results, args.output)
+    print(f"Results written to {path}")
+    if args.save_baseline:
+        saved = write_results("micro", results, str(baseline_path("micro")))
+        print(f"Baseline written to {saved}")
+
+    if args.baseline:
+        regressions = compare(args.baseline, results, ["ns_per_op"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
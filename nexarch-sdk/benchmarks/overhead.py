@@ -0,0 +1,256 @@
+"""
+End-to-end SDK overhead: a small FastAPI app driven by an in-process load
+generator, with and without ``NexarchSDK.init``.
+
+    python benchmarks/overhead.py [--requests 3000] [--concurrency 16]
+                                  [--scenarios baseline,null-1.0,...]
+                                  [--output FILE] [--baseline [FILE]]
+                                  [--save-baseline]
+
+Every scenario runs in its own subprocess because the SDK installs global
+patches and background threads.  Requests go through ``httpx.ASGITransport``
+so the numbers exclude socket and server overhead and isolate the middleware.
+
+Scenario names are ``baseline`` or ``<export>-<sampling rate>`` where export
+is ``null`` (spans discarded after the queue), ``local`` (JSON files) or
+``http`` (HttpExporter against a local stub backend).
+
+``--baseline`` alone compares against the committed
+``benchmarks/baseline/overhead.json`` (refresh with ``--save-baseline``).
+"""
+import argparse
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, List
+
+import common  # noqa: F401  (puts the in-tree SDK on sys.path)
+from common import baseline_path, percentile, write_results, compare
+
+# Marks the child's result line among whatever the SDK prints
+_RESULT_PREFIX = "NEXARCH_BENCH_RESULT "
+
+DEFAULT_SCENARIOS = [
+    "baseline",
+    "null-1.0",
+    "null-0.1",
+    "null-0.0",
+    "local-1.0",
+    "http-1.0",
+    "http-0.1",
+]
+
+
+# ── Target app ────────────────────────────────────────────────────────────────
+
+def build_app(scenario: str, workdir: Path):
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "name": f"item-{item_id}", "tags": ["a", "b", "c"]}
+
+    if scenario == "baseline":
+        return app, None, None
+
+    from nexarch import NexarchSDK
+    from nexarch.exporters.base import Exporter
+    from nexarch.queue import get_log_queue
+
+    export, rate = scenario.split("-", 1)
+    options: Dict[str, Any] = {
+        "api_key": "bench-key",
+        "service_name": "bench",
+        "sampling_rate": float(rate),
+        "log_file": str(workdir / "telemetry.json"),
+        "enable_local_logs": export == "local",
+        "enable_auto_discovery": False,
+        "enable_runtime_metrics": False,
+    }
+    stub = None
+    if export == "http":
+        stub = _StubBackend()
+        options.update(enable_http_export=True, http_endpoint=stub.url)
+
+    sdk = NexarchSDK(**options)
+    sdk.init(app)
+
+    if export == "null":
+        class _NullExporter(Exporter):
+            def export(self, data):
+                pass
+
+            def close(self):
+                pass
+
+        get_log_queue().set_exporter(_NullExporter())
+    return app, sdk, stub
+
+
+class _StubBackend:
+    """Accepts every POST with 202 so HTTP export never blocks on a real server."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.send_response(202)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+# ── Load generator ────────────────────────────────────────────────────────────
+
+async def drive(app, requests: int, concurrency: int) -> List[float]:
+    """Issue *requests* GETs with at most *concurrency* in flight; return latencies (ms)."""
+    import httpx
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"/items/{i % 1000}")
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"unexpected status {response.status_code}")
+
+        await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+def run_scenario(scenario: str, requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        app, sdk, stub = build_app(scenario, Path(tmp))
+        try:
+            asyncio.run(drive(app, warmup, concurrency))
+
+            gc.collect()
+            blocks_before = sys.getallocatedblocks()
+            cpu_before = time.process_time()
+            wall_before = time.perf_counter()
+            latencies = asyncio.run(drive(app, requests, concurrency))
+            wall = time.perf_counter() - wall_before
+            cpu = time.process_time() - cpu_before
+            gc.collect()
+            retained_blocks = sys.getallocatedblocks() - blocks_before
+
+            # Allocation pass — tracemalloc slows everything down, so it gets
+            # its own shorter run and is never mixed into the timings above.
+            traced = max(100, requests // 10)
+            tracemalloc.start()
+            asyncio.run(drive(app, traced, concurrency))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            # Drain telemetry while the stub backend is still listening
+            if sdk is not None:
+                sdk.close()
+            if stub is not None:
+                stub.close()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "rps": round(requests / wall, 1),
+        # Includes SDK background threads (export, queue) — that cost is real
+        "cpu_ms_per_req": round(cpu * 1000 / requests, 4),
+        "retained_blocks_per_req": round(retained_blocks / requests, 2),
+        "peak_alloc_kb_per_req": round(peak / 1024 / traced, 2),
+    }
+
+
+def add_overhead(results: Dict[str, Dict[str, Any]]) -> None:
+    """Annotate each SDK scenario with its delta against ``baseline``."""
+    base = results.get("baseline")
+    if not base:
+        return
+    for name, result in results.items():
+        if name == "baseline":
+            continue
+        for metric in ("p50_ms", "p99_ms", "cpu_ms_per_req", "peak_alloc_kb_per_req"):
+            result[f"added_{metric}"] = round(result[metric] - base[metric], 4)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Nexarch SDK end-to-end overhead benchmark")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=300)
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS))
+    parser.add_argument("--output", help="results file (default: benchmarks/results/overhead-<ts>.json)")
+    parser.add_argument("--baseline", nargs="?", const=str(baseline_path("overhead")),
+                        help="results file to compare against (default: benchmarks/baseline/overhead.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="also write the results to benchmarks/baseline/overhead.json")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown vs baseline")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)  # child-process mode
+    args = parser.parse_args()
+
+    if args.scenario:
+        result = run_scenario(args.scenario, args.requests, args.concurrency, args.warmup)
+        print(_RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--scenario", scenario,
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+             "--warmup", str(args.warmup)],
+            capture_output=True, text=True,
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(_RESULT_PREFIX)]
+        if proc.returncode != 0 or not lines:
+            print(f"{scenario}: failed\n{proc.stderr[-2000:]}")
+            continue
+        results[scenario] = json.loads(lines[-1][len(_RESULT_PREFIX):])
+        r = results[scenario]
+        print(f"{scenario:<12} p50 {r['p50_ms']:>8.3f} ms  p99 {r['p99_ms']:>8.3f} ms  "
+              f"cpu {r['cpu_ms_per_req']:>7.4f} ms/req  {r['rps']:>9.1f} req/s")
+
+    add_overhead(results)
+    path = write_results("overhead", results, args.output)
+    print(f"Results written to {path}")
+    if args.save_baseline:
+        saved = write_results("overhead", results, str(baseline_path("overhead")))
+        print(f"Baseline written to {saved}")
+
+    if args.baseline:
+        regressions = compare(args.baseline, results,
+                              ["p50_ms", "p99_ms", "cpu_ms_per_req"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
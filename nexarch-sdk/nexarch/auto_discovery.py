@@ -332,12 +332,24 @@ class TrafficAnalyzer:
     - Error-prone paths
     - Latency distributions
     - Request volumes over time
+    - Bandwidth-heavy paths (request/response bytes)
     """
     
+    # Average response size above which an endpoint counts as bandwidth-heavy
+    HEAVY_RESPONSE_BYTES = 1024 * 1024
+    
     def __init__(self):
         self.endpoint_stats: Dict[str, Dict[str, Any]] = {}
     
-    def record_request(self, endpoint: str, latency_ms: float, status_code: int):
+    def record_request(
+        self,
+        endpoint: str,
+        latency_ms: float,
+        status_code: int,
+        ttfb_ms: Optional[float] = None,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+    ):
         """Record a request for traffic analysis"""
         if endpoint not in self.endpoint_stats:
             self.endpoint_stats[endpoint] = {
@@ -346,6 +358,12 @@ class TrafficAnalyzer:
                 "total_latency_ms": 0,
                 "min_latency_ms": float('inf'),
                 "max_latency_ms": 0,
+                "timed_requests": 0,
+                "total_ttfb_ms": 0,
+                "max_ttfb_ms": 0,
+                "total_request_bytes": 0,
+                "total_response_bytes": 0,
+                "max_response_bytes": 0,
                 "status_codes": {}
             }
         
@@ -355,6 +373,14 @@ class TrafficAnalyzer:
         stats["min_latency_ms"] = min(stats["min_latency_ms"], latency_ms)
         stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
         
+        if ttfb_ms is not None:
+            stats["timed_requests"] += 1
+            stats["total_ttfb_ms"] += ttfb_ms
+            stats["max_ttfb_ms"] = max(stats["max_ttfb_ms"], ttfb_ms)
+        stats["total_request_bytes"] += request_bytes
+        stats["total_response_bytes"] += response_bytes
+        stats["max_response_bytes"] = max(stats["max_response_bytes"], response_bytes)
+        
         if status_code >= 500:
             stats["total_errors"] += 1
         
@@ -367,7 +393,10 @@ class TrafficAnalyzer:
             "hot_paths": [],
             "error_prone_paths": [],
             "slow_paths": [],
-            "total_requests": 0
+            "bandwidth_heavy_paths": [],
+            "total_requests": 0,
+            "total_request_bytes": 0,
+            "total_response_bytes": 0
         }
         
         for endpoint, stats in self.endpoint_stats.items():
@@ -393,17 +422,33 @@ class TrafficAnalyzer:
                     "total_errors": stats["total_errors"]
                 })
             
-            # Slow paths
+            # Slow paths — TTFB separates slow handlers from slow streaming
             if avg_latency > 1000:
+                timed = stats.get("timed_requests", 0)
                 patterns["slow_paths"].append({
                     "endpoint": endpoint,
                     "avg_latency_ms": round(avg_latency, 2),
-                    "max_latency_ms": stats["max_latency_ms"]
+                    "max_latency_ms": stats["max_latency_ms"],
+                    "avg_ttfb_ms": round(stats["total_ttfb_ms"] / timed, 2) if timed else None
+                })
+            
+            # Bandwidth-heavy paths
+            patterns["total_request_bytes"] += stats.get("total_request_bytes", 0)
+            patterns["total_response_bytes"] += stats.get("total_response_bytes", 0)
+            avg_response_bytes = stats.get("total_response_bytes", 0) / total_requests if total_requests > 0 else 0
+            if avg_response_bytes > self.HEAVY_RESPONSE_BYTES:
+                patterns["bandwidth_heavy_paths"].append({
+                    "endpoint": endpoint,
+                    "avg_response_bytes": int(avg_response_bytes),
+                    "max_response_bytes": stats["max_response_bytes"],
+                    "total_response_bytes": stats["total_response_bytes"],
+                    "avg_request_bytes": int(stats["total_request_bytes"] / total_requests)
                 })
         
         # Sort by relevance
         patterns["hot_paths"].sort(key=lambda x: x["requests"], reverse=True)
         patterns["error_prone_paths"].sort(key=lambda x: x["error_rate"], reverse=True)
         patterns["slow_paths"].sort(key=lambda x: x["avg_latency_ms"], reverse=True)
+        patterns["bandwidth_heavy_paths"].sort(key=lambda x: x["total_response_bytes"], reverse=True)
         
         return patterns
@@ -6,6 +6,11 @@ from .router import nexarch_router
 from .loggers import NexarchLogger
 from .exporters import LocalJSONExporter, HttpExporter
 from .queue import get_log_queue
+from .runtime_config import get_runtime_config
+from .error_sampling import get_error_sampler, configure_error_sampler
+from .runtime_health import get_runtime_health, configure_runtime_health
+from .profiler import get_profiler, configure_profiler
+from .models import ErrorSummaryData
 from .instrumentation import patch_requests, patch_httpx
 from .instrumentation.db_patch import patch_all_databases
 from typing import Optional
@@ -29,6 +34,17 @@ class NexarchSDK:
         enable_auto_discovery: bool = True,
         enable_db_instrumentation: bool = True,
         heartbeat_interval: int = _HEARTBEAT_INTERVAL,
+        max_tracebacks_per_error: int = 5,
+        error_sampling_interval: float = 60.0,
+        enable_runtime_metrics: bool = True,
+        runtime_metrics_interval: float = 15.0,
+        loop_lag_interval: float = 0.5,
+        enable_profiler: bool = False,
+        profiler_hz: float = 100.0,
+        profiler_threshold_ms: float = 500.0,
+        profiler_max_cpu: float = 0.02,
+        queue_capacity: int = 10_000,
+        queue_overflow: str = "drop_newest",
     ):
         self.api_key = api_key
         self.environment = environment
@@ -42,6 +58,7 @@ class NexarchSDK:
         self.enable_auto_discovery = enable_auto_discovery
         self.enable_db_instrumentation = enable_db_instrumentation
         self.heartbeat_interval = heartbeat_interval
+        self.enable_runtime_metrics = enable_runtime_metrics
         self._heartbeat_timer: Optional[threading.Timer] = None
 
         # Init logger
@@ -50,6 +67,9 @@ class NexarchSDK:
             enable_local_logs=enable_local_logs
         )
 
+        # Full tracebacks per error fingerprint per interval; the rest are counted
+        configure_error_sampler(max_tracebacks_per_error, error_sampling_interval)
+
         # Setup exporter
         if enable_http_export and http_endpoint:
             self._exporter = HttpExporter(http_endpoint, api_key)
@@ -57,9 +77,29 @@ class NexarchSDK:
             self._exporter = LocalJSONExporter(log_file)
 
         queue = get_log_queue()
+        queue.configure(capacity=queue_capacity, overflow=queue_overflow)
         queue.set_exporter(self._exporter)
+        # Report suppressed-error counts when a window closes, not at the next error
+        queue.set_periodic('error_summaries', self._drain_error_summaries)
         queue.start()
 
+        # Event-loop lag, GC pauses, RSS and thread count
+        if enable_runtime_metrics:
+            configure_runtime_health(
+                self.service_name,
+                report_interval=runtime_metrics_interval,
+                loop_lag_interval=loop_lag_interval,
+            )
+
+        # Opt-in sampling profiler for slow spans
+        if enable_profiler:
+            configure_profiler(
+                hz=profiler_hz,
+                threshold_ms=profiler_threshold_ms,
+                max_cpu_fraction=profiler_max_cpu,
+            )
+            print(f"[Nexarch] Profiler enabled at {profiler_hz} Hz for spans over {profiler_threshold_ms} ms")
+
         # Patch HTTP clients
         patch_requests()
         patch_httpx()
@@ -99,8 +139,21 @@ class NexarchSDK:
     def close(self) -> None:
         """Stop the heartbeat timer and flush remaining telemetry."""
         self._stop_heartbeat()
+        health = get_runtime_health()
+        if health is not None and health.running:
+            health.report()
+            health.stop()
+        profiler = get_profiler()
+        if profiler is not None:
+            profiler.stop()
+        self._drain_error_summaries(force=True)
         get_log_queue().flush()
 
+    def _drain_error_summaries(self, force: bool = False) -> None:
+        """Log summaries of closed error-sampling windows (all windows if *force*)."""
+        for summary in get_error_sampler().drain_summaries(force=force):
+            NexarchLogger.log_error_summary(ErrorSummaryData(service=self.service_name, **summary))
+
     # ── Heartbeat ─────────────────────────────────────────────────────────────
 
     def _start_heartbeat(self) -> None:
@@ -120,13 +173,28 @@ class NexarchSDK:
         self._heartbeat_timer.start()
 
     def _heartbeat_tick(self) -> None:
-        """Send heartbeat to backend and reschedule."""
+        """Send heartbeat to backend, apply any pushed config, and reschedule."""
         try:
             if isinstance(self._exporter, HttpExporter):
-                self._exporter._send_with_retry(
-                    '/api/v1/sdk/heartbeat',
-                    {'service': self.service_name, 'environment': self.environment},
+                runtime = get_runtime_config()
+                effective_rate = (
+                    self.sampling_rate if runtime.sampling_rate is None
+                    else runtime.sampling_rate
                 )
+                payload = {
+                    'service': self.service_name,
+                    'environment': self.environment,
+                    'sampling_rate': effective_rate,
+                    # Lets the backend keep a switch on without flapping
+                    'features': runtime.snapshot()['features'],
+                }
+                health = get_runtime_health()
+                if health is not None and health.latest:
+                    payload['runtime'] = health.latest
+                response = self._exporter.send_heartbeat(payload)
+                config = (response or {}).get('config')
+                if config and runtime.apply(config):
+                    print(f"[Nexarch] Applied remote config: {runtime.snapshot()}")
         except Exception as e:
             print(f"[Nexarch] Heartbeat failed: {e}")
         finally:
@@ -0,0 +1,135 @@
+"""Error fingerprinting and sampled traceback capture"""
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Innermost frames that make up a fingerprint
+_FINGERPRINT_FRAMES = 5
+# Hex addresses / numbers in messages are not part of the fingerprint
+_RE_VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d+')
+
+
+def fingerprint_exception(exc: BaseException, frames: int = _FINGERPRINT_FRAMES) -> str:
+    """
+    Stable fingerprint for an exception: its qualified type plus the
+    module/function of the innermost *frames* traceback frames.
+
+    Line numbers are left out so a fingerprint survives unrelated edits,
+    and the traceback is walked directly instead of being formatted.
+    """
+    exc_type = type(exc)
+    parts: List[str] = [f"{exc_type.__module__}.{exc_type.__qualname__}"]
+
+    tb = exc.__traceback__
+    tail: List[str] = []
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        tail.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        tb = tb.tb_next
+    parts.extend(tail[-frames:])
+
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def normalize_error_message(message: str, max_length: int = 200) -> str:
+    """Strip numbers/addresses from an error message for grouping."""
+    return _RE_VOLATILE.sub('?', message or '')[:max_length]
+
+
+class ErrorSampler:
+    """
+    Per-fingerprint rate limiter for full traceback capture.
+
+    The first ``max_full_per_interval`` occurrences of a fingerprint in each
+    ``interval_seconds`` window are captured in full; later ones are only
+    counted and reported as one summary record when the window closes.
+    """
+
+    def __init__(self, max_full_per_interval: int = 5, interval_seconds: float = 60.0):
+        self.max_full_per_interval = max_full_per_interval
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Dict[str, Any]] = {}
+        self._next_sweep = time.time() + interval_seconds
+
+    def record(self, fingerprint: str, error_type: str, message: str) -> bool:
+        """Count one occurrence; return True if its full traceback should be captured."""
+        now = time.time()
+        with self._lock:
+            window = self._windows.get(fingerprint)
+            if window is None or now - window['start'] >= self.interval_seconds:
+                if window is not None and window['suppressed']:
+                    # Keep the closed window until drain_summaries() reports it
+                    self._windows[f"{fingerprint}@{window['start']}"] = window
+                window = {
+                    'fingerprint': fingerprint,
+                    'error_type': error_type,
+                    'message': normalize_error_message(message),
+                    'start': now,
+                    'count': 0,
+                    'suppressed': 0,
+                }
+                self._windows[fingerprint] = window
+            window['count'] += 1
+            if window['count'] <= self.max_full_per_interval:
+                return True
+            window['suppressed'] += 1
+            return False
+
+    def occurrences(self, fingerprint: str) -> int:
+        """Occurrences of *fingerprint* in its current window."""
+        window = self._windows.get(fingerprint)
+        return window['count'] if window else 0
+
+    def drain_summaries(self, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return summary records for closed windows that suppressed tracebacks
+        (all windows if *force*).  Cheap to call often: it only scans once per
+        interval unless forced.
+        """
+        now = time.time()
+        if not force and now < self._next_sweep:
+            return []
+
+        summaries: List[Dict[str, Any]] = []
+        with self._lock:
+            self._next_sweep = now + self.interval_seconds
+            for key in list(self._windows):
+                window = self._windows[key]
+                if not force and now - window['start'] < self.interval_seconds:
+                    continue
+                del self._windows[key]
+                if window['suppressed']:
+                    summaries.append({
+                        'fingerprint': window['fingerprint'],
+                        'error_type': window['error_type'],
+                        'error_message': window['message'],
+                        'count': window['count'],
+                        'suppressed_count': window['suppressed'],
+                        'window_start': datetime.utcfromtimestamp(window['start']).isoformat(),
+                        'window_end': datetime.utcfromtimestamp(now).isoformat(),
+                    })
+        return summaries
+
+
+# Global instance
+_error_sampler: Optional[ErrorSampler] = None
+
+
+def get_error_sampler() -> ErrorSampler:
+    """Get global error sampler"""
+    global _error_sampler
+    if _error_sampler is None:
+        _error_sampler = ErrorSampler()
+    return _error_sampler
+
+
+def configure_error_sampler(max_full_per_interval: int, interval_seconds: float) -> ErrorSampler:
+    """Replace the global error sampler with new limits"""
+    global _error_sampler
+    _error_sampler = ErrorSampler(max_full_per_interval, interval_seconds)
+    return _error_sampler
@@ -2,5 +2,6 @@
 from .base import Exporter
 from .local_json import LocalJSONExporter
 from .http import HttpExporter
+from .aimd import AIMDController
 
-__all__ = ['Exporter', 'LocalJSONExporter', 'HttpExporter']
+__all__ = ['Exporter', 'LocalJSONExporter', 'HttpExporter', 'AIMDController']
@@ -0,0 +1,85 @@
+"""AIMD flow control for the HTTP exporter"""
+import threading
+import time
+from typing import Optional
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease controller for export batch
+    size and in-flight request concurrency.
+
+    While round-trip latency stays under ``latency_target_ms`` the batch size
+    grows by ``batch_step`` per success and concurrency grows by one every
+    ``concurrency_every`` successes.  Timeouts, 5xx and 429 responses cut both
+    by ``decrease_factor``; a ``Retry-After`` hint additionally pauses sending
+    until it has elapsed.
+    """
+
+    def __init__(
+        self,
+        initial_batch_size: int = 50,
+        min_batch_size: int = 10,
+        max_batch_size: int = 1000,
+        batch_step: int = 10,
+        initial_concurrency: int = 1,
+        max_concurrency: int = 8,
+        concurrency_every: int = 5,
+        latency_target_ms: float = 500.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.batch_step = batch_step
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_every = max(1, concurrency_every)
+        self.latency_target_ms = latency_target_ms
+        self.decrease_factor = decrease_factor
+
+        self._lock = threading.Lock()
+        self._batch_size = float(
+            min(self.max_batch_size, max(self.min_batch_size, initial_batch_size))
+        )
+        self._concurrency = min(self.max_concurrency, max(1, initial_concurrency))
+        self._successes = 0
+        self._paused_until = 0.0
+
+    @property
+    def batch_size(self) -> int:
+        return int(self._batch_size)
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    def on_success(self, rtt_ms: float) -> None:
+        """Additive increase — only while the backend answers quickly."""
+        with self._lock:
+            if rtt_ms > self.latency_target_ms:
+                self._successes = 0
+                return
+            self._batch_size = min(self.max_batch_size, self._batch_size + self.batch_step)
+            self._successes += 1
+            if self._successes >= self.concurrency_every:
+                self._successes = 0
+                self._concurrency = min(self.max_concurrency, self._concurrency + 1)
+
+    def on_congestion(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease on timeout / 5xx / 429."""
+        with self._lock:
+            self._successes = 0
+            self._batch_size = max(self.min_batch_size, self._batch_size * self.decrease_factor)
+            self._concurrency = max(1, int(self._concurrency * self.decrease_factor))
+            if retry_after and retry_after > 0:
+                self._paused_until = max(self._paused_until, time.time() + retry_after)
+
+    def pause_remaining(self) -> float:
+        """Seconds left on a server-requested pause (0 if none)."""
+        return max(0.0, self._paused_until - time.time())
+
+    def snapshot(self) -> dict:
+        return {
+            'batch_size': self.batch_size,
+            'concurrency': self.concurrency,
+            'paused_for_s': round(self.pause_remaining(), 2),
+        }
@@ -1,11 +1,15 @@
 """HTTP exporter for sending telemetry to Nexarch backend"""
 import time
 import random
+import threading
 import requests
 import json
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from typing import Dict, Any, Optional
 from .base import Exporter
+from .aimd import AIMDController
 
 # Maximum number of failed payloads kept in the dead-letter buffer.
 _DLQ_MAX = 100
@@ -16,6 +20,10 @@ class HttpExporter(Exporter):
     HTTP exporter that sends telemetry data to Nexarch backend.
     Supports batching, exponential-backoff retry, and a dead-letter
     queue (DLQ) for spans that cannot be delivered after all retries.
+
+    Batch size and the number of batches in flight are adapted by an
+    AIMD controller: they grow while the backend answers quickly and are
+    halved on timeouts, 5xx, or 429 (honouring ``Retry-After``).
     """
 
     def __init__(
@@ -26,22 +34,43 @@ class HttpExporter(Exporter):
         timeout: int = 10,
         max_retries: int = 3,
         retry_base: float = 0.5,
+        max_batch_size: int = 1000,
+        max_concurrency: int = 4,
+        latency_target_ms: float = 500.0,
     ):
         self.endpoint = endpoint.rstrip('/')
         self.api_key = api_key
-        self.batch_size = batch_size
         self.timeout = timeout
         self.max_retries = max_retries
         self.retry_base = retry_base      # initial back-off in seconds
         self.batch: list = []
+        self._batch_lock = threading.Lock()
         self._dlq: deque = deque(maxlen=_DLQ_MAX)
 
+        self.flow = AIMDController(
+            initial_batch_size=batch_size,
+            min_batch_size=min(10, batch_size),
+            max_batch_size=max(batch_size, max_batch_size),
+            max_concurrency=max_concurrency,
+            latency_target_ms=latency_target_ms,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrency), thread_name_prefix='nexarch-export'
+        )
+        self._in_flight = 0
+        self._in_flight_cond = threading.Condition()
+
         self.session = requests.Session()
         self.session.headers.update({
             'X-API-Key': api_key,
             'Content-Type': 'application/json',
         })
 
+    @property
+    def batch_size(self) -> int:
+        """Current adaptive batch size."""
+        return self.flow.batch_size
+
     # ── Public API ────────────────────────────────────────────────────────────
 
     def export(self, data: Dict[str, Any]) -> None:
@@ -55,22 +84,34 @@ class HttpExporter(Exporter):
                 self._export_discovery(data)
             elif data_type == 'error':
                 self._export_error(data)
+            elif data_type == 'metric':
+                # No per-record metric route on the backend; the latest
+                # runtime sample rides on the SDK heartbeat instead, and the
+                # server serves it at /api/v1/sdk/runtime/{service}
+                pass
             else:
                 self._send_with_retry('/api/v1/ingest', data)
         except Exception as e:
             print(f"[Nexarch] Failed to export telemetry: {e}")
 
-    def flush(self) -> None:
-        """Flush the current span batch to the backend."""
-        if not self.batch:
-            return
-        payload = list(self.batch)
-        self.batch = []
-        self._send_with_retry('/api/v1/ingest/batch', payload)
+    def flush(self, wait: bool = True) -> None:
+        """Flush the current span batch to the backend.
+
+        With ``wait=True`` (default) this also blocks until every batch
+        already in flight has completed.
+        """
+        with self._batch_lock:
+            payload = self.batch
+            self.batch = []
+        if payload:
+            self._dispatch_batch(payload)
+        if wait:
+            self._wait_idle()
 
     def close(self) -> None:
         """Flush remaining spans and close the HTTP session."""
         self.flush()
+        self._executor.shutdown(wait=True)
         self.session.close()
 
     @property
@@ -80,10 +121,37 @@ class HttpExporter(Exporter):
 
     # ── Private helpers ───────────────────────────────────────────────────────
 
+    def send_heartbeat(self, payload: Dict[str, Any]) -> Optional[Dict]:
+        """
+        POST a heartbeat once and return the response body (None on failure).
+
+        Control-plane traffic bypasses the AIMD controller: it neither waits
+        out an export pause nor feeds its round trips or errors into the
+        span-export limits, so a backend throttling spans still delivers a
+        new sampling rate.  Failures are not retried; the next heartbeat
+        follows on schedule.
+        """
+        try:
+            resp = self.session.post(
+                f"{self.endpoint}/api/v1/sdk/heartbeat", json=payload, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"[Nexarch] Heartbeat not delivered: {e}")
+            return None
+        if resp.status_code not in (200, 201, 202):
+            print(f"[Nexarch] Heartbeat rejected ({resp.status_code})")
+            return None
+        try:
+            return resp.json() if resp.text else {}
+        except ValueError:
+            return {}
+
     def _export_span(self, data: Dict[str, Any]) -> None:
-        self.batch.append(data.get('data', {}))
-        if len(self.batch) >= self.batch_size:
-            self.flush()
+        with self._batch_lock:
+            self.batch.append(data.get('data', {}))
+            full = len(self.batch) >= self.flow.batch_size
+        if full:
+            self.flush(wait=False)
 
     def _export_discovery(self, data: Dict[str, Any]) -> None:
         self._send_with_retry('/api/v1/ingest/architecture-discovery', data.get('data', {}))
@@ -91,6 +159,46 @@ class HttpExporter(Exporter):
     def _export_error(self, data: Dict[str, Any]) -> None:
         self._send_with_retry('/api/v1/ingest', data.get('data', {}))
 
+    def _dispatch_batch(self, payload: list) -> None:
+        """Send a batch on the export pool once an in-flight slot is free."""
+        with self._in_flight_cond:
+            while self._in_flight >= self.flow.concurrency:
+                self._in_flight_cond.wait(timeout=self.timeout)
+            self._in_flight += 1
+        try:
+            self._executor.submit(self._send_batch, payload)
+        except RuntimeError:
+            # Executor already shut down (interpreter exit) — send inline
+            self._send_batch(payload)
+
+    def _send_batch(self, payload: list) -> None:
+        try:
+            self._send_with_retry('/api/v1/ingest/batch', payload)
+        finally:
+            with self._in_flight_cond:
+                self._in_flight -= 1
+                self._in_flight_cond.notify_all()
+
+    def _wait_idle(self) -> None:
+        deadline = time.time() + self.timeout * (self.max_retries + 1)
+        with self._in_flight_cond:
+            while self._in_flight > 0 and time.time() < deadline:
+                self._in_flight_cond.wait(timeout=0.1)
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
     def _send_with_retry(
         self,
         path: str,
@@ -99,34 +207,56 @@ class HttpExporter(Exporter):
         """
         POST *payload* to *path* with exponential back-off retry.
 
-        Back-off formula: ``retry_base * 2^attempt + jitter``
+        Back-off formula: ``retry_base * 2^attempt + jitter``, or the
+        server's ``Retry-After`` when it asks for longer.
 
-        Failed payloads are added to the dead-letter queue after all
-        attempts are exhausted.
+        Every outcome is fed to the AIMD controller.  Failed payloads are
+        added to the dead-letter queue after all attempts are exhausted.
         """
         url = f"{self.endpoint}{path}"
         for attempt in range(self.max_retries + 1):
+            retry_after: Optional[float] = None
+
+            pause = self.flow.pause_remaining()
+            if pause > 0:
+                time.sleep(pause)
+
+            start = time.time()
             try:
                 resp = self.session.post(url, json=payload, timeout=self.timeout)
+                rtt_ms = (time.time() - start) * 1000
                 if resp.status_code in (200, 201, 202):
+                    self.flow.on_success(rtt_ms)
                     try:
                         return resp.json() if resp.text else {}
                     except ValueError:
                         # Response body is not valid JSON — delivery succeeded, ignore body
                         return {}
-                # 4xx errors are NOT retried (client error, not transient)
-                if 400 <= resp.status_code < 500:
+                if resp.status_code == 429:
+                    # Backend is shedding load — back off and retry
+                    retry_after = self._parse_retry_after(resp.headers.get('Retry-After'))
+                    self.flow.on_congestion(retry_after)
+                    print(
+                        f"[Nexarch] Export throttled (429), "
+                        f"attempt {attempt + 1}/{self.max_retries + 1}"
+                    )
+                # Other 4xx errors are NOT retried (client error, not transient)
+                elif 400 <= resp.status_code < 500:
                     print(
                         f"[Nexarch] Export rejected ({resp.status_code}): "
                         f"{resp.text[:200]}"
                     )
                     return None
-                # 5xx — fall through to retry
-                print(
-                    f"[Nexarch] Export failed ({resp.status_code}), "
-                    f"attempt {attempt + 1}/{self.max_retries + 1}"
-                )
+                else:
+                    # 5xx — fall through to retry
+                    retry_after = self._parse_retry_after(resp.headers.get('Retry-After'))
+                    self.flow.on_congestion(retry_after)
+                    print(
+                        f"[Nexarch] Export failed ({resp.status_code}), "
+                        f"attempt {attempt + 1}/{self.max_retries + 1}"
+                    )
             except requests.exceptions.Timeout:
+                self.flow.on_congestion()
                 print(
                     f"[Nexarch] Export timeout after {self.timeout}s, "
                     f"attempt {attempt + 1}/{self.max_retries + 1}"
@@ -143,6 +273,8 @@ class HttpExporter(Exporter):
 
             if attempt < self.max_retries:
                 delay = self.retry_base * (2 ** attempt) + random.uniform(0, 0.3)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
                 time.sleep(delay)
 
         # All retries exhausted — park in dead-letter queue
@@ -6,8 +6,8 @@ import re
 import time
 import uuid
 from typing import Optional, Any
-from ..tracing import get_trace_id, get_span_id, Span, add_downstream_ms
-from ..queue import get_log_queue
+from ..tracing import get_trace_id, get_span_id, get_db_aggregates, Span, add_downstream_ms
+from ..queue import emit_span
 from datetime import datetime
 
 # ── SQL sanitizer ─────────────────────────────────────────────────────────────
@@ -49,6 +49,71 @@ def sanitize_sql(statement: str, max_length: int = 500) -> str:
     return s[:max_length]
 
 
+def _record_db_span(span: Span, latency_ms: float, latency_field: str) -> None:
+    """
+    Emit a finished DB/cache span, or fold it into the request's aggregate
+    when the backend has switched on DB span aggregation.
+    """
+    aggregates = get_db_aggregates()
+    if aggregates is None:
+        emit_span({
+            "type": "span",
+            "timestamp": span.start_time,
+            "data": {
+                **span.to_dict(),
+                "latency_ms": latency_ms,
+                latency_field: latency_ms
+            }
+        })
+        return
+
+    tags = span.tags or {}
+    key = (tags.get("db.system"), tags.get("db.operation"), tags.get("db.table") or tags.get("db.name"))
+    entry = aggregates.get(key)
+    if entry is None:
+        aggregates[key] = {
+            "span": span,
+            "latency_field": latency_field,
+            "count": 1,
+            "errors": 1 if span.error else 0,
+            "total_ms": latency_ms,
+            "max_ms": latency_ms,
+        }
+    else:
+        entry["count"] += 1
+        entry["errors"] += 1 if span.error else 0
+        entry["total_ms"] += latency_ms
+        entry["max_ms"] = max(entry["max_ms"], latency_ms)
+
+
+def flush_db_aggregates() -> None:
+    """Emit one summary span per (system, operation, table) for the current request."""
+    aggregates = get_db_aggregates()
+    if not aggregates:
+        return
+    for entry in aggregates.values():
+        span = entry["span"]
+        span.tags = {
+            **(span.tags or {}),
+            "db.aggregated_count": entry["count"],
+            "db.error_count": entry["errors"],
+            "db.max_latency_ms": entry["max_ms"],
+        }
+        if entry["errors"] and not span.error:
+            span.status_code = 500
+        total_ms = round(entry["total_ms"], 2)
+        emit_span({
+            "type": "span",
+            "timestamp": span.start_time,
+            "data": {
+                **span.to_dict(),
+                "latency_ms": total_ms,
+                entry["latency_field"]: total_ms
+            }
+        })
+    aggregates.clear()
+
+
 _is_patched = False
 _redis_is_patched = False
 _pymongo_is_patched = False
@@ -110,16 +175,7 @@ def patch_sqlalchemy():
             )
             span.finish(status_code=200)
             
-            # Enqueue span
-            get_log_queue().enqueue({
-                "type": "span",
-                "timestamp": span.start_time,
-                "data": {
-                    **span.to_dict(),
-                    "latency_ms": latency_ms,
-                    "db_latency": latency_ms
-                }
-            })
+            _record_db_span(span, latency_ms, "db_latency")
             add_downstream_ms(latency_ms)  # accumulate into parent span
         
         _is_patched = True
@@ -183,15 +239,7 @@ def patch_redis():
                 latency_ms = round((time.time() - start_time) * 1000, 2)
                 span.finish(status_code=200 if not error else 500, error=error)
                 
-                get_log_queue().enqueue({
-                    "type": "span",
-                    "timestamp": span.start_time,
-                    "data": {
-                        **span.to_dict(),
-                        "latency_ms": latency_ms,
-                        "cache_latency": latency_ms
-                    }
-                })
+                _record_db_span(span, latency_ms, "cache_latency")
                 add_downstream_ms(latency_ms)  # accumulate into parent span
         
         redis.Redis.execute_command = instrumented_execute_command
@@ -272,15 +320,7 @@ def patch_pymongo():
                 )
                 span.finish(status_code=200 if not error else 500, error=str(error) if error else None)
                 
-                get_log_queue().enqueue({
-                    "type": "span",
-                    "timestamp": span.start_time,
-                    "data": {
-                        **span.to_dict(),
-                        "latency_ms": latency_ms,
-                        "db_latency": latency_ms
-                    }
-                })
+                _record_db_span(span, latency_ms, "db_latency")
                 add_downstream_ms(latency_ms)  # accumulate into parent span
                 
                 # Cleanup
@@ -1,10 +1,12 @@
 """HTTPX instrumentation"""
 import time
-import uuid
 from typing import Optional
-from ..tracing import get_trace_id, get_span_id, Span, add_downstream_ms
-from ..queue import get_log_queue
-import time
+from ..tracing import (
+    get_trace_id, get_span_id, Span, add_downstream_ms,
+    TRACEPARENT_HEADER, new_span_id, outbound_traceparent,
+)
+from ..queue import emit_span
+from ..utils import normalize_outbound_url
 
 _original_send = None
 _original_async_send = None
@@ -30,23 +32,41 @@ def patch_httpx():
         pass
 
 
+def _inject_traceparent(request, span_id: Optional[str] = None) -> None:
+    """Forward the current trace unless the caller set its own header."""
+    if TRACEPARENT_HEADER in request.headers:
+        return
+    value = outbound_traceparent(span_id)
+    if value:
+        request.headers[TRACEPARENT_HEADER] = value
+
+
 def _instrumented_send(self, request, **kwargs):
     """Instrumented sync send"""
     trace_id = get_trace_id()
     parent_span_id = get_span_id()
     
     if not trace_id:
+        _inject_traceparent(request)
         return _original_send(self, request, **kwargs)
     
-    # Create span
-    span_id = str(uuid.uuid4())
+    # Create span — host + templated path keeps operation cardinality bounded
+    peer_host, route = normalize_outbound_url(str(request.url))
+    span_id = new_span_id()
     span = Span.create_client_span(
         trace_id=trace_id,
         span_id=span_id,
         parent_span_id=parent_span_id,
         service="downstream",
-        operation=f"{request.method} {request.url}"
+        operation=f"{request.method} {peer_host}{route}"
     )
+    span.tags = {
+        "http.method": request.method,
+        "http.route": route,
+        "peer.host": peer_host,
+        "span.kind": "client",
+    }
+    _inject_traceparent(request, span_id)
     
     error: Optional[str] = None
     status_code: Optional[int] = None
@@ -64,11 +84,12 @@ def _instrumented_send(self, request, **kwargs):
         span.finish(status_code=status_code, error=error)
         add_downstream_ms(latency_ms)
         
-        get_log_queue().enqueue({
+        emit_span({
             "type": "span",
             "timestamp": span.start_time,
             "data": {
                 **span.to_dict(),
+                "downstream": peer_host,
                 "latency_ms": latency_ms,
                 "http_latency": latency_ms,
             }
@@ -81,17 +102,26 @@ async def _instrumented_async_send(self, request, **kwargs):
     parent_span_id = get_span_id()
     
     if not trace_id:
+        _inject_traceparent(request)
         return await _original_async_send(self, request, **kwargs)
     
-    # Create span
-    span_id = str(uuid.uuid4())
+    # Create span — host + templated path keeps operation cardinality bounded
+    peer_host, route = normalize_outbound_url(str(request.url))
+    span_id = new_span_id()
     span = Span.create_client_span(
         trace_id=trace_id,
         span_id=span_id,
         parent_span_id=parent_span_id,
         service="downstream",
-        operation=f"{request.method} {request.url}"
+        operation=f"{request.method} {peer_host}{route}"
     )
+    span.tags = {
+        "http.method": request.method,
+        "http.route": route,
+        "peer.host": peer_host,
+        "span.kind": "client",
+    }
+    _inject_traceparent(request, span_id)
     
     error: Optional[str] = None
     status_code: Optional[int] = None
@@ -109,11 +139,12 @@ async def _instrumented_async_send(self, request, **kwargs):
         span.finish(status_code=status_code, error=error)
         add_downstream_ms(latency_ms)
         
-        get_log_queue().enqueue({
+        emit_span({
             "type": "span",
             "timestamp": span.start_time,
             "data": {
                 **span.to_dict(),
+                "downstream": peer_host,
                 "latency_ms": latency_ms,
                 "http_latency": latency_ms,
             }
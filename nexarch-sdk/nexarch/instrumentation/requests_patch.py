@@ -1,9 +1,12 @@
 """Requests instrumentation"""
 import time
-import uuid
 from typing import Optional
-from ..tracing import get_trace_id, get_span_id, Span, add_downstream_ms
-from ..queue import get_log_queue
+from ..tracing import (
+    get_trace_id, get_span_id, Span, add_downstream_ms,
+    TRACEPARENT_HEADER, new_span_id, outbound_traceparent,
+)
+from ..queue import emit_span
+from ..utils import normalize_outbound_url
 
 _original_request = None
 _is_patched = False
@@ -25,23 +28,44 @@ def patch_requests():
         pass
 
 
+def _inject_traceparent(kwargs: dict, span_id: Optional[str] = None) -> None:
+    """Forward the current trace unless the caller set its own header."""
+    value = outbound_traceparent(span_id)
+    if not value:
+        return
+    headers = dict(kwargs.get('headers') or {})
+    if not any(k.lower() == TRACEPARENT_HEADER for k in headers):
+        headers[TRACEPARENT_HEADER] = value
+        kwargs['headers'] = headers
+
+
 def _instrumented_request(self, method, url, **kwargs):
     """Instrumented request"""
     trace_id = get_trace_id()
     parent_span_id = get_span_id()
     
     if not trace_id:
+        _inject_traceparent(kwargs)
         return _original_request(self, method, url, **kwargs)
     
-    # Create client span
-    span_id = str(uuid.uuid4())
+    # Create client span — host + templated path keeps operation cardinality bounded
+    peer_host, route = normalize_outbound_url(str(url))
+    http_method = str(method).upper()
+    span_id = new_span_id()
     span = Span.create_client_span(
         trace_id=trace_id,
         span_id=span_id,
         parent_span_id=parent_span_id,
         service="downstream",
-        operation=f"{method} {url}"
+        operation=f"{http_method} {peer_host}{route}"
     )
+    span.tags = {
+        "http.method": http_method,
+        "http.route": route,
+        "peer.host": peer_host,
+        "span.kind": "client",
+    }
+    _inject_traceparent(kwargs, span_id)
     
     start = time.time()
     error: Optional[str] = None
@@ -60,11 +84,12 @@ def _instrumented_request(self, method, url, **kwargs):
         add_downstream_ms(latency_ms)
         
         # Enqueue span
-        get_log_queue().enqueue({
+        emit_span({
             "type": "span",
             "timestamp": span.start_time,
             "data": {
                 **span.to_dict(),
+                "downstream": peer_host,
                 "latency_ms": latency_ms,
                 "http_latency": latency_ms,
             }
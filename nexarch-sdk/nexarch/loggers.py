@@ -7,7 +7,7 @@ import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from .models import SpanData, ErrorData, MetricData
+from .models import SpanData, ErrorData, ErrorSummaryData, MetricData
 
 
 class NexarchLogger:
@@ -104,6 +104,21 @@ class NexarchLogger:
         }
         cls._append_to_log(data)
     
+    @classmethod
+    def log_error_summary(cls, summary: ErrorSummaryData):
+        """
+        Log suppressed-occurrence counts for an error fingerprint.
+        
+        Args:
+            summary: ErrorSummaryData instance
+        """
+        data = {
+            "type": "error_summary",
+            "timestamp": summary.window_end,
+            "data": summary.to_dict()
+        }
+        cls._append_to_log(data)
+    
     @classmethod
     def log_metric(cls, metric: MetricData):
         """
@@ -1,20 +1,63 @@
 ﻿"""Nexarch Middleware"""
 import time
 import traceback
-import uuid
 import threading
 from datetime import datetime
-from typing import Callable, Optional
+from typing import Callable, Optional, Dict, Any
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import Scope, Receive, Send, Message
 from .loggers import NexarchLogger
 from .models import SpanData, ErrorData
-from .tracing import set_trace_context, clear_trace_context, Span, Sampler, get_downstream_ms
+from .error_sampling import get_error_sampler, fingerprint_exception
+from .tracing import (
+    set_trace_context, clear_trace_context, Span, Sampler, get_downstream_ms,
+    start_span_buffer, get_span_buffer, start_db_aggregation,
+    set_propagation_context, TRACEPARENT_HEADER, parse_traceparent,
+    new_trace_id, new_span_id,
+)
 from .queue import get_log_queue
+from .runtime_config import get_runtime_config
+from .runtime_health import get_runtime_health
+from .profiler import get_profiler
+from .instrumentation.db_patch import flush_db_aggregates
 from .auto_discovery import ArchitectureDiscovery, DependencyMapper, TrafficAnalyzer
 
 
+# Scope key under which per-request transfer stats are shared with dispatch()
+_TRANSFER_SCOPE_KEY = "nexarch.transfer"
+
+
+class TransferStats:
+    """Byte counts and send timings observed on the raw ASGI channel."""
+    
+    __slots__ = ("start", "request_bytes", "response_bytes", "first_byte_at",
+                 "end_at", "on_complete")
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.first_byte_at: Optional[float] = None
+        self.end_at: Optional[float] = None
+        # Set by dispatch(); called once the response has been fully sent
+        self.on_complete: Optional[Callable[["TransferStats"], None]] = None
+    
+    def to_dict(self, declared_request_bytes: int = 0) -> Dict[str, Any]:
+        end = self.end_at or time.time()
+        ttfb_ms = round((self.first_byte_at - self.start) * 1000, 2) if self.first_byte_at else None
+        send_ms = round((end - self.first_byte_at) * 1000, 2) if self.first_byte_at else None
+        return {
+            "ttfb_ms": ttfb_ms,
+            "send_duration_ms": send_ms,
+            "total_ms": round((end - self.start) * 1000, 2),
+            # Handlers that never read the body still declare its size
+            "request_bytes": self.request_bytes or declared_request_bytes,
+            "response_bytes": self.response_bytes,
+        }
+
+
 class NexarchMiddleware(BaseHTTPMiddleware):
     """Captures all requests and auto-discovers architecture"""
     
@@ -66,6 +109,81 @@ class NexarchMiddleware(BaseHTTPMiddleware):
             except Exception as e:
                 print(f"[Nexarch] Warning: Architecture discovery failed: {e}")
     
+    @staticmethod
+    def _flush_child_spans(keep: bool) -> None:
+        """
+        Emit aggregated DB spans for this request, then release (or drop)
+        any child spans buffered while the keep/drop decision was pending.
+        """
+        flush_db_aggregates()
+        buffered = get_span_buffer()
+        if buffered and keep:
+            queue = get_log_queue()
+            for item in buffered:
+                queue.enqueue(item)
+    
+    def _record_error(self, exc: Exception, trace_id: str, span_id: str,
+                      timestamp: str, request: Request) -> None:
+        """Fingerprint an exception and log it, sampling full tracebacks."""
+        sampler = get_error_sampler()
+        fingerprint = fingerprint_exception(exc)
+        error_type = type(exc).__name__
+        
+        if sampler.record(fingerprint, error_type, str(exc)):
+            error_data = ErrorData(
+                trace_id=trace_id,
+                span_id=span_id,
+                timestamp=timestamp,
+                error_type=error_type,
+                error_message=str(exc),
+                traceback=traceback.format_exc(),
+                service=self.service_name,
+                operation=f"{request.method} {request.url.path}",
+                method=request.method,
+                path=request.url.path,
+                query_params=dict(request.query_params),
+                fingerprint=fingerprint,
+                occurrence=sampler.occurrences(fingerprint)
+            )
+            NexarchLogger.log_error(error_data)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Wrap the raw ASGI channel to count request/response bytes and time
+        the first response byte and the end of the body — without
+        buffering either body.
+        """
+        if scope["type"] != "http":
+            await super().__call__(scope, receive, send)
+            return
+        
+        stats = TransferStats(time.time())
+        scope[_TRANSFER_SCOPE_KEY] = stats
+        
+        async def counting_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                stats.request_bytes += len(message.get("body", b""))
+            return message
+        
+        async def timing_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                stats.first_byte_at = time.time()
+            elif message["type"] == "http.response.body":
+                stats.response_bytes += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    stats.end_at = time.time()
+            await send(message)
+        
+        try:
+            await super().__call__(scope, counting_receive, timing_send)
+        finally:
+            if stats.on_complete is not None:
+                try:
+                    stats.on_complete(stats)
+                except Exception as e:
+                    print(f"[Nexarch] Warning: failed to record request: {e}")
+    
     async def dispatch(
         self, 
         request: Request, 
@@ -77,16 +195,43 @@ class NexarchMiddleware(BaseHTTPMiddleware):
         if request.url.path.startswith("/__nexarch"):
             return await call_next(request)
         
-        # Sampling decision
-        if not self.sampler.should_sample():
-            return await call_next(request)
+        health = get_runtime_health()
+        if health is not None and health.running:
+            health.ensure_loop_monitor()
         
-        # Generate IDs
-        trace_id = str(uuid.uuid4())
-        span_id = str(uuid.uuid4())
+        # Continue the caller's trace if one was propagated, else start one
+        incoming = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        if incoming:
+            trace_id, parent_span_id, upstream_sampled = incoming
+        else:
+            trace_id, parent_span_id = new_trace_id(), None
+        span_id = new_span_id()
+        
+        runtime = get_runtime_config()
+        # Sampling decision — the caller's sampled flag is the head decision,
+        # so a trace is kept or dropped as a whole even when services run at
+        # different rates.  A root request samples on its trace ID, where a
+        # backend-pushed rate overrides the local one.  With tail sampling on,
+        # unsampled requests are still traced but their spans are buffered
+        # and only kept if the request errors or is slow.
+        if incoming:
+            head_sampled = upstream_sampled
+        else:
+            head_sampled = self.sampler.should_sample(runtime.sampling_rate, trace_id)
+        if not head_sampled and not runtime.tail_sampling:
+            # Not recorded, but still forward the trace downstream
+            set_propagation_context(trace_id, parent_span_id or span_id, sampled=False)
+            try:
+                return await call_next(request)
+            finally:
+                clear_trace_context()
         
         # Set context
-        set_trace_context(trace_id, span_id)
+        set_trace_context(trace_id, span_id, parent_span_id, sampled=head_sampled)
+        if not head_sampled:
+            start_span_buffer()
+        if runtime.db_span_aggregation:
+            start_db_aggregation()
         
         # Create span
         span = Span.create_server_span(
@@ -95,12 +240,19 @@ class NexarchMiddleware(BaseHTTPMiddleware):
             service=self.service_name,
             operation=f"{request.method} {request.url.path}"
         )
+        span.parent_span_id = parent_span_id
         span.tags = {
             "method": request.method,
             "path": request.url.path,
             "query_params": dict(request.query_params)
         }
         
+        profiler = get_profiler()
+        if profiler is not None and profiler.running:
+            profiler.begin(trace_id)
+        else:
+            profiler = None
+        
         start_time = time.time()
         timestamp = datetime.utcnow().isoformat()
         
@@ -108,13 +260,8 @@ class NexarchMiddleware(BaseHTTPMiddleware):
             # Process request
             response = await call_next(request)
             
-            # Record traffic pattern
             latency_ms = round((time.time() - start_time) * 1000, 2)
-            NexarchMiddleware._traffic_analyzer.record_request(
-                endpoint=request.url.path,
-                latency_ms=latency_ms,
-                status_code=response.status_code
-            )
+            profile = profiler.end(trace_id, latency_ms) if profiler else None
             
             # Detect database and external calls from span tags
             downstream_deps = []
@@ -140,6 +287,13 @@ class NexarchMiddleware(BaseHTTPMiddleware):
             
             # Finish span
             span.finish(status_code=response.status_code)
+
+            keep = (
+                head_sampled
+                or response.status_code >= 500
+                or latency_ms >= runtime.tail_latency_ms
+            )
+            self._flush_child_spans(keep)
             
             # Enhanced span data with architecture info
             span_dict = span.to_dict()
@@ -154,71 +308,102 @@ class NexarchMiddleware(BaseHTTPMiddleware):
                     "downstream_ms": round(get_downstream_ms(), 2),
                 }
             }
+            if profile:
+                span_dict["profile"] = profile
+            status_code = response.status_code
+            content_length = request.headers.get("content-length", "")
+            declared_bytes = int(content_length) if content_length.isdigit() else 0
             
-            # Enqueue span
-            get_log_queue().enqueue({
-                "type": "span",
-                "timestamp": timestamp,
-                "data": span_dict
-            })
+            def _record(stats: Optional[TransferStats]) -> None:
+                """Record the request once its response body has been sent."""
+                transfer = stats.to_dict(declared_bytes) if stats else {}
+                NexarchMiddleware._traffic_analyzer.record_request(
+                    endpoint=request.url.path,
+                    latency_ms=latency_ms,
+                    status_code=status_code,
+                    ttfb_ms=transfer.get("ttfb_ms"),
+                    request_bytes=transfer.get("request_bytes", 0),
+                    response_bytes=transfer.get("response_bytes", 0),
+                )
+                if not keep:
+                    return
+                
+                # Slow span — note what the runtime was doing meanwhile
+                if health is not None and latency_ms >= runtime.tail_latency_ms:
+                    span_dict["runtime_health"] = health.window(
+                        start_time, start_time + latency_ms / 1000
+                    )
+                
+                if transfer:
+                    span_dict["transfer"] = transfer
+                    span_dict["architecture_metadata"]["latency_breakdown"].update(
+                        ttfb_ms=transfer["ttfb_ms"],
+                        send_ms=transfer["send_duration_ms"],
+                    )
+                
+                # Enqueue span
+                get_log_queue().enqueue({
+                    "type": "span",
+                    "timestamp": timestamp,
+                    "data": span_dict
+                })
 
-            # Legacy format — latency already computed above
-            legacy_span = SpanData(
-                trace_id=trace_id,
-                span_id=span_id,
-                parent_id=None,
-                service=self.service_name,
-                operation=f"{request.method} {request.url.path}",
-                kind="server",
-                timestamp=timestamp,
-                latency_ms=latency_ms,
-                status_code=response.status_code,
-                method=request.method,
-                path=request.url.path,
-                query_params=dict(request.query_params),
-                status="ok" if response.status_code < 400 else "error",
-                error=None,
-                downstream=[]
-            )
+                # Legacy format — latency already computed above
+                legacy_span = SpanData(
+                    trace_id=trace_id,
+                    span_id=span_id,
+                    parent_id=parent_span_id,
+                    service=self.service_name,
+                    operation=f"{request.method} {request.url.path}",
+                    kind="server",
+                    timestamp=timestamp,
+                    latency_ms=latency_ms,
+                    status_code=status_code,
+                    method=request.method,
+                    path=request.url.path,
+                    query_params=dict(request.query_params),
+                    status="ok" if status_code < 400 else "error",
+                    error=None,
+                    downstream=[]
+                )
+                
+                NexarchLogger.log_span(legacy_span)
             
-            NexarchLogger.log_span(legacy_span)
+            # Defer until the body has streamed out, when sizes/timings are final
+            transfer_stats = request.scope.get(_TRANSFER_SCOPE_KEY)
+            if transfer_stats is not None:
+                transfer_stats.on_complete = _record
+            else:
+                _record(None)
             
             return response
         
         except Exception as e:
-            # Finish span with error
+            # Finish span with error — errors are always kept
             span.finish(status_code=500, error=str(e))
+            self._flush_child_spans(keep=True)
+            latency_ms = round((time.time() - start_time) * 1000, 2)
             
             # Enqueue span
+            error_span = span.to_dict()
+            profile = profiler.end(trace_id, latency_ms) if profiler else None
+            if profile:
+                error_span["profile"] = profile
             get_log_queue().enqueue({
                 "type": "span",
                 "timestamp": timestamp,
-                "data": span.to_dict()
+                "data": error_span
             })
             
-            # Log error
-            latency_ms = round((time.time() - start_time) * 1000, 2)
-            error_data = ErrorData(
-                trace_id=trace_id,
-                span_id=span_id,
-                timestamp=timestamp,
-                error_type=type(e).__name__,
-                error_message=str(e),
-                traceback=traceback.format_exc(),
-                service=self.service_name,
-                operation=f"{request.method} {request.url.path}",
-                method=request.method,
-                path=request.url.path,
-                query_params=dict(request.query_params)
-            )
-            
-            NexarchLogger.log_error(error_data)
+            # Log error — full traceback only for the first few occurrences
+            # of each fingerprint per window; the rest are counted
+            self._record_error(e, trace_id, span_id, timestamp, request)
             
             # Legacy span (error path)
             legacy_span = SpanData(
                 trace_id=trace_id,
                 span_id=span_id,
-                parent_id=None,
+                parent_id=parent_span_id,
                 service=self.service_name,
                 operation=f"{request.method} {request.url.path}",
                 kind="server",
@@ -239,4 +424,6 @@ class NexarchMiddleware(BaseHTTPMiddleware):
         
         finally:
             # Clear context
+            if profiler is not None:
+                profiler.end(trace_id, 0)
             clear_trace_context()
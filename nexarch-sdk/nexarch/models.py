@@ -47,6 +47,28 @@ class ErrorData:
     method: str
     path: str
     query_params: Dict[str, Any]
+    fingerprint: Optional[str] = None  # exception type + normalised top frames
+    occurrence: int = 1  # occurrence number of this fingerprint in the current window
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return asdict(self)
+
+
+@dataclass
+class ErrorSummaryData:
+    """
+    Occurrence counts for an error fingerprint whose tracebacks were
+    suppressed during one sampling window.
+    """
+    fingerprint: str
+    error_type: str
+    error_message: str
+    service: str
+    count: int
+    suppressed_count: int
+    window_start: str
+    window_end: str
     
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
@@ -0,0 +1,229 @@
+"""Opt-in statistical profiler that attaches stack profiles to slow spans"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+from .tracing.context import _trace_id
+
+# Innermost frames kept per sample; deeper stacks are cut at the root side
+_MAX_DEPTH = 48
+# Distinct collapsed stacks attached to one span (most frequent first)
+_MAX_STACKS = 50
+# Top frames in these files mean the thread is parked, not working
+_IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py', 'base_events.py')
+
+
+class _ActiveTrace:
+    __slots__ = ('start', 'stacks', 'samples', 'shared')
+
+    def __init__(self):
+        self.start = time.time()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        # True once any sample could not be pinned to this trace alone
+        self.shared = False
+
+
+class SamplingProfiler:
+    """
+    Background thread that samples ``sys._current_frames()`` at ``hz``
+    while at least one traced request is in flight, and aggregates
+    collapsed stacks (``file:func;file:func;...``, root first) per trace.
+
+    Attribution: on the event-loop thread a sample belongs to the trace of
+    the running task (Python 3.12+, via ``Task.get_context()``).  Samples
+    that cannot be pinned to one trace — busy worker threads, or the loop on
+    older Pythons — are credited to every active trace and the profile is
+    flagged ``shared``.
+
+    The sampler's own CPU time is capped at ``max_cpu_fraction`` of wall
+    time: when a tick is expensive the next one is delayed accordingly.
+    """
+
+    def __init__(
+        self,
+        hz: float = 100.0,
+        threshold_ms: float = 500.0,
+        max_cpu_fraction: float = 0.02,
+    ):
+        self.interval = 1.0 / max(1.0, hz)
+        self.threshold_ms = threshold_ms
+        self.max_cpu_fraction = max(0.001, min(1.0, max_cpu_fraction))
+
+        self._lock = threading.Lock()
+        self._active: Dict[str, _ActiveTrace] = {}
+        self._loops: Dict[int, asyncio.AbstractEventLoop] = {}
+        self._labels: Dict[Any, str] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ticks = 0
+        self.cpu_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='nexarch-profiler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+
+    # ── Per-request API ───────────────────────────────────────────────────────
+
+    def begin(self, trace_id: str) -> None:
+        """Start collecting samples for a trace."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._lock:
+            self._active[trace_id] = _ActiveTrace()
+            if loop is not None:
+                self._loops[threading.get_ident()] = loop
+        self._wake.set()
+
+    def end(self, trace_id: str, latency_ms: float) -> Optional[Dict[str, Any]]:
+        """
+        Stop collecting for a trace.  Returns a compact profile if the
+        request was slower than ``threshold_ms`` and was sampled at all.
+        """
+        with self._lock:
+            trace = self._active.pop(trace_id, None)
+        if trace is None or latency_ms < self.threshold_ms or not trace.samples:
+            return None
+        return {
+            'hz': round(1.0 / self.interval, 1),
+            'samples': trace.samples,
+            'shared': trace.shared,
+            'stacks': [
+                {'stack': stack, 'count': count}
+                for stack, count in trace.stacks.most_common(_MAX_STACKS)
+            ],
+        }
+
+    # ── Sampling ──────────────────────────────────────────────────────────────
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = os.path.basename(code.co_filename)
+            if name.endswith('.py'):
+                name = name[:-3]
+            label = f"{name}:{code.co_name}"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame) -> Optional[str]:
+        """Collapsed stack for a thread, or None if it is parked."""
+        if frame.f_code.co_filename.endswith(_IDLE_FILES):
+            return None
+        labels: List[str] = []
+        while frame is not None and len(labels) < _MAX_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    @staticmethod
+    def _running_trace(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+        """Trace ID of the task currently running on ``loop`` (3.12+ only)."""
+        task = asyncio.current_task(loop)
+        if task is None or not hasattr(task, 'get_context'):
+            return None
+        return task.get_context().get(_trace_id)
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        with self._lock:
+            if not self._active:
+                return
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = self._collapse(frame)
+                if stack is None:
+                    continue
+                owner = None
+                loop = self._loops.get(ident)
+                if loop is not None:
+                    try:
+                        owner = self._running_trace(loop)
+                    except Exception:
+                        owner = None
+                if owner is not None:
+                    trace = self._active.get(owner)
+                    if trace is not None:
+                        trace.stacks[stack] += 1
+                        trace.samples += 1
+                    continue
+                shared = len(self._active) > 1
+                for trace in self._active.values():
+                    trace.stacks[stack] += 1
+                    trace.samples += 1
+                    trace.shared = trace.shared or shared
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._active
+            if idle:
+                # Nothing in flight — sleep until a request begins
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            cpu_start = time.thread_time()
+            try:
+                self._sample()
+            except Exception:
+                pass
+            cost = time.thread_time() - cpu_start
+            self.ticks += 1
+            self.cpu_seconds += cost
+
+            # Hard CPU cap: cost / (cost + sleep) <= max_cpu_fraction
+            delay = max(self.interval, cost / self.max_cpu_fraction - cost)
+            self._stop.wait(delay)
+
+
+# Global instance
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> Optional[SamplingProfiler]:
+    """Get the global profiler (None unless enabled)"""
+    return _profiler
+
+
+def configure_profiler(
+    hz: float = 100.0,
+    threshold_ms: float = 500.0,
+    max_cpu_fraction: float = 0.02,
+) -> SamplingProfiler:
+    """Replace the global profiler and start it"""
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = SamplingProfiler(hz, threshold_ms, max_cpu_fraction)
+    _profiler.start()
+    return _profiler
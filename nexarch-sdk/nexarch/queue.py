@@ -1,24 +1,94 @@
 """Async-safe logging queue"""
 import threading
-import queue
 import atexit
-from typing import Dict, Any, Optional
+import time
+from typing import Callable, Dict, Any, List, Optional
+from .tracing import get_span_buffer
+from .ring_buffer import RingBuffer, DROP_NEWEST
 
 
-# Maximum number of spans held in memory before dropping.  At ~1KB per span this is ~10 MB.
+# Maximum number of records held in memory before the overflow policy kicks in
 _MAX_QUEUE_SIZE = 10_000
+# Records handed to the exporter per worker wake-up
+_DRAIN_BATCH = 500
+
+# Span envelopes are queued as one flat tuple — (timestamp, *_SPAN_FIELDS,
+# extras) — instead of an envelope dict wrapping a span dict: one small
+# object per span while it waits, which keeps memory and GC work flat under
+# bursts.  Keys outside the schema ride along in ``extras`` (None if none).
+_SPAN_FIELDS = (
+    'trace_id', 'span_id', 'parent_span_id', 'service_name', 'operation', 'kind',
+    'start_time', 'end_time', 'latency_ms', 'status_code', 'error', 'tags',
+    'downstream', 'http_latency', 'db_latency', 'cache_latency',
+)
+_SPAN_FIELD_SET = frozenset(_SPAN_FIELDS)
+_ENVELOPE_KEYS = frozenset(('type', 'timestamp', 'data'))
+_ABSENT = object()  # schema field missing from the span
+
+
+def _pack(record: Dict[str, Any]) -> Any:
+    """Span envelope -> flat tuple; any other record is queued unchanged."""
+    data = record.get('data')
+    if record.get('type') != 'span' or record.keys() != _ENVELOPE_KEYS or type(data) is not dict:
+        return record
+    extras = {key: value for key, value in data.items() if key not in _SPAN_FIELD_SET} or None
+    return (record['timestamp'], *[data.get(field, _ABSENT) for field in _SPAN_FIELDS], extras)
+
+
+def _unpack(record: Any) -> Dict[str, Any]:
+    """Rebuild the envelope dict of a packed span."""
+    if type(record) is not tuple:
+        return record
+    data = {field: value for field, value in zip(_SPAN_FIELDS, record[1:-1]) if value is not _ABSENT}
+    if record[-1]:
+        data.update(record[-1])
+    return {'type': 'span', 'timestamp': record[0], 'data': data}
 
 
 class LogQueue:
-    """Thread-safe async log queue"""
+    """
+    Thread-safe async log queue.
+
+    Records live in a preallocated :class:`RingBuffer`, so the number queued
+    is bounded by ``capacity`` and bursts never allocate queue nodes.  Spans
+    are held as flat tuples and turned back into envelope dicts when
+    drained.  The worker drains in batches; see ``overflow`` for what
+    happens when it falls behind.
+    """
 
-    def __init__(self, flush_interval: float = 1.0):
-        self._queue = queue.Queue(maxsize=_MAX_QUEUE_SIZE)
+    def __init__(
+        self,
+        flush_interval: float = 1.0,
+        capacity: int = _MAX_QUEUE_SIZE,
+        overflow: str = DROP_NEWEST,
+        block_timeout: float = 0.1,
+    ):
+        self._ring = RingBuffer(capacity, overflow, block_timeout)
+        self._configure_lock = threading.Lock()
         self._exporter = None
         self._flush_interval = flush_interval
         self._worker_thread: Optional[threading.Thread] = None
         self._shutdown = threading.Event()
+        # Housekeeping run by the worker about once per flush interval
+        self._periodic: Dict[str, Callable[[], None]] = {}
+        self._next_periodic = 0.0
     
+    def configure(self, capacity: int = _MAX_QUEUE_SIZE, overflow: str = DROP_NEWEST,
+                  block_timeout: float = 0.1) -> None:
+        """Resize the buffer or change its overflow policy, keeping queued records."""
+        with self._configure_lock:
+            ring = RingBuffer(capacity, overflow, block_timeout)
+            # Records put into the old ring from here on are forwarded too
+            self._ring.transfer_to(ring)
+            self._ring = ring
+    
+    def set_periodic(self, name: str, callback: Callable[[], None]) -> None:
+        """
+        Have the worker call *callback* about once per flush interval, busy
+        or idle (replaces an earlier callback registered under *name*).
+        """
+        self._periodic[name] = callback
+
     def set_exporter(self, exporter):
         """Set exporter"""
         self._exporter = exporter
@@ -31,34 +101,54 @@ class LogQueue:
             atexit.register(self.shutdown)
     
     def enqueue(self, data: Dict[str, Any]):
-        """Enqueue log data"""
+        """Enqueue log data (dropped per the overflow policy when full)"""
         if not data:
             return
-        
-        try:
-            self._queue.put_nowait(data)
-        except queue.Full:
-            # Drop if full - could log this for monitoring
-            pass
+        self._ring.put(_pack(data))
+    
+    def drain(self, max_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Remove and return up to *max_items* queued records without exporting them."""
+        return [_unpack(record) for record in self._ring.drain(max_items)]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, capacity and records dropped so far"""
+        return {
+            'queued': len(self._ring),
+            'capacity': self._ring.capacity,
+            'overflow': self._ring.overflow,
+            'dropped': self._ring.dropped,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._ring)
+    
+    def _export_records(self, records: list) -> None:
+        if not self._exporter:
+            return
+        for record in records:
+            try:
+                self._exporter.export(_unpack(record))
+            except Exception:
+                pass  # Continue on error
     
     def _worker(self):
         """Background worker"""
         while not self._shutdown.is_set():
-            batch = []
             try:
-                # Collect batch
-                while len(batch) < 100:
-                    try:
-                        item = self._queue.get(timeout=self._flush_interval)
-                        batch.append(item)
-                    except queue.Empty:
-                        break
-                
-                # Flush batch
-                if batch and self._exporter:
-                    for item in batch:
-                        self._exporter.export(item)
-            
+                batch = self._ring.drain(_DRAIN_BATCH, timeout=self._flush_interval)
+                self._export_records(batch)
+            except Exception:
+                pass  # Continue on error
+            self._run_periodic()
+
+    def _run_periodic(self):
+        now = time.monotonic()
+        if now < self._next_periodic:
+            return
+        self._next_periodic = now + self._flush_interval
+        for callback in list(self._periodic.values()):
+            try:
+                callback()
             except Exception:
                 pass  # Continue on error
     
@@ -66,19 +156,7 @@ class LogQueue:
         """Flush all currently-queued items to the exporter immediately.
         Useful before process shutdown to drain without waiting for the worker timer.
         """
-        remaining = []
-        while not self._queue.empty():
-            try:
-                remaining.append(self._queue.get_nowait())
-            except queue.Empty:
-                break
-
-        if remaining and self._exporter:
-            for item in remaining:
-                try:
-                    self._exporter.export(item)
-                except Exception:
-                    pass
+        self._export_records(self._ring.drain())
 
         # Also flush the exporter's own batch buffer (e.g. HttpExporter batches spans)
         if self._exporter and hasattr(self._exporter, 'flush'):
@@ -92,19 +170,7 @@ class LogQueue:
         self._shutdown.set()
         
         # Flush remaining
-        remaining = []
-        while not self._queue.empty():
-            try:
-                remaining.append(self._queue.get_nowait())
-            except queue.Empty:
-                break
-        
-        if remaining and self._exporter:
-            for item in remaining:
-                try:
-                    self._exporter.export(item)
-                except Exception:
-                    pass
+        self._export_records(self._ring.drain())
         
         if self._worker_thread:
             self._worker_thread.join(timeout=2.0)
@@ -117,3 +183,12 @@ _log_queue = LogQueue()
 def get_log_queue() -> LogQueue:
     """Get global queue"""
     return _log_queue
+
+
+def emit_span(data: Dict[str, Any]) -> None:
+    """Enqueue a child span, or hold it in the request's tail-sampling buffer."""
+    buffer = get_span_buffer()
+    if buffer is not None:
+        buffer.append(data)
+    else:
+        _log_queue.enqueue(data)
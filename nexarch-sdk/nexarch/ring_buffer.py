@@ -0,0 +1,125 @@
+"""Preallocated ring buffer backing the telemetry queue"""
+import threading
+from typing import Any, List, Optional
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO over a preallocated slot list.
+
+    One lock guards head/size, producers never allocate queue nodes, and
+    consumers take items out in batches with :meth:`drain`.  When full,
+    ``overflow`` decides what happens to a new item:
+
+    * ``drop_newest`` — the new item is discarded
+    * ``drop_oldest`` — the oldest queued item is overwritten
+    * ``block`` — wait up to ``block_timeout`` seconds for space, then drop.
+      Only use this when producers run on threads that may stall; blocking
+      the event-loop thread stalls every request.
+
+    :meth:`transfer_to` replaces a buffer: queued items move to the new one
+    and later puts are forwarded to it, so nothing is lost to producers
+    still holding the old buffer.
+    """
+
+    def __init__(self, capacity: int, overflow: str = DROP_NEWEST, block_timeout: float = 0.1):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+        self._slots: List[Any] = [None] * capacity
+        self._head = 0   # index of the oldest item
+        self._size = 0
+        self._successor: Optional['RingBuffer'] = None
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, item: Any) -> bool:
+        """Append an item.  Returns False if it was dropped."""
+        with self._lock:
+            if self._successor is None and self._size == self.capacity:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow == DROP_OLDEST:
+                    self._slots[self._head] = None
+                    self._head = (self._head + 1) % self.capacity
+                    self._size -= 1
+                    self.dropped += 1
+                elif not self._not_full.wait_for(
+                    lambda: self._size < self.capacity or self._successor is not None, self.block_timeout
+                ):
+                    self.dropped += 1
+                    return False
+
+            successor = self._successor
+            if successor is None:
+                self._slots[(self._head + self._size) % self.capacity] = item
+                self._size += 1
+                self._not_empty.notify()
+                return True
+        return successor.put(item)
+
+    def transfer_to(self, successor: 'RingBuffer') -> None:
+        """
+        Move every queued item (and the drop count) to *successor* and
+        forward later puts to it.  Items beyond its capacity are dropped,
+        oldest first.
+        """
+        with self._lock:
+            items = self._take(self._size)
+            self._successor = successor
+            self._not_full.notify_all()
+            self._not_empty.notify_all()
+            excess = max(0, len(items) - successor.capacity)
+            successor.dropped += self.dropped + excess
+            for item in items[excess:]:
+                successor.put(item)
+
+    def drain(self, max_items: Optional[int] = None, timeout: Optional[float] = None) -> List[Any]:
+        """
+        Remove and return up to ``max_items`` items, oldest first.
+
+        With a ``timeout`` an empty buffer is waited on for that long;
+        otherwise an empty list is returned immediately.
+        """
+        with self._lock:
+            if self._size == 0 and timeout:
+                self._not_empty.wait_for(lambda: self._size > 0 or self._successor is not None, timeout)
+            return self._take(self._size if max_items is None else min(self._size, max_items))
+
+    def _take(self, count: int) -> List[Any]:
+        """Remove the *count* oldest items (called with the lock held)."""
+        if count == 0:
+            return []
+
+        slots, head, capacity = self._slots, self._head, self.capacity
+        end = head + count
+        if end <= capacity:
+            items = slots[head:end]
+            slots[head:end] = [None] * count
+        else:
+            wrap = end - capacity
+            items = slots[head:] + slots[:wrap]
+            slots[head:] = [None] * (capacity - head)
+            slots[:wrap] = [None] * wrap
+
+        self._head = end % capacity
+        self._size -= count
+        if self.overflow == BLOCK:
+            self._not_full.notify_all()
+        return items
@@ -0,0 +1,74 @@
+"""Runtime configuration pushed by the Nexarch backend"""
+import threading
+from typing import Dict, Any, Optional
+
+
+def _is_number(value: Any) -> bool:
+    # bool is an int subclass: a stray ``true`` must not become a rate of 1.0
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class RuntimeConfig:
+    """
+    Live, process-wide settings that the backend can change through the
+    heartbeat response without a redeploy.
+
+    ``sampling_rate`` is ``None`` until the backend sends one, in which case
+    the locally configured rate is used.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sampling_rate: Optional[float] = None
+        self.db_span_aggregation: bool = False
+        self.tail_sampling: bool = False
+        self.tail_latency_ms: float = 1000.0
+
+    def apply(self, config: Dict[str, Any]) -> bool:
+        """
+        Apply a config dict of the form::
+
+            {"sampling_rate": 0.25,
+             "features": {"db_span_aggregation": true, "tail_sampling": true},
+             "tail_latency_ms": 1000}
+
+        Unknown keys are ignored, as are numbers sent as booleans.  Returns
+        True if anything changed.
+        """
+        if not isinstance(config, dict):
+            return False
+
+        before = self.snapshot()
+        features = config.get('features') or {}
+        with self._lock:
+            rate = config.get('sampling_rate')
+            if _is_number(rate):
+                self.sampling_rate = max(0.0, min(1.0, float(rate)))
+            if 'db_span_aggregation' in features:
+                self.db_span_aggregation = bool(features['db_span_aggregation'])
+            if 'tail_sampling' in features:
+                self.tail_sampling = bool(features['tail_sampling'])
+            latency = config.get('tail_latency_ms')
+            if _is_number(latency) and latency > 0:
+                self.tail_latency_ms = float(latency)
+        return self.snapshot() != before
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current settings as a plain dict"""
+        return {
+            'sampling_rate': self.sampling_rate,
+            'features': {
+                'db_span_aggregation': self.db_span_aggregation,
+                'tail_sampling': self.tail_sampling,
+            },
+            'tail_latency_ms': self.tail_latency_ms,
+        }
+
+
+# Global instance
+_runtime_config = RuntimeConfig()
+
+
+def get_runtime_config() -> RuntimeConfig:
+    """Get global runtime config"""
+    return _runtime_config
@@ -0,0 +1,257 @@
+"""Runtime health collector — event-loop lag, GC pauses, RSS and threads"""
+import asyncio
+import gc
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import MetricData
+from .queue import get_log_queue
+
+# Recent loop-lag ticks / GC pauses kept for correlating slow spans.
+# At the default 0.5 s tick this covers well over ten minutes.
+_HISTORY_SIZE = 2048
+
+try:
+    import resource as _resource
+    _PAGE_SIZE = _resource.getpagesize()
+except ImportError:  # Windows
+    _PAGE_SIZE = 4096
+
+
+def _read_rss_bytes() -> Optional[int]:
+    """Current resident set size, or peak RSS where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+class RuntimeHealthCollector:
+    """
+    Low-overhead sampler of process health.
+
+    * **Loop lag** — a ``call_later`` timer on the serving event loop
+      reschedules itself every ``loop_lag_interval`` seconds; how late each
+      tick fires is the time the loop spent blocked.
+    * **GC pauses** — ``gc.callbacks`` timestamps the start/stop of every
+      collection.
+    * **RSS / threads** — read once per report.
+
+    Every ``report_interval`` seconds the samples gathered since the last
+    report are summarised and enqueued on the ``LogQueue`` as ``metric``
+    records.  Raw ticks and pauses are kept in bounded deques so slow spans
+    can be correlated with what the runtime was doing at the time
+    (:meth:`window`).
+    """
+
+    def __init__(
+        self,
+        service: str = "unknown",
+        report_interval: float = 15.0,
+        loop_lag_interval: float = 0.5,
+    ):
+        self.service = service
+        self.report_interval = report_interval
+        self.loop_lag_interval = loop_lag_interval
+        self.latest: Dict[str, Any] = {}
+
+        self._lock = threading.Lock()
+        self._lag_ticks: deque = deque(maxlen=_HISTORY_SIZE)   # (wall_ts, lag_ms)
+        self._gc_pauses: deque = deque(maxlen=_HISTORY_SIZE)   # (wall_ts, pause_ms, generation)
+        self._gc_started: Optional[float] = None
+        self._last_report = time.time()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_handle: Optional[asyncio.TimerHandle] = None
+        self._expected_tick = 0.0
+
+        self._reporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._reporter is not None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Install the GC callback and start the periodic reporter."""
+        if self._reporter is not None:
+            return
+        self._stop.clear()
+        self._last_report = time.time()
+        gc.callbacks.append(self._on_gc)
+        self._reporter = threading.Thread(
+            target=self._report_loop, name='nexarch-runtime-health', daemon=True
+        )
+        self._reporter.start()
+
+    def stop(self) -> None:
+        """Remove hooks and stop the reporter and loop timer."""
+        if self._reporter is None:
+            return
+        self._stop.set()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        self._detach_loop()
+        self._reporter.join(timeout=1.0)
+        self._reporter = None
+
+    def ensure_loop_monitor(self) -> None:
+        """
+        Attach the lag timer to the running event loop.  Called from the
+        middleware on each request; a no-op once attached to this loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if loop is self._loop and self._loop_handle is not None:
+            return
+        self._detach_loop()
+        self._loop = loop
+        self._expected_tick = time.perf_counter() + self.loop_lag_interval
+        self._loop_handle = loop.call_later(self.loop_lag_interval, self._tick, loop)
+
+    def _detach_loop(self) -> None:
+        handle, loop = self._loop_handle, self._loop
+        self._loop_handle = None
+        self._loop = None
+        if handle is not None and loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(handle.cancel)
+            except RuntimeError:
+                pass
+
+    # ── Hooks ─────────────────────────────────────────────────────────────────
+
+    def _tick(self, loop: asyncio.AbstractEventLoop) -> None:
+        if loop is not self._loop or self._stop.is_set():
+            # Detached, or re-attached to a newer loop meanwhile
+            return
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._expected_tick) * 1000)
+        self._lag_ticks.append((time.time(), lag_ms))
+        self._expected_tick = now + self.loop_lag_interval
+        self._loop_handle = loop.call_later(self.loop_lag_interval, self._tick, loop)
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == 'start':
+            self._gc_started = time.perf_counter()
+        elif phase == 'stop' and self._gc_started is not None:
+            pause_ms = (time.perf_counter() - self._gc_started) * 1000
+            self._gc_started = None
+            self._gc_pauses.append((time.time(), pause_ms, info.get('generation', -1)))
+
+    # ── Reporting ─────────────────────────────────────────────────────────────
+
+    def window(self, start: float, end: float) -> Dict[str, Any]:
+        """
+        Summarise runtime activity between two wall-clock timestamps.
+
+        A tick that fires late is only observed after the loop unblocks,
+        so ticks up to one interval past ``end`` are included.
+        """
+        lags = [lag for ts, lag in list(self._lag_ticks)
+                if start <= ts <= end + self.loop_lag_interval]
+        pauses = [p for ts, p, _ in list(self._gc_pauses) if start <= ts <= end]
+        return {
+            'loop_lag_max_ms': round(max(lags), 2) if lags else None,
+            'gc_pause_ms': round(sum(pauses), 2),
+            'gc_collections': len(pauses),
+            'thread_count': threading.active_count(),
+        }
+
+    def collect(self) -> Dict[str, Any]:
+        """Build a summary of everything observed since the last collect."""
+        with self._lock:
+            now = time.time()
+            since, self._last_report = self._last_report, now
+        lags = [lag for ts, lag in list(self._lag_ticks) if since < ts <= now]
+        pauses: List[Tuple[float, float, int]] = [
+            p for p in list(self._gc_pauses) if since < p[0] <= now
+        ]
+        pause_ms = [p[1] for p in pauses]
+        sample = {
+            'timestamp': datetime.utcfromtimestamp(now).isoformat(),
+            'interval_s': round(now - since, 2),
+            'loop_lag_max_ms': round(max(lags), 2) if lags else None,
+            'loop_lag_avg_ms': round(sum(lags) / len(lags), 2) if lags else None,
+            'gc_collections': len(pauses),
+            'gc_pause_total_ms': round(sum(pause_ms), 2),
+            'gc_pause_max_ms': round(max(pause_ms), 2) if pause_ms else 0.0,
+            'rss_bytes': _read_rss_bytes(),
+            'thread_count': threading.active_count(),
+        }
+        self.latest = sample
+        return sample
+
+    def report(self) -> Dict[str, Any]:
+        """Collect a sample and enqueue it as metric records."""
+        sample = self.collect()
+        units = {
+            'loop_lag_max_ms': 'ms', 'loop_lag_avg_ms': 'ms',
+            'gc_collections': 'count', 'gc_pause_total_ms': 'ms',
+            'gc_pause_max_ms': 'ms', 'rss_bytes': 'bytes', 'thread_count': 'count',
+        }
+        queue = get_log_queue()
+        for name, unit in units.items():
+            value = sample[name]
+            if value is None:
+                continue
+            metric = MetricData(
+                timestamp=sample['timestamp'],
+                service=self.service,
+                metric_name=f"runtime.{name}",
+                metric_value=float(value),
+                unit=unit,
+                tags={'interval_s': str(sample['interval_s'])},
+            )
+            queue.enqueue({
+                'type': 'metric',
+                'timestamp': metric.timestamp,
+                'data': metric.to_dict(),
+            })
+        return sample
+
+    def _report_loop(self) -> None:
+        while not self._stop.wait(self.report_interval):
+            try:
+                self.report()
+            except Exception as e:
+                print(f"[Nexarch] Runtime health report failed: {e}")
+
+
+# Global instance
+_runtime_health: Optional[RuntimeHealthCollector] = None
+
+
+def get_runtime_health() -> Optional[RuntimeHealthCollector]:
+    """Get the global runtime health collector (None until configured)"""
+    return _runtime_health
+
+
+def configure_runtime_health(
+    service: str,
+    report_interval: float = 15.0,
+    loop_lag_interval: float = 0.5,
+) -> RuntimeHealthCollector:
+    """Replace the global collector and start it"""
+    global _runtime_health
+    if _runtime_health is not None:
+        _runtime_health.stop()
+    _runtime_health = RuntimeHealthCollector(service, report_interval, loop_lag_interval)
+    _runtime_health.start()
+    return _runtime_health
@@ -6,8 +6,22 @@ from .context import (
     get_parent_span_id,
     add_downstream_ms,
     get_downstream_ms,
+    start_span_buffer,
+    get_span_buffer,
+    start_db_aggregation,
+    get_db_aggregates,
+    set_propagation_context,
+    get_propagation_context,
     clear_trace_context
 )
+from .propagation import (
+    TRACEPARENT_HEADER,
+    new_trace_id,
+    new_span_id,
+    parse_traceparent,
+    format_traceparent,
+    outbound_traceparent,
+)
 from .span import Span
 from .sampler import Sampler
 
@@ -18,7 +32,19 @@ __all__ = [
     'get_parent_span_id',
     'add_downstream_ms',
     'get_downstream_ms',
+    'start_span_buffer',
+    'get_span_buffer',
+    'start_db_aggregation',
+    'get_db_aggregates',
+    'set_propagation_context',
+    'get_propagation_context',
     'clear_trace_context',
+    'TRACEPARENT_HEADER',
+    'new_trace_id',
+    'new_span_id',
+    'parse_traceparent',
+    'format_traceparent',
+    'outbound_traceparent',
     'Span',
     'Sampler'
 ]
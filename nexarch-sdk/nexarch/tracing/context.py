@@ -1,6 +1,6 @@
 """Trace context propagation"""
 from contextvars import ContextVar
-from typing import Optional
+from typing import Optional, Dict, List, Any, Tuple
 
 # Context vars
 _trace_id: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
@@ -8,14 +8,33 @@ _span_id: ContextVar[Optional[str]] = ContextVar('span_id', default=None)
 _parent_span_id: ContextVar[Optional[str]] = ContextVar('parent_span_id', default=None)
 # Accumulates downstream (child span) latency for the current server span
 _downstream_ms: ContextVar[float] = ContextVar('downstream_ms', default=0.0)
+# Child spans held back until the server span decides keep/drop (tail sampling)
+_span_buffer: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar('span_buffer', default=None)
+# Per-request DB span aggregates, keyed by (system, operation, table)
+_db_aggregates: ContextVar[Optional[Dict[tuple, Dict[str, Any]]]] = ContextVar('db_aggregates', default=None)
+# (trace_id, span_id, sampled) forwarded on outbound calls — also set for
+# unsampled requests so downstream services see the same trace ID
+_propagation: ContextVar[Optional[Tuple[str, str, bool]]] = ContextVar('propagation', default=None)
 
 
-def set_trace_context(trace_id: str, span_id: str, parent_span_id: Optional[str] = None):
+def set_trace_context(trace_id: str, span_id: str, parent_span_id: Optional[str] = None,
+                      sampled: bool = True):
     """Set trace context"""
     _trace_id.set(trace_id)
     _span_id.set(span_id)
     _parent_span_id.set(parent_span_id)
     _downstream_ms.set(0.0)  # reset downstream accumulator for new span
+    _propagation.set((trace_id, span_id, sampled))
+
+
+def set_propagation_context(trace_id: str, span_id: str, sampled: bool) -> None:
+    """Forward a trace on outbound calls without recording any spans."""
+    _propagation.set((trace_id, span_id, sampled))
+
+
+def get_propagation_context() -> Optional[Tuple[str, str, bool]]:
+    """Return (trace_id, span_id, sampled) to forward downstream, if any."""
+    return _propagation.get()
 
 
 def get_trace_id() -> Optional[str]:
@@ -43,9 +62,32 @@ def get_downstream_ms() -> float:
     return _downstream_ms.get()
 
 
+def start_span_buffer() -> None:
+    """Buffer child spans for the current request instead of enqueuing them."""
+    _span_buffer.set([])
+
+
+def get_span_buffer() -> Optional[List[Dict[str, Any]]]:
+    """Return the current request's child-span buffer, or None if not buffering."""
+    return _span_buffer.get()
+
+
+def start_db_aggregation() -> None:
+    """Aggregate DB spans for the current request instead of emitting one per query."""
+    _db_aggregates.set({})
+
+
+def get_db_aggregates() -> Optional[Dict[tuple, Dict[str, Any]]]:
+    """Return the current request's DB aggregates, or None if not aggregating."""
+    return _db_aggregates.get()
+
+
 def clear_trace_context():
     """Clear trace context"""
     _trace_id.set(None)
     _span_id.set(None)
     _parent_span_id.set(None)
     _downstream_ms.set(0.0)
+    _span_buffer.set(None)
+    _db_aggregates.set(None)
+    _propagation.set(None)
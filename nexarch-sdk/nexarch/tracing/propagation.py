@@ -0,0 +1,65 @@
+"""W3C ``traceparent`` propagation"""
+import random
+import re
+from typing import Optional, Tuple
+from .context import get_propagation_context
+
+TRACEPARENT_HEADER = 'traceparent'
+
+# version-traceid-parentid-flags, lowercase hex (https://www.w3.org/TR/trace-context/)
+_TRACEPARENT_RE = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_ZERO_TRACE_ID = '0' * 32
+_ZERO_SPAN_ID = '0' * 16
+
+
+def new_trace_id() -> str:
+    """Random 128-bit trace ID as 32 hex chars"""
+    return '%032x' % random.getrandbits(128)
+
+
+def new_span_id() -> str:
+    """Random 64-bit span ID as 16 hex chars"""
+    return '%016x' % random.getrandbits(64)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a ``traceparent`` header into (trace_id, parent_span_id, sampled).
+
+    Returns None for missing or malformed headers, version ``ff`` and the
+    all-zero IDs the spec declares invalid.
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == 'ff' or trace_id == _ZERO_TRACE_ID or span_id == _ZERO_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 0x01)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> Optional[str]:
+    """
+    Build a ``traceparent`` header.  Legacy dashed UUID IDs are compacted;
+    IDs that still do not fit the W3C format are not propagated.
+    """
+    trace_hex = trace_id.replace('-', '').lower()
+    span_hex = span_id.replace('-', '').lower()[:16]
+    value = f"00-{trace_hex}-{span_hex}-{'01' if sampled else '00'}"
+    return value if _TRACEPARENT_RE.match(value) else None
+
+
+def outbound_traceparent(client_span_id: Optional[str] = None) -> Optional[str]:
+    """
+    ``traceparent`` for an outbound call made in the current context.
+
+    The recorded client span (if any) becomes the downstream parent;
+    otherwise the propagated span is forwarded as-is.
+    """
+    context = get_propagation_context()
+    if context is None:
+        return None
+    trace_id, span_id, sampled = context
+    return format_traceparent(trace_id, client_span_id or span_id, sampled)
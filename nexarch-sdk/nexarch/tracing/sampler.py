@@ -1,17 +1,47 @@
-"""Probabilistic sampler"""
+"""Trace-ID ratio sampler"""
+import hashlib
 import random
+from typing import Optional
+
+# Sampling compares a 64-bit hash of the trace ID against rate * 2^64
+_MAX_HASH = 1 << 64
+
+
+def trace_id_ratio(trace_id: str) -> float:
+    """
+    Map a trace ID to a stable value in [0, 1).
+
+    The ID is hashed rather than read directly because not every generator
+    fills all bits randomly (UUID4 fixes the version and variant bits).
+    Every service computes the same value for the same trace.
+    """
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / _MAX_HASH
 
 
 class Sampler:
-    """Probabilistic sampler"""
+    """Deterministic ratio sampler keyed on the trace ID"""
     
     def __init__(self, sampling_rate: float = 1.0):
         self.sampling_rate = max(0.0, min(1.0, sampling_rate))
     
-    def should_sample(self) -> bool:
-        """Sample decision"""
-        if self.sampling_rate >= 1.0:
+    def should_sample(self, override_rate: Optional[float] = None,
+                      trace_id: Optional[str] = None) -> bool:
+        """Sample decision.
+
+        *override_rate* (e.g. a rate pushed by the backend) takes precedence
+        over the locally configured ``sampling_rate`` when given.
+
+        With a *trace_id* the decision is a pure function of the ID and the
+        rate, so services sampling at the same rate keep or drop a trace
+        together, and a service at a lower rate keeps a subset of what a
+        higher-rate service keeps.  Without one it falls back to random.
+        """
+        rate = self.sampling_rate if override_rate is None else override_rate
+        if rate >= 1.0:
             return True
-        if self.sampling_rate <= 0.0:
+        if rate <= 0.0:
             return False
-        return random.random() < self.sampling_rate
+        if trace_id:
+            return trace_id_ratio(trace_id) < rate
+        return random.random() < rate
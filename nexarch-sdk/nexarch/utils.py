@@ -2,7 +2,27 @@
 Nexarch Utilities - Helper functions
 """
 import re
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+from urllib.parse import urlsplit
+
+# ── Outbound URL normalisation ────────────────────────────────────────────────
+# Compiled once at import time; applied per path segment.
+_RE_UUID_SEGMENT    = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE
+)
+_RE_NUMERIC_SEGMENT = re.compile(r'^\d+$')
+_RE_HEX_SEGMENT     = re.compile(r'^[0-9a-f]{16,}$', re.IGNORECASE)
+# Opaque tokens (short IDs, base62/base64url keys).  Names such as
+# ``oauth2_token``, ``v2beta1`` or ``sha256sum`` also mix letters and
+# digits, so a segment only counts as a token when it has no ``_`` and its
+# digits are scattered (3+ separate runs) or its letters are mixed case.
+_RE_TOKEN_SEGMENT   = re.compile(r'^(?=.*\d)(?=.*[a-zA-Z])[a-zA-Z0-9-]{8,}$')
+_RE_DIGIT_RUN       = re.compile(r'\d+')
+_TOKEN_MIN_DIGIT_RUNS = 3
+
+# Number of distinct raw URLs remembered by the normaliser.
+_URL_CACHE_SIZE = 4096
 
 
 def sanitize_headers(headers: Dict[str, str]) -> Dict[str, str]:
@@ -61,6 +81,62 @@ def extract_route_pattern(path: str) -> str:
     return path
 
 
+def _is_token_segment(segment: str) -> bool:
+    if not _RE_TOKEN_SEGMENT.match(segment):
+        return False
+    if not (segment.islower() or segment.isupper()):
+        return True
+    return len(_RE_DIGIT_RUN.findall(segment)) >= _TOKEN_MIN_DIGIT_RUNS
+
+
+def _template_segment(segment: str) -> str:
+    """Replace an ID-like path segment with ``{id}``."""
+    if (
+        _RE_NUMERIC_SEGMENT.match(segment)
+        or _RE_UUID_SEGMENT.match(segment)
+        or _RE_HEX_SEGMENT.match(segment)
+        or _is_token_segment(segment)
+    ):
+        return '{id}'
+    return segment
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
+def normalize_outbound_url(url: str) -> Tuple[str, str]:
+    """
+    Reduce an outbound request URL to ``(peer_host, templated_path)``.
+
+    Query string, fragment and credentials are dropped and ID-like path
+    segments are replaced with ``{id}`` so that every call to the same
+    remote endpoint maps to a single operation.  Results are cached.
+
+    Examples:
+        https://api.example.com/users/123?page=2 -> ("api.example.com", "/users/{id}")
+        http://billing:8080/invoices/42/pdf -> ("billing:8080", "/invoices/{id}/pdf")
+
+    Args:
+        url: Absolute request URL
+
+    Returns:
+        Tuple of peer host (with non-default port) and templated path
+    """
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower() or 'unknown'
+        port = parts.port
+    except ValueError:
+        return 'unknown', '/'
+
+    if port and not (
+        (parts.scheme == 'http' and port == 80)
+        or (parts.scheme == 'https' and port == 443)
+    ):
+        host = f"{host}:{port}"
+
+    segments = [_template_segment(seg) for seg in parts.path.split('/') if seg]
+    return host, '/' + '/'.join(segments)
+
+
 def format_bytes(bytes_size: int) -> str:
     """
     Format bytes to human-readable string.
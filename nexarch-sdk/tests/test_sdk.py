@@ -42,3 +42,328 @@ def test_sampling_rate_validation():
     
     sdk3 = NexarchSDK(api_key="test", sampling_rate=0.5)
     assert sdk3.sampling_rate == 0.5
+
+
+def test_outbound_url_normalisation():
+    """Outbound URLs collapse to host + templated path"""
+    from nexarch.utils import normalize_outbound_url
+
+    assert normalize_outbound_url("https://api.example.com/users/123?page=2") == (
+        "api.example.com", "/users/{id}"
+    )
+    assert normalize_outbound_url(
+        "http://billing:8080/invoices/3f2c9a1e-1111-2222-3333-444455556666/pdf"
+    ) == ("billing:8080", "/invoices/{id}/pdf")
+    assert normalize_outbound_url("https://API.example.com:443/v1/orders") == (
+        "api.example.com", "/v1/orders"
+    )
+    # Names that merely mix letters and digits are kept; opaque tokens are not
+    assert normalize_outbound_url("https://idp/oauth2_token/v2beta1/sha256sum")[1] == (
+        "/oauth2_token/v2beta1/sha256sum"
+    )
+    assert normalize_outbound_url("https://api/keys/aZ3kQ9xLm2/k3j9x2m1p0")[1] == "/keys/{id}/{id}"
+
+
+def test_runtime_config_apply():
+    """Heartbeat config updates rate and feature switches in place"""
+    from nexarch.runtime_config import RuntimeConfig
+    from nexarch.tracing import Sampler
+
+    config = RuntimeConfig()
+    changed = config.apply({
+        "sampling_rate": 0.0,
+        "features": {"db_span_aggregation": True, "tail_sampling": True},
+    })
+    assert changed
+    assert config.sampling_rate == 0.0
+    assert config.db_span_aggregation and config.tail_sampling
+    assert not config.apply({"sampling_rate": 0.0})
+    # Booleans are not rates or latencies
+    assert not config.apply({"sampling_rate": True, "tail_latency_ms": True})
+    assert config.sampling_rate == 0.0 and config.tail_latency_ms == 1000.0
+
+    # Pushed rate overrides the locally configured one
+    assert Sampler(1.0).should_sample(config.sampling_rate) is False
+
+
+def test_aimd_controller():
+    """Batch size grows additively on fast responses and halves on congestion"""
+    from nexarch.exporters import AIMDController
+
+    flow = AIMDController(initial_batch_size=50, batch_step=10, concurrency_every=2,
+                          max_concurrency=4, latency_target_ms=100)
+    flow.on_success(rtt_ms=20)
+    flow.on_success(rtt_ms=20)
+    assert flow.batch_size == 70
+    assert flow.concurrency == 2
+
+    flow.on_success(rtt_ms=500)  # slow — hold steady
+    assert flow.batch_size == 70
+
+    flow.on_congestion(retry_after=2)
+    assert flow.batch_size == 35
+    assert flow.concurrency == 1
+    assert flow.pause_remaining() > 0
+
+
+def test_heartbeat_bypasses_export_flow_control(monkeypatch):
+    """A throttled span export neither delays the heartbeat nor is fed by it"""
+    import time
+    from nexarch.exporters import HttpExporter
+
+    class _Response:
+        status_code = 200
+        text = '{"config": {"sampling_rate": 0.5}}'
+
+        def json(self):
+            return {"config": {"sampling_rate": 0.5}}
+
+    exporter = HttpExporter(endpoint="http://backend", api_key="k")
+    exporter.flow.on_congestion(retry_after=30)
+    before = (exporter.flow.batch_size, exporter.flow.concurrency, exporter.flow._successes)
+    monkeypatch.setattr(exporter.session, "post", lambda *args, **kwargs: _Response())
+
+    started = time.time()
+    assert exporter.send_heartbeat({"service": "s"}) == {"config": {"sampling_rate": 0.5}}
+    assert time.time() - started < 1
+    assert (exporter.flow.batch_size, exporter.flow.concurrency, exporter.flow._successes) == before
+
+
+def test_error_fingerprint_sampling():
+    """Only the first N occurrences of a fingerprint keep their traceback"""
+    from nexarch.error_sampling import ErrorSampler, fingerprint_exception
+
+    def fail(n):
+        raise ValueError(f"bad id {n}")
+
+    fingerprints = set()
+    for n in range(3):
+        try:
+            fail(n)
+        except ValueError as e:
+            fingerprints.add(fingerprint_exception(e))
+    assert len(fingerprints) == 1
+    fp = fingerprints.pop()
+
+    sampler = ErrorSampler(max_full_per_interval=2, interval_seconds=60)
+    decisions = [sampler.record(fp, "ValueError", "bad id 1") for _ in range(5)]
+    assert decisions == [True, True, False, False, False]
+
+    summaries = sampler.drain_summaries(force=True)
+    assert summaries[0]["fingerprint"] == fp
+    assert summaries[0]["count"] == 5
+    assert summaries[0]["suppressed_count"] == 3
+
+
+def test_error_summaries_drained_by_queue_worker():
+    """Suppressed-error counts are reported once the window closes, without a new error"""
+    import time
+    from nexarch.queue import LogQueue
+    from nexarch.error_sampling import ErrorSampler
+
+    sampler = ErrorSampler(max_full_per_interval=1, interval_seconds=0.05)
+    for _ in range(3):
+        sampler.record("fp", "ValueError", "boom")
+
+    summaries = []
+    queue = LogQueue(flush_interval=0.02)
+    queue.set_periodic("error_summaries", lambda: summaries.extend(sampler.drain_summaries()))
+    queue.start()
+    try:
+        deadline = time.time() + 2
+        while not summaries and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.shutdown()
+
+    assert [s["suppressed_count"] for s in summaries] == [2]
+
+
+def test_traffic_analyzer_transfer_stats():
+    """TTFB and payload sizes are aggregated and heavy paths surfaced"""
+    from nexarch.auto_discovery import TrafficAnalyzer
+
+    analyzer = TrafficAnalyzer()
+    big = TrafficAnalyzer.HEAVY_RESPONSE_BYTES * 2
+    analyzer.record_request("/export", 1500, 200, ttfb_ms=40, request_bytes=10, response_bytes=big)
+    analyzer.record_request("/export", 1500, 200, ttfb_ms=60, request_bytes=10, response_bytes=big)
+    analyzer.record_request("/ping", 2, 200)
+
+    patterns = analyzer.get_traffic_patterns()
+    assert patterns["total_response_bytes"] == big * 2
+    assert patterns["slow_paths"][0]["avg_ttfb_ms"] == 50
+    assert [p["endpoint"] for p in patterns["bandwidth_heavy_paths"]] == ["/export"]
+
+
+def test_runtime_health_loop_lag():
+    """A blocked event loop shows up as lag in the span's time window"""
+    import asyncio
+    import gc
+    import time
+    from nexarch.runtime_health import RuntimeHealthCollector
+
+    collector = RuntimeHealthCollector("svc", report_interval=60, loop_lag_interval=0.01)
+    collector.start()
+
+    async def blocked_request():
+        collector.ensure_loop_monitor()
+        await asyncio.sleep(0.03)
+        start = time.time()
+        time.sleep(0.2)  # blocks the loop
+        gc.collect()
+        end = time.time()
+        await asyncio.sleep(0.03)
+        return start, end
+
+    try:
+        start, end = asyncio.run(blocked_request())
+        window = collector.window(start, end)
+        assert window["loop_lag_max_ms"] >= 150
+        assert window["gc_collections"] >= 1
+
+        sample = collector.collect()
+        assert sample["thread_count"] >= 1
+        assert sample["loop_lag_max_ms"] >= 150
+    finally:
+        collector.stop()
+
+
+def test_sampling_profiler_slow_span():
+    """Slow traces get a collapsed-stack profile, fast ones get nothing"""
+    import time
+    from nexarch.profiler import SamplingProfiler
+
+    def busy_handler(seconds):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            sum(range(1000))
+
+    profiler = SamplingProfiler(hz=200, threshold_ms=100, max_cpu_fraction=0.05)
+    profiler.start()
+    try:
+        profiler.begin("slow")
+        busy_handler(0.3)
+        profile = profiler.end("slow", latency_ms=300)
+
+        profiler.begin("fast")
+        assert profiler.end("fast", latency_ms=5) is None
+    finally:
+        profiler.stop()
+
+    assert profile["samples"] > 0
+    assert any("busy_handler" in s["stack"] for s in profile["stacks"])
+    assert profiler.cpu_seconds <= 0.3
+
+
+def test_trace_id_sampling_and_traceparent():
+    """Sampling is a function of the trace ID; traceparent round-trips"""
+    from nexarch.tracing import (
+        Sampler, new_trace_id, new_span_id, parse_traceparent, format_traceparent,
+    )
+
+    ids = [new_trace_id() for _ in range(5000)]
+    low, high = Sampler(0.1), Sampler(0.5)
+    kept_low = [i for i in ids if low.should_sample(trace_id=i)]
+    # Same decision every time, and lower rates keep a subset of higher ones
+    assert kept_low == [i for i in ids if low.should_sample(trace_id=i)]
+    assert all(high.should_sample(trace_id=i) for i in kept_low)
+    assert 0.05 < len(kept_low) / len(ids) < 0.15
+
+    trace_id, span_id = ids[0], new_span_id()
+    header = format_traceparent(trace_id, span_id, sampled=False)
+    assert parse_traceparent(header) == (trace_id, span_id, False)
+    assert parse_traceparent("00-" + "0" * 32 + "-" + span_id + "-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_ring_buffer_overflow_policies():
+    """Ring buffer drains in FIFO batches and honours each overflow policy"""
+    from nexarch.ring_buffer import RingBuffer
+    from nexarch.queue import LogQueue
+
+    ring = RingBuffer(3, overflow="drop_newest")
+    assert [ring.put(i) for i in range(5)] == [True, True, True, False, False]
+    assert ring.drain(max_items=2) == [0, 1]
+    ring.put(3)
+    ring.put(4)
+    assert ring.drain() == [2, 3, 4]  # wraps around the slot array
+    assert ring.dropped == 2
+
+    ring = RingBuffer(3, overflow="drop_oldest")
+    for i in range(5):
+        ring.put(i)
+    assert ring.drain() == [2, 3, 4]
+
+    ring = RingBuffer(1, overflow="block", block_timeout=0.01)
+    assert ring.put("a") and not ring.put("b")
+
+    queue = LogQueue(capacity=2)
+    queue.enqueue({"type": "span", "timestamp": "t", "data": {"span_id": "x"}})
+    assert queue.drain() == [{"type": "span", "timestamp": "t", "data": {"span_id": "x"}}]
+
+
+def test_log_queue_packs_spans_and_keeps_records_across_configure():
+    """Spans are queued as flat tuples and round-trip exactly; configure loses nothing"""
+    from nexarch.queue import LogQueue
+
+    span = {
+        "type": "span",
+        "timestamp": "t",
+        "data": {"trace_id": "a", "span_id": "b", "latency_ms": 1.5, "tags": {"db.system": "sqlite"},
+                 "db_latency": 1.5, "profile": {"frames": []}},
+    }
+    error = {"type": "error", "timestamp": "t", "data": {"message": "boom"}}
+    queue = LogQueue(capacity=4)
+    queue.enqueue(span)
+    queue.enqueue(error)
+    assert type(queue._ring._slots[0]) is tuple
+    assert queue._ring._slots[1] is error
+
+    old_ring = queue._ring
+    queue.configure(capacity=8)
+    late = {"type": "metric", "timestamp": "t", "data": {}}
+    old_ring.put(late)  # a producer still holding the old ring
+    assert queue.drain() == [span, error, late]
+
+    queue = LogQueue(capacity=4)
+    for i in range(4):
+        queue.enqueue({"type": "metric", "timestamp": "t", "data": {"i": i}})
+    queue.configure(capacity=2)
+    assert [record["data"]["i"] for record in queue.drain()] == [2, 3]
+    assert queue.stats()["dropped"] == 2
+
+
+def test_inbound_traceparent_sampled_flag_is_honoured(monkeypatch):
+    """A propagated sampled flag overrides the local sampling rate"""
+    from fastapi.testclient import TestClient
+    from nexarch import middleware
+    from nexarch.middleware import NexarchMiddleware
+    from nexarch.queue import LogQueue
+    from nexarch.tracing import new_trace_id, new_span_id, format_traceparent
+
+    def recorded_traces(sampling_rate, sampled):
+        app = FastAPI()
+        app.add_middleware(
+            NexarchMiddleware, api_key="test", sampling_rate=sampling_rate,
+            service_name="downstream", enable_auto_discovery=False,
+        )
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        # Private queue: no worker thread drains it behind the test's back
+        queue = LogQueue()
+        monkeypatch.setattr(middleware, "get_log_queue", lambda: queue)
+        trace_ids = [new_trace_id() for _ in range(20)]
+        with TestClient(app) as client:
+            for trace_id in trace_ids:
+                header = format_traceparent(trace_id, new_span_id(), sampled=sampled)
+                assert client.get("/ping", headers={"traceparent": header}).status_code == 200
+        spans = [r["data"] for r in queue.drain() if r.get("type") == "span"]
+        return {span["trace_id"] for span in spans} & set(trace_ids), trace_ids
+
+    kept, trace_ids = recorded_traces(sampling_rate=0.0, sampled=True)
+    assert kept == set(trace_ids)
+    kept, _ = recorded_traces(sampling_rate=1.0, sampled=False)
+    assert kept == set()